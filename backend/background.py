@@ -0,0 +1,38 @@
+"""
+Fire-and-forget background tasks that survive until they finish.
+
+The event loop only keeps weak references to tasks, so a task created with
+asyncio.create_task() and not stored anywhere can be garbage-collected
+before it completes. spawn() keeps a strong reference until the task is
+done, and drain() lets the shutdown hook wait for pending work (flushes,
+memory refreshes, compactions) instead of dropping it.
+"""
+
+import asyncio
+from typing import Awaitable, Set
+
+_tasks: Set[asyncio.Task] = set()
+
+
+def spawn(coro: Awaitable) -> asyncio.Task:
+    """Schedule a coroutine in the background and keep it alive until done."""
+    task = asyncio.ensure_future(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+async def drain(timeout: float) -> None:
+    """
+    Wait for pending background tasks (call on shutdown).
+
+    Args:
+        timeout: Seconds to wait before cancelling whatever is still running
+    """
+    if not _tasks:
+        return
+    done, pending = await asyncio.wait(set(_tasks), timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        print(f"⚠️ Cancelled {len(pending)} background tasks still running at shutdown")
@@ -14,7 +14,65 @@ class Settings(BaseSettings):
     CLOUDINARY_API_SECRET: str
     OPENROUTER_API_KEY: str
     GROQ_API_KEY: Optional[str] = None
-    
+    # Max Groq completions in flight per worker process
+    LLM_MAX_CONCURRENCY: int = 4
+    # Shared Groq HTTP connection pool
+    LLM_HTTP_MAX_CONNECTIONS: int = 20
+    LLM_HTTP_MAX_KEEPALIVE: int = 10
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    LLM_WARM_CONNECTIONS: int = 2
+    # Prompt/response cache for deterministic LLM endpoints
+    LLM_CACHE_MAX_ENTRIES: int = 512
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    # Log query shapes that still COLLSCAN (explain) after ensuring indexes
+    INDEX_REPORT_ON_STARTUP: bool = False
+    # Reconcile tag_stats with the posts on every boot (a full scan of posts in
+    # each worker); normally run migrations/reconcile_tag_stats.py by hand instead
+    TAG_STATS_RECONCILE_ON_STARTUP: bool = False
+    # Where new epics keep their story blocks: "embedded" (in the epic) or
+    # "collection" (story_blocks collection, paged via /epics/{id}/blocks)
+    EPIC_BLOCK_STORAGE: str = "embedded"
+    # Write-behind buffer for phrase-learning usage_count increments
+    PHRASE_USAGE_FLUSH_SECONDS: float = 5.0
+    PHRASE_USAGE_FLUSH_THRESHOLD: int = 100
+    # Each worker's phrase index picks up learnings saved by other workers
+    # at most this often (checked on read)
+    PHRASE_INDEX_REFRESH_SECONDS: float = 30.0
+    # Shutdown waits this long for background tasks (flushes, refreshes) to finish
+    BACKGROUND_DRAIN_SECONDS: float = 10.0
+    # Token budgets for post text packed into prompts (services/corpus_packer.py)
+    CORPUS_TOKENS_SUMMARY: int = 2500
+    CORPUS_TOKENS_STORY: int = 1250
+    CORPUS_TOKENS_EPIC: int = 2000
+    CORPUS_TOKENS_POST_SUGGESTION: int = 1250
+    # Cursor batch size for the server-side corpus extraction pipeline
+    CORPUS_BATCH_SIZE: int = 1000
+    # Upper bound on the lifetime of a cached tag corpus (writes invalidate earlier)
+    CORPUS_CACHE_TTL_SECONDS: int = 24 * 3600
+    # Corpora larger than this are not cached (one document each, 16 MB BSON limit)
+    CORPUS_CACHE_MAX_BYTES: int = 8 * 1024 * 1024
+    # Hierarchical (map-reduce) tag summaries: chunk size and parallel chunk summaries
+    SUMMARY_CHUNK_TOKENS: int = 2500
+    SUMMARY_MAP_CONCURRENCY: int = 3
+    # Story segmentation: "boundaries" (model returns paragraph indices, text is
+    # cut locally), "full_text" (model echoes block text) or "texttiling" (local, no LLM)
+    SEGMENTATION_MODE: str = "boundaries"
+    # Batched coherence scoring: blocks per request are capped by tokens and count
+    COHERENCE_BATCH_TOKENS: int = 6000
+    COHERENCE_BATCH_MAX_BLOCKS: int = 40
+    # Epic continuation context: running memory + the last K blocks verbatim
+    NARRATIVE_MEMORY_RECENT_BLOCKS: int = 3
+    NARRATIVE_MEMORY_SUMMARY_WORDS: int = 400
+    NARRATIVE_MEMORY_FOLD_TOKENS: int = 4000
+    # Fold steps a continuation may wait for (the rest is folded in the background)
+    NARRATIVE_MEMORY_SYNC_FOLDS: int = 1
+    # Server-side vision chat sessions: idle expiry and messages kept verbatim
+    # (older ones are compacted into the session summary)
+    VISION_CHAT_SESSION_TTL_SECONDS: int = 6 * 3600
+    VISION_CHAT_RECENT_MESSAGES: int = 6
+    # Hard cap on verbatim messages while compaction is failing or behind
+    VISION_CHAT_MAX_MESSAGES: int = 16
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
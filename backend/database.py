@@ -51,6 +51,11 @@ database = client.visualDictionaryDB
 post_collection = database.get_collection("posts")
 epic_collection = database.get_collection("epics")
 phrase_learning_collection = database.get_collection("phrase_learning")
+llm_cache_collection = database.get_collection("llm_cache")
+tag_stats_collection = database.get_collection("tag_stats")
+story_blocks_collection = database.get_collection("story_blocks")
+corpus_cache_collection = database.get_collection("corpus_cache")
+vision_chat_sessions_collection = database.get_collection("vision_chat_sessions")
 
 # --- Connection Test Function ---
 async def ping_server():
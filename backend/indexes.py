@@ -0,0 +1,181 @@
+"""
+Declarative index manager.
+
+Every index the routers/services rely on is declared here, next to the query
+shapes it is meant to serve. ensure_indexes() is called from the startup hook
+(create_indexes is idempotent), and report_collscans() runs explain() on each
+declared query shape and reports any that still fall back to a COLLSCAN.
+
+Run `python -m backend.indexes` to apply the indexes and print the report.
+"""
+
+import asyncio
+from typing import Dict, List
+from pymongo import IndexModel, ASCENDING, DESCENDING
+
+from backend.config import settings
+from backend.database import (
+    post_collection,
+    epic_collection,
+    phrase_learning_collection,
+    llm_cache_collection,
+    tag_stats_collection,
+    story_blocks_collection,
+    corpus_cache_collection,
+    vision_chat_sessions_collection,
+)
+from backend.services.post_fields import HAS_TEXT
+
+
+# ==================== INDEX DECLARATIONS ====================
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "posts": [
+        # GET /posts/?tag= (sorted by _id), /summary/{tag}, tag aggregation for epics
+        IndexModel([("general_tags", ASCENDING), ("_id", DESCENDING)]),
+        # /highlights (newest first), keyset cursor on (updated_at, _id)
+        IndexModel([("updated_at", DESCENDING), ("_id", DESCENDING)]),
+        # /with-text feed and epic corpus: indexed range scan on the denormalized flag
+        IndexModel([("has_text", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)]),
+        # Random sampling (services/post_sampler.py): range scans on the rand key
+        IndexModel([("general_tags", ASCENDING), ("rand", ASCENDING)]),
+        IndexModel([("has_text", ASCENDING), ("rand", ASCENDING)]),
+    ],
+    "epics": [
+        # GET /epics/ (newest first), keyset cursor on (updated_at, _id)
+        IndexModel([("updated_at", DESCENDING), ("_id", DESCENDING)]),
+        # GET /epics/?status=
+        IndexModel([("status", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "phrase_learning": [
+        # _get_relevant_learnings: tag overlap ranked by usage
+        IndexModel([("enhancement.tags", ASCENDING), ("usage_count", DESCENDING)]),
+        # _get_relevant_learnings without tags: most recent
+        IndexModel([("created_at", DESCENDING)]),
+        # /phrases/stats: most used learnings
+        IndexModel([("usage_count", DESCENDING)]),
+    ],
+    "llm_cache": [
+        # Expire Mongo-tier LLM cache entries
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=settings.LLM_CACHE_TTL_SECONDS),
+    ],
+    "tag_stats": [
+        # GET /posts/tags/popular
+        IndexModel([("count", DESCENDING), ("_id", ASCENDING)]),
+    ],
+    "story_blocks": [
+        # GET /epics/{id}/blocks?after= range scan, full-epic loads in order
+        IndexModel([("epic_id", ASCENDING), ("sequence_order", ASCENDING)]),
+        # Single-block updates (image association)
+        IndexModel([("epic_id", ASCENDING), ("block_id", ASCENDING)]),
+    ],
+    "corpus_cache": [
+        # Invalidation by tag / all-posts corpora
+        IndexModel([("tags", ASCENDING)]),
+        IndexModel([("all_posts", ASCENDING)]),
+        # Safety net for entries a racing write left stale
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=settings.CORPUS_CACHE_TTL_SECONDS),
+    ],
+    "vision_chat_sessions": [
+        # Idle sessions expire (every turn refreshes last_active_at)
+        IndexModel([("last_active_at", ASCENDING)], expireAfterSeconds=settings.VISION_CHAT_SESSION_TTL_SECONDS),
+    ],
+}
+
+COLLECTIONS = {
+    "posts": post_collection,
+    "epics": epic_collection,
+    "phrase_learning": phrase_learning_collection,
+    "llm_cache": llm_cache_collection,
+    "tag_stats": tag_stats_collection,
+    "story_blocks": story_blocks_collection,
+    "corpus_cache": corpus_cache_collection,
+    "vision_chat_sessions": vision_chat_sessions_collection,
+}
+
+
+# ==================== QUERY SHAPES ====================
+# (collection, description, filter, sort) for every find() issued by the routers
+
+QUERY_SHAPES = [
+    ("posts", "GET /posts/", {}, [("_id", -1)]),
+    ("posts", "GET /posts/?tag=", {"general_tags": "example"}, [("_id", -1)]),
+    ("posts", "GET /posts/with-text", HAS_TEXT, [("updated_at", -1), ("_id", -1)]),
+    ("posts", "GET /posts/highlights",
+     {"$or": HAS_TEXT["$or"] + [{"general_tags": {"$ne": []}}]}, [("updated_at", -1)]),
+    ("posts", "EpicService._aggregate_text_from_posts", HAS_TEXT, [("updated_at", -1)]),
+    ("posts", "EpicService.suggest_images_for_block",
+     {"photo_url": {"$exists": True}, "has_text": {"$ne": True}, "rand": {"$gte": 0.5}}, [("rand", 1)]),
+    ("posts", "GET /posts/summary/{tag} (corpus pipeline)", {"$and": [{"general_tags": "example"}, HAS_TEXT]}, None),
+    ("posts", "GET /posts/untagged/random",
+     {"general_tags": {"$in": [None, []]}, "rand": {"$gte": 0.5}}, [("rand", 1)]),
+    ("epics", "GET /epics/", {}, [("updated_at", -1), ("_id", -1)]),
+    ("epics", "GET /epics/?status=", {"status": "draft"}, [("updated_at", -1), ("_id", -1)]),
+    ("phrase_learning", "_get_relevant_learnings (tags)",
+     {"enhancement.tags": {"$in": ["example"]}}, [("usage_count", -1)]),
+    ("phrase_learning", "_get_relevant_learnings (recent)", {}, [("created_at", -1)]),
+    ("phrase_learning", "GET /phrases/stats", {}, [("usage_count", -1)]),
+    ("tag_stats", "GET /posts/tags/popular", {"count": {"$gt": 0}}, [("count", -1), ("_id", 1)]),
+    ("story_blocks", "GET /epics/{id}/blocks",
+     {"epic_id": "example", "sequence_order": {"$gt": 0}}, [("sequence_order", 1)]),
+]
+
+
+async def ensure_indexes() -> None:
+    """Create every declared index (no-op for indexes that already exist)."""
+    for name, models in INDEXES.items():
+        try:
+            created = await COLLECTIONS[name].create_indexes(models)
+            print(f"✅ Indexes ensured on '{name}': {', '.join(created)}")
+        except Exception as e:
+            print(f"⚠️ Could not create indexes on '{name}': {e}")
+
+
+def _plan_stages(plan: dict) -> List[str]:
+    """Flatten the stage names of an explain() plan tree."""
+    stages = [plan.get("stage", "")]
+    for key in ("inputStage", "queryPlan"):
+        if isinstance(plan.get(key), dict):
+            stages.extend(_plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+async def report_collscans() -> List[dict]:
+    """
+    Explain every declared query shape and report the ones whose winning
+    plan still contains a COLLSCAN.
+
+    Returns:
+        List of {"collection", "query", "stages"} for shapes that scan the collection
+    """
+    offenders = []
+    for name, description, query, sort in QUERY_SHAPES:
+        cursor = COLLECTIONS[name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            explain = await cursor.limit(50).explain()
+        except Exception as e:
+            print(f"⚠️ explain() failed for {description}: {e}")
+            continue
+
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        stages = _plan_stages(winning_plan)
+        if "COLLSCAN" in stages:
+            offenders.append({"collection": name, "query": description, "stages": stages})
+            print(f"⚠️ COLLSCAN: {description} on '{name}' ({' <- '.join(stages)})")
+
+    if not offenders:
+        print("✅ All declared query shapes are index-backed")
+    return offenders
+
+
+async def _main():
+    await ensure_indexes()
+    await report_collscans()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -1,9 +1,23 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from backend.routers import posts, epics, phrases
-from backend.routers.posts import test_connection, post_helper
+from backend.routers.posts import test_connection, post_view
 from backend.database import post_collection
-from backend.schemas.post import PaginatedPosts
+from backend.services.llm_clients import llm_client_registry
+from backend.services.llm_cache import llm_cache
+from backend.services.corpus_cache import corpus_cache
+from backend.services.usage_counter import phrase_usage_counter
+from backend.services.phrase_service import phrase_service
+from backend.indexes import ensure_indexes, report_collscans
+from backend.migrations.backfill_text_fields import backfill_text_fields
+from backend.migrations.backfill_random_keys import backfill_random_keys
+from backend.migrations.reconcile_tag_stats import reconcile_tag_stats
+from backend.background import spawn, drain
+from backend.config import settings
+from backend.schemas.post import PaginatedPosts, PostView
+from backend.pagination import apply_cursor, sort_spec, next_cursor_for
+from backend.services.post_fields import HAS_TEXT
+from typing import Optional
 import math
 
 app = FastAPI(title="visual dictionary")
@@ -33,41 +47,75 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     await test_connection()
+    await ensure_indexes()
+    if settings.INDEX_REPORT_ON_STARTUP:
+        await report_collscans()
+    # Resumable; a no-op once every post has the denormalized text fields
+    spawn(backfill_text_fields())
+    spawn(backfill_random_keys())
+    if settings.TAG_STATS_RECONCILE_ON_STARTUP:
+        spawn(reconcile_tag_stats())
+    phrase_usage_counter.start()
+    spawn(phrase_service.load_index())
+    await llm_client_registry.warm_up()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Let in-flight background work finish before the clients close
+    await drain(settings.BACKGROUND_DRAIN_SECONDS)
+    # Guaranteed final flush of buffered usage counts
+    await phrase_usage_counter.stop()
+    await llm_client_registry.close()
 
 # In backend/main.py
 
 # --- FULL IMPLEMENTATION DIRECTLY ON APP ---
 @app.get("/api/v1/posts/with-text", response_model=PaginatedPosts)
-async def get_posts_with_text_main(page: int = 1, limit: int = 50):
-    query = {
-        "text_blocks": {
-            "$exists": True,
-            "$not": {"$size": 0}
-        }
-    }
-
-    total_posts = await post_collection.count_documents(query)
-    if total_posts == 0:
-        return {"posts": [], "total_pages": 0, "current_page": 1}
-
-    skip = (page - 1) * limit
-    posts_cursor = post_collection.find(query).sort("updated_at", -1).skip(skip).limit(limit)
+async def get_posts_with_text_main(
+    page: int = 1,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    view: PostView = "full"
+):
+    projection, helper = post_view(view)
+    sort_fields = ["updated_at", "_id"]
+    # has_text is maintained by every text_blocks writer (see services/post_fields.py);
+    # HAS_TEXT also matches legacy posts the backfill has not reached yet
+    query = HAS_TEXT
+
+    # Cursor mode: keyset range scan, no count_documents
+    if cursor:
+        try:
+            query = apply_cursor(query, cursor, sort_fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        total_posts = None
+    else:
+        total_posts = await post_collection.count_documents(query)
+        if total_posts == 0:
+            return {"posts": [], "total_pages": 0, "current_page": 1}
+
+    posts_cursor = post_collection.find(query, projection).sort(sort_spec(sort_fields))
+    if not cursor:
+        posts_cursor = posts_cursor.skip((page - 1) * limit)
+    docs = await posts_cursor.limit(limit).to_list(length=limit)
 
     posts_list = []
-    async for post in posts_cursor:
+    for post in docs:
         try:
-            helper_result = post_helper(post)
+            helper_result = helper(post)
             posts_list.append(helper_result)
         except Exception as e:
             print(f"Error processing post {post.get('_id')} in post_helper: {e}")
 
-    total_pages = math.ceil(total_posts / limit)
-
     response_data = {
         "posts": posts_list,
-        "total_pages": total_pages,
-        "current_page": page
+        "next_cursor": next_cursor_for(docs, limit, sort_fields)
     }
+    if total_posts is not None:
+        response_data["total_pages"] = math.ceil(total_posts / limit)
+        response_data["current_page"] = page
 
     # Keep the detailed logging for now, it's helpful
     # ... (print statements) ...
@@ -83,4 +131,9 @@ app.include_router(phrases.router)
 # Health check endpoint for Render
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "sharirasutra"}
\ No newline at end of file
+    return {"status": "healthy", "service": "sharirasutra"}
+
+# LLM cache hit/miss counters (per worker process)
+@app.get("/api/v1/llm/cache/stats")
+async def llm_cache_stats():
+    return {**llm_cache.stats(), "corpus": corpus_cache.stats()}
\ No newline at end of file
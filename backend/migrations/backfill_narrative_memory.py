@@ -0,0 +1,50 @@
+"""
+Build the narrative memory of epics that do not have one yet.
+
+Epics created before narrative memory (or whose memory was cleared by a
+block rewrite) would otherwise be folded a few steps at a time by their
+next continuations. This folds each of them completely up front, a few
+epics at a time. Resumable: epics whose memory is complete are a no-op
+(refresh finds nothing left to fold), and progress is stored after every
+fold step.
+
+Run with `python -m backend.migrations.backfill_narrative_memory`
+(it makes LLM calls, so it is not scheduled at startup).
+"""
+
+import asyncio
+from backend.config import settings
+from backend.database import epic_collection
+from backend.services.narrative_memory import narrative_memory
+
+
+async def backfill_narrative_memory(concurrency: int = 2) -> int:
+    """
+    Fold every epic longer than the verbatim window into its memory.
+
+    Args:
+        concurrency: Epics folded at the same time
+
+    Returns:
+        Number of epics refreshed
+    """
+    query = {"metadata.total_blocks": {"$gt": settings.NARRATIVE_MEMORY_RECENT_BLOCKS}}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def refresh(epic_id: str) -> bool:
+        async with semaphore:
+            try:
+                return await narrative_memory.refresh(epic_id) is not None
+            except Exception as e:
+                print(f"⚠️ Narrative memory backfill failed for epic {epic_id}: {e}")
+                return False
+
+    epic_ids = [str(doc["_id"]) async for doc in epic_collection.find(query, {"_id": 1})]
+    refreshed = sum(await asyncio.gather(*(refresh(epic_id) for epic_id in epic_ids)))
+
+    print(f"✅ Refreshed narrative memory of {refreshed} epics")
+    return refreshed
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill_narrative_memory())
@@ -0,0 +1,46 @@
+"""
+Backfill the `rand` sampling key on posts written before it existed.
+
+Resumable: each batch only selects posts that are still missing `rand`, so
+an interrupted run simply continues where it stopped, and re-running a
+finished backfill is a single empty query.
+
+Run manually with `python -m backend.migrations.backfill_random_keys`;
+the startup hook also schedules it in the background.
+"""
+
+import asyncio
+from backend.database import post_collection
+
+
+async def backfill_random_keys(batch_size: int = 500) -> int:
+    """
+    Give every post without one a uniform random `rand`, server-side ($rand).
+
+    Args:
+        batch_size: Posts updated per round trip
+
+    Returns:
+        Number of posts updated
+    """
+    missing = {"rand": {"$exists": False}}
+    total = 0
+
+    while True:
+        batch = await post_collection.find(missing, {"_id": 1}).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not batch:
+            break
+
+        result = await post_collection.update_many(
+            {"_id": {"$in": [doc["_id"] for doc in batch]}, **missing},
+            [{"$set": {"rand": {"$rand": {}}}}]
+        )
+        total += result.modified_count
+
+    if total:
+        print(f"✅ Backfilled rand sampling keys on {total} posts")
+    return total
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill_random_keys())
@@ -0,0 +1,59 @@
+"""
+Backfill `has_text` / `text_block_count` on posts written before the fields existed.
+
+Resumable: each batch only selects posts that are still missing
+`text_block_count`, so an interrupted run simply continues where it stopped,
+and re-running a finished backfill is a single empty query.
+
+Run manually with `python -m backend.migrations.backfill_text_fields`;
+the startup hook also schedules it in the background.
+
+`--recount` instead selects every post whose stored count disagrees with its
+text_blocks (a full scan). Run it once to repair posts that received a block
+push before they were backfilled, while pushes still used $inc.
+"""
+
+import asyncio
+import sys
+from backend.database import post_collection
+
+
+async def backfill_text_fields(batch_size: int = 500, recount: bool = False) -> int:
+    """
+    Compute the denormalized text fields server-side, batch by batch.
+
+    Args:
+        batch_size: Posts updated per round trip
+        recount: Also fix posts whose existing count is wrong (full scan)
+
+    Returns:
+        Number of posts updated
+    """
+    block_count = {"$size": {"$cond": [{"$isArray": "$text_blocks"}, "$text_blocks", []]}}
+    if recount:
+        missing = {"$expr": {"$ne": [{"$ifNull": ["$text_block_count", -1]}, block_count]}}
+    else:
+        missing = {"text_block_count": {"$exists": False}}
+    total = 0
+
+    while True:
+        batch = await post_collection.find(missing, {"_id": 1}).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not batch:
+            break
+
+        result = await post_collection.update_many(
+            {"_id": {"$in": [doc["_id"] for doc in batch]}, **missing},
+            [{"$set": {
+                "text_block_count": block_count,
+                "has_text": {"$gt": [block_count, 0]},
+            }}]
+        )
+        total += result.modified_count
+
+    if total:
+        print(f"✅ Backfilled has_text/text_block_count on {total} posts")
+    return total
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill_text_fields(recount="--recount" in sys.argv))
@@ -0,0 +1,41 @@
+"""
+Move embedded story blocks of existing epics into the `story_blocks` collection.
+
+Resumable: each epic's blocks are copied first (replacing any partial copy)
+and only then is the epic flagged `block_storage: "collection"` and its
+embedded array cleared, so an interrupted run can simply be restarted.
+
+Run with `python -m backend.migrations.externalize_story_blocks`
+(set EPIC_BLOCK_STORAGE=collection so new epics use the same layout).
+"""
+
+import asyncio
+from backend.database import epic_collection
+from backend.services.story_block_store import story_block_store, EXTERNAL_STORAGE
+
+
+async def externalize_story_blocks() -> int:
+    """
+    Migrate every embedded epic.
+
+    Returns:
+        Number of epics migrated
+    """
+    pending = {"block_storage": {"$ne": EXTERNAL_STORAGE}}
+    migrated = 0
+
+    async for epic_doc in epic_collection.find(pending, {"story_blocks": 1}):
+        epic_id = str(epic_doc["_id"])
+        await story_block_store.replace_blocks(epic_id, epic_doc.get("story_blocks") or [])
+        await epic_collection.update_one(
+            {"_id": epic_doc["_id"]},
+            {"$set": {"block_storage": EXTERNAL_STORAGE, "story_blocks": []}}
+        )
+        migrated += 1
+
+    print(f"✅ Moved story blocks of {migrated} epics to the story_blocks collection")
+    return migrated
+
+
+if __name__ == "__main__":
+    asyncio.run(externalize_story_blocks())
@@ -0,0 +1,24 @@
+"""
+Reconcile the `tag_stats` collection with the posts.
+
+Run once after deploying tag_stats (and whenever drift is suspected) with
+`python -m backend.migrations.reconcile_tag_stats`. It scans every post, but
+corrects counters with deltas, so it is safe while the app is serving writes.
+The startup hook only runs it when TAG_STATS_RECONCILE_ON_STARTUP is enabled.
+"""
+
+import asyncio
+from backend.services.tag_stats_service import tag_stats_service
+
+
+async def reconcile_tag_stats() -> int:
+    """Recount every tag and correct drifted counters."""
+    try:
+        return await tag_stats_service.reconcile()
+    except Exception as e:
+        print(f"⚠️ Tag stats reconcile failed: {e}")
+        return 0
+
+
+if __name__ == "__main__":
+    asyncio.run(reconcile_tag_stats())
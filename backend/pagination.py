@@ -0,0 +1,114 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is an opaque, URL-safe token holding the sort-key values of the last
+document on a page. The next page is fetched with a range predicate on those
+keys instead of .skip(), so deep pages cost the same as the first one.
+All listings sort descending, with _id as the final tie-breaker.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+
+
+def _encode_value(value):
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "$oid" in value:
+            return ObjectId(value["$oid"])
+        if "$date" in value:
+            return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def encode_cursor(doc: dict, sort_fields: List[str]) -> str:
+    """
+    Build the cursor pointing just after `doc`.
+
+    Args:
+        doc: Raw MongoDB document (last item of the current page)
+        sort_fields: Sort keys in order, e.g. ["updated_at", "_id"]
+
+    Returns:
+        Opaque cursor token
+    """
+    values = [_encode_value(doc.get(field)) for field in sort_fields]
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_fields: List[str]) -> list:
+    """
+    Decode a cursor token back into sort-key values.
+
+    Raises:
+        ValueError: If the token is malformed or doesn't match sort_fields
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = [_decode_value(v) for v in values]
+    except (ValueError, TypeError, InvalidId) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+    if not isinstance(values, list) or len(values) != len(sort_fields):
+        raise ValueError("Invalid cursor: sort keys do not match")
+    return values
+
+
+def keyset_filter(cursor: str, sort_fields: List[str]) -> dict:
+    """
+    Build the query predicate selecting documents strictly after the cursor
+    in descending (sort_fields...) order.
+
+    Null/missing values sort lowest, so they are also "after" any non-null value.
+    """
+    values = decode_cursor(cursor, sort_fields)
+
+    branches = []
+    for i, (field, value) in enumerate(zip(sort_fields, values)):
+        branch = {f: v for f, v in zip(sort_fields[:i], values[:i])}
+        if value is None:
+            # Nothing sorts below null in a descending scan of this key
+            continue
+        branches.append({**branch, field: {"$lt": value}})
+        if field != "_id":
+            branches.append({**branch, field: None})
+
+    if not branches:
+        # Every key was null: nothing can follow
+        return {"_id": {"$exists": False}}
+    return {"$or": branches}
+
+
+def apply_cursor(query: dict, cursor: Optional[str], sort_fields: List[str]) -> dict:
+    """Combine a listing query with the keyset predicate for `cursor` (if any)."""
+    if not cursor:
+        return query
+    after = keyset_filter(cursor, sort_fields)
+    if not query:
+        return after
+    return {"$and": [query, after]}
+
+
+def sort_spec(sort_fields: List[str]) -> list:
+    """Descending sort specification for the given keys."""
+    return [(field, -1) for field in sort_fields]
+
+
+def next_cursor_for(docs: list, limit: int, sort_fields: List[str]) -> Optional[str]:
+    """Cursor for the following page, or None when this page is the last."""
+    if len(docs) < limit or not docs:
+        return None
+    return encode_cursor(docs[-1], sort_fields)
@@ -3,8 +3,8 @@ Epic Router - API endpoints for Epic/Novel management.
 Provides REST API for epic creation, story generation, and image associations.
 """
 
-from fastapi import APIRouter, HTTPException
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
 
 from backend.schemas.epic import (
     Epic,
@@ -15,10 +15,21 @@ from backend.schemas.epic import (
     ImageAssociationRequest,
     VisionSuggestionRequest,
     AddVisionTextToPostRequest,
-    PaginatedEpics
+    PaginatedEpics,
+    EpicView,
+    SegmentationMode,
+    CoherenceScorer,
+    StoryBlockPage,
+    NarrativeMemory
 )
-from backend.services.epic_service import epic_service
+from backend.services.epic_service import epic_service, EpicConflictError
+from backend.services.narrative_memory import narrative_memory
 from backend.services.vision_service import vision_service
+from backend.sse import sse_event, sse_response
+from backend.background import spawn
+from backend.services.post_fields import push_text_blocks
+from backend.services.post_writer import update_post_document
+from backend.services.corpus_cache import corpus_cache
 from backend.database import post_collection
 from backend.schemas.post import TextBlock
 from bson.objectid import ObjectId
@@ -52,30 +63,68 @@ async def create_epic(epic_data: EpicCreate):
 async def list_epics(
     page: int = 1,
     limit: int = 20,
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    view: EpicView = "full"
 ):
     """
     List all epics with pagination.
     Optionally filter by status.
+    Pass `cursor` (the previous response's `next_cursor`) for keyset
+    pagination; `page` is kept as a compatibility mode.
+    `view=summary` leaves out story blocks (EpicSummary items).
     """
     try:
-        result = await epic_service.list_epics(page=page, limit=limit, status=status)
+        result = await epic_service.list_epics(page=page, limit=limit, status=status, cursor=cursor, view=view)
         return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing epics: {str(e)}")
 
 
 @router.get("/{epic_id}", response_model=Epic)
-async def get_epic(epic_id: str):
+async def get_epic(epic_id: str, include_blocks: bool = True):
     """
     Get a specific epic by ID.
+    With include_blocks=false the story blocks are left out, for clients
+    that lazy-load them through /{epic_id}/blocks.
     """
-    epic = await epic_service.get_epic_by_id(epic_id)
+    epic = await epic_service.get_epic_by_id(epic_id, include_blocks=include_blocks)
     if not epic:
         raise HTTPException(status_code=404, detail="Epic not found")
     return epic
 
 
+@router.get("/{epic_id}/blocks", response_model=StoryBlockPage)
+async def list_epic_blocks(epic_id: str, after: Optional[int] = None, limit: int = 50):
+    """
+    Page through an epic's story blocks in sequence order.
+    Pass the previous page's `next_after` as `after` to continue.
+    """
+    page = await epic_service.list_blocks(epic_id, after=after, limit=limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Epic not found")
+    return page
+
+
+@router.get("/{epic_id}/memory", response_model=NarrativeMemory)
+async def get_narrative_memory(epic_id: str):
+    """
+    The epic's narrative memory (summary, characters, open threads).
+    
+    Folding is bounded per request, so a memory that is far behind may come
+    back partial (see summarized_through) and is completed in the background.
+    """
+    refreshed = await narrative_memory.refresh(epic_id, max_folds=narrative_memory.sync_folds)
+    if refreshed is None:
+        raise HTTPException(status_code=404, detail="Epic not found")
+    memory, _, unfolded_blocks = refreshed
+    if unfolded_blocks:
+        spawn(narrative_memory.refresh_quietly(epic_id))
+    return memory
+
+
 @router.put("/{epic_id}", response_model=Epic)
 async def update_epic(epic_id: str, epic_data: EpicUpdate):
     """
@@ -124,13 +173,44 @@ async def generate_full_story(request: FullStoryGenerationRequest):
             source_tags=request.source_tags,
             use_all_text=request.use_all_text,
             generation_prompt=request.generation_prompt,
-            user_commentary=request.user_commentary
+            user_commentary=request.user_commentary,
+            segmentation_mode=request.segmentation_mode
         )
         return epic
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating story: {str(e)}")
 
 
+@router.post("/generate-full/stream")
+async def generate_full_story_stream(request: FullStoryGenerationRequest):
+    """
+    Streaming variant of /generate-full (Server-Sent Events).
+    
+    Emits 'token' events while the story is written, then a final 'done'
+    event carrying the created epic (segmented and saved).
+    """
+    async def events():
+        try:
+            async for event, payload in epic_service.stream_full_story(
+                title=request.title,
+                description=request.description,
+                source_tags=request.source_tags,
+                use_all_text=request.use_all_text,
+                generation_prompt=request.generation_prompt,
+                user_commentary=request.user_commentary,
+                segmentation_mode=request.segmentation_mode
+            ):
+                if event == "token":
+                    yield sse_event("token", {"text": payload})
+                else:
+                    yield sse_event(event, payload)
+        except Exception as e:
+            print(f"Error in streaming epic generation: {e}")
+            yield sse_event("error", {"detail": f"Error generating story: {str(e)}"})
+    
+    return sse_response(events())
+
+
 @router.post("/complete-story", response_model=Epic)
 async def complete_story(request: StoryCompletionRequest):
     """
@@ -154,56 +234,66 @@ async def complete_story(request: StoryCompletionRequest):
     return epic
 
 
+@router.post("/{epic_id}/rescore", response_model=Epic)
+async def rescore_blocks(epic_id: str, scorer: CoherenceScorer = "llm", bypass_cache: bool = False):
+    """
+    Refresh the coherence_score of every story block.
+    
+    `scorer=llm` scores all blocks in batched requests (one for a typical epic),
+    reusing cached scores of unchanged blocks; `scorer=lexical` scores locally.
+    """
+    epic = await epic_service.rescore_blocks(epic_id, scorer=scorer, bypass_cache=bypass_cache)
+    if not epic:
+        raise HTTPException(status_code=404, detail="Epic not found")
+    return epic
+
+
 @router.post("/{epic_id}/segment-blocks", response_model=Epic)
-async def re_segment_blocks(epic_id: str):
+async def re_segment_blocks(
+    epic_id: str,
+    bypass_cache: bool = False,
+    mode: Optional[SegmentationMode] = None,
+    incremental: bool = False
+):
     """
     Re-segment an epic's story blocks using AI.
     Useful if you want to reorganize the blocks.
+    Identical stories reuse the cached segmentation unless bypass_cache is set.
+    `mode=texttiling` segments locally without an LLM call.
+    `incremental=true` re-segments only blocks edited since their last
+    segmentation. Either way, blocks keep their id and image when the new
+    block holds most of their text.
     """
-    # Get epic
-    epic = await epic_service.get_epic_by_id(epic_id)
-    if not epic:
-        raise HTTPException(status_code=404, detail="Epic not found")
-    
-    # Aggregate all block content
-    full_story = "\n\n".join([block["content"] for block in epic["story_blocks"]])
-    
-    # Re-segment
-    from backend.services.story_block_service import story_block_service
-    new_blocks_data = await story_block_service.segment_story(full_story)
-    
-    # Create new blocks
-    new_story_blocks = []
-    for block_data in new_blocks_data:
-        new_story_blocks.append({
-            "block_id": f"story_block_{uuid.uuid4()}",
-            "sequence_order": block_data.get("sequence_order", len(new_story_blocks) + 1),
-            "content": block_data.get("content", ""),
-            "associated_image_id": None,
-            "image_url": None,
-            "coherence_score": block_data.get("coherence_score", 0.7),
-            "created_at": datetime.now(timezone.utc)
-        })
-    
-    # Update epic
-    updated_epic = await epic_service.update_epic(epic_id, {
-        "story_blocks": new_story_blocks,
-        "metadata.total_blocks": len(new_story_blocks),
-        "metadata.total_images": 0  # Reset image associations
-    })
+    try:
+        updated_epic = await epic_service.resegment_blocks(
+            epic_id, incremental=incremental, mode=mode, bypass_cache=bypass_cache
+        )
+    except EpicConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     
+    if not updated_epic:
+        raise HTTPException(status_code=404, detail="Epic not found")
     return updated_epic
 
 
 # ==================== IMAGE ASSOCIATION ENDPOINTS ====================
 
 @router.get("/{epic_id}/suggest-images/{block_id}")
-async def suggest_images_for_block(epic_id: str, block_id: str, count: int = 3):
+async def suggest_images_for_block(
+    epic_id: str,
+    block_id: str,
+    count: int = 3,
+    bypass_cache: bool = False,
+    exclude_ids: Optional[List[str]] = Query(None)
+):
     """
     Get random image suggestions for a story block.
     Returns 3 random posts with images by default.
+    Pass `exclude_ids` (repeatable) to skip posts already suggested.
     """
-    suggestions = await epic_service.suggest_images_for_block(epic_id, block_id, count)
+    suggestions = await epic_service.suggest_images_for_block(
+        epic_id, block_id, count, bypass_cache=bypass_cache, exclude_ids=exclude_ids
+    )
     return {"suggestions": suggestions}
 
 
@@ -230,12 +320,20 @@ async def associate_image(epic_id: str, request: ImageAssociationRequest):
 
 
 @router.post("/{epic_id}/randomize-images/{block_id}")
-async def randomize_image_suggestions(epic_id: str, block_id: str):
+async def randomize_image_suggestions(
+    epic_id: str,
+    block_id: str,
+    bypass_cache: bool = False,
+    exclude_ids: Optional[List[str]] = Query(None)
+):
     """
     Get a new set of random image suggestions.
-    Useful for the "randomize" button in the UI.
+    Useful for the "randomize" button in the UI; pass the ids already shown
+    as `exclude_ids` so each click returns fresh images.
     """
-    suggestions = await epic_service.suggest_images_for_block(epic_id, block_id, count=3)
+    suggestions = await epic_service.suggest_images_for_block(
+        epic_id, block_id, count=3, bypass_cache=bypass_cache, exclude_ids=exclude_ids
+    )
     return {"suggestions": suggestions}
 
 
@@ -306,17 +404,19 @@ async def add_vision_text_to_post(request: AddVisionTextToPostRequest):
         }
         
         # Update post
-        result = await post_collection.update_one(
-            {"_id": ObjectId(request.post_id)},
-            {
-                "$push": {"text_blocks": text_block},
+        post = await update_post_document(
+            ObjectId(request.post_id),
+            push_text_blocks({
                 "$set": {"updated_at": datetime.now(timezone.utc)}
-            }
+            }, [text_block]),
+            projection={"general_tags": 1}
         )
         
-        if result.modified_count == 0:
+        if post is None:
             raise HTTPException(status_code=404, detail="Post not found")
         
+        await corpus_cache.invalidate(post.get("general_tags"))
+        
         return {"success": True, "message": "Text added to post"}
         
     except Exception as e:
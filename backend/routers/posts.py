@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, File, UploadFile, Form
+from fastapi import APIRouter, HTTPException, File, UploadFile, Form, Query
 from typing import Dict, Optional, List
 import uuid
 import os
@@ -12,9 +12,17 @@ from bson.objectid import ObjectId
 from bson.errors import InvalidId
 # shutil(high level file operations) vs os (low level file operations)
 import shutil
-from backend.schemas.post import Post, PostUpdate, PaginatedPosts, StoryGenerationRequest, AddTagRequest, AddTagAndStoryRequest, StoryFlowRequest, PostSuggestionRequest, VisionChatRequest, VisionRewriteRequest, NodeExpansionRequest, UrlUploadRequest
+from backend.schemas.post import Post, PostUpdate, PaginatedPosts, PostView, PostListItem, SummaryMode, StoryGenerationRequest, AddTagRequest, AddTagAndStoryRequest, StoryFlowRequest, PostSuggestionRequest, VisionChatRequest, VisionChatSessionCreate, VisionChatSessionMessage, VisionChatSession, VisionChatTurn, VisionRewriteRequest, NodeExpansionRequest, UrlUploadRequest
 
 from backend.database import post_collection,client
+from backend.pagination import apply_cursor, sort_spec, next_cursor_for
+from backend.services.post_fields import text_block_fields, push_text_blocks, HAS_TEXT
+from backend.services.post_writer import update_post_document, set_post_fields, add_tag_to_post_document
+from backend.services.tag_stats_service import tag_stats_service
+from backend.services.post_sampler import sample_posts, random_key
+from backend.services.corpus_extractor import extract_corpus
+from backend.services.corpus_cache import corpus_cache
+from backend.services.corpus_packer import count_tokens
 import cloudinary
 import cloudinary.uploader
 from backend.config import settings
@@ -58,6 +66,7 @@ text_posts_router = APIRouter()
 
 def post_helper(post) -> dict:
     return {
+        "view": "full",
         "id": str(post["_id"]),
         "photo_url": post.get("photo_url"),
         "photo_public_id": post.get("photo_public_id"),
@@ -69,6 +78,25 @@ def post_helper(post) -> dict:
         "highlights": post.get("highlights", []),  # NEW: Underlined text collection
     }
 
+# Only the fields a gallery grid renders; pushed down to MongoDB as a projection
+POST_SUMMARY_PROJECTION = {"photo_url": 1, "updated_at": 1, "general_tags": 1, "text_block_count": 1}
+
+def post_summary_helper(post) -> dict:
+    return {
+        "view": "summary",
+        "id": str(post["_id"]),
+        "photo_url": post.get("photo_url"),
+        "updated_at": post.get("updated_at"),
+        "general_tags": post.get("general_tags", []),
+        "text_block_count": post.get("text_block_count", 0),
+    }
+
+def post_view(view: str):
+    """(projection, helper) pair for a list endpoint's `view` parameter."""
+    if view == "summary":
+        return POST_SUMMARY_PROJECTION, post_summary_helper
+    return None, post_helper
+
 
 
 
@@ -88,11 +116,14 @@ async def create_post(
         "photo_public_id": upload_result["public_id"],
         "updated_at": datetime.now(timezone.utc),
         "text_blocks": [], # Initialize as empty list
+        **text_block_fields([]),
+        **random_key(),
         "bounding_box_tags": {}, # Initialize as empty dict
         "general_tags": general_tags_str.split(',') if general_tags_str else []
     }
 
     new_post = await post_collection.insert_one(post_document)
+    await tag_stats_service.record_change(None, post_document["general_tags"])
     created_post = await post_collection.find_one({"_id": new_post.inserted_id})
     return post_helper(created_post)
 
@@ -150,6 +181,8 @@ async def create_post_from_url(request: UrlUploadRequest):
             "photo_public_id": upload_result["public_id"],
             "updated_at": datetime.now(timezone.utc),
             "text_blocks": [],
+            **text_block_fields([]),
+            **random_key(),
             "bounding_box_tags": {},
             "general_tags": request.general_tags or [],
             "source_url": request.image_url  # Store original URL for reference
@@ -157,6 +190,7 @@ async def create_post_from_url(request: UrlUploadRequest):
         
         new_post = await post_collection.insert_one(post_document)
         print(f"Post created in MongoDB: {new_post.inserted_id}")
+        await tag_stats_service.record_change(None, post_document["general_tags"])
         created_post = await post_collection.find_one({"_id": new_post.inserted_id})
         return post_helper(created_post)
     except Exception as e:
@@ -179,6 +213,8 @@ async def create_multiple_posts(files: List[UploadFile] = File(...)):
             "photo_public_id": upload_result["public_id"],
             "updated_at": datetime.now(timezone.utc),
             "text_blocks": [],
+            **text_block_fields([]),
+            **random_key(),
             "bounding_box_tags": {},
             "general_tags": []
         }
@@ -216,29 +252,52 @@ async def get_post_by_id(post_id: str):
 
 # More general route comes after
 @router.get("/", response_model=PaginatedPosts)
-async def get_all_posts(page: int = 1, limit: int = 50, tag: Optional[str] = None):
+async def get_all_posts(
+    page: int = 1,
+    limit: int = 50,
+    tag: Optional[str] = None,
+    cursor: Optional[str] = None,
+    view: PostView = "full"
+):
+    """
+    Lists posts newest first.
+    Pass `cursor` (the `next_cursor` of the previous response) for keyset
+    pagination; `page` is kept as a compatibility mode.
+    `view=summary` returns slim PostSummary items (no text blocks etc.).
+    """
+    projection, helper = post_view(view)
+    sort_fields = ["_id"]
     query = {}
     if tag:
         # Corrected field name (no space)
         query["general_tags"] = tag
 
+    if cursor:
+        try:
+            query = apply_cursor(query, cursor, sort_fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        docs = await post_collection.find(query, projection).sort(sort_spec(sort_fields)).limit(limit).to_list(length=limit)
+        return {
+            "posts": [helper(post) for post in docs],
+            "next_cursor": next_cursor_for(docs, limit, sort_fields)
+        }
+
     # Corrected to use the query in count_documents
     total_posts = await post_collection.count_documents(query)
     if total_posts == 0:
         return {"posts": [], "total_pages": 0, "current_page": 1}
 
     skip = (page - 1) * limit
-    posts_cursor = post_collection.find(query).sort("_id", -1).skip(skip).limit(limit)
-
-    posts = []
-    async for post in posts_cursor:
-        posts.append(post_helper(post))
+    posts_cursor = post_collection.find(query, projection).sort(sort_spec(sort_fields)).skip(skip).limit(limit)
+    docs = await posts_cursor.to_list(length=limit)
 
     total_pages = math.ceil(total_posts / limit)
     return {
-        "posts": posts,
+        "posts": [helper(post) for post in docs],
         "total_pages": total_pages,
-        "current_page": page
+        "current_page": page,
+        "next_cursor": next_cursor_for(docs, limit, sort_fields)
     }
 
 @router.patch("/{post_id}", response_model=Post)
@@ -249,17 +308,29 @@ async def update_post(post_id: str, post_data: PostUpdate):
 
     # CRUCIAL: Always update the 'updated_at' timestamp on any edit
     update_data["updated_at"] = datetime.now(timezone.utc)
+    # Keep the denormalized text-feed fields in step with text_blocks
+    if "text_blocks" in update_data:
+        update_data.update(text_block_fields(update_data["text_blocks"]))
 
     try:
         obj_id = ObjectId(post_id)
     except InvalidId:
         raise HTTPException(status_code=400, detail="Invalid ObjectId format")
 
-    result = await post_collection.update_one({"_id": obj_id}, {"$set": update_data})
+    previous_tags = []
+    if "general_tags" in update_data:
+        # The pre-image gives the tag delta for tag_stats in the same round trip
+        previous_post, updated_post = await set_post_fields(obj_id, update_data)
+        if previous_post is not None:
+            previous_tags = previous_post.get("general_tags") or []
+            await tag_stats_service.record_change(previous_tags, update_data["general_tags"])
+    else:
+        updated_post = await update_post_document(obj_id, {"$set": update_data})
 
-    if result.modified_count == 1:
-        if (updated_post := await post_collection.find_one({"_id": obj_id})) is not None:
-            return post_helper(updated_post)
+    if updated_post is not None:
+        if "general_tags" in update_data or "text_blocks" in update_data:
+            await corpus_cache.invalidate(list(previous_tags) + (updated_post.get("general_tags") or []))
+        return post_helper(updated_post)
 
     raise HTTPException(status_code=404, detail=f"Post with id {post_id} not found")
 # --- Refactored DELETE Endpoint ---
@@ -273,57 +344,48 @@ async def delete_post(post_id: str):
     cloudinary.uploader.destroy(post_to_delete["photo_public_id"])
 
     # Delete the post from the database
-    await post_collection.delete_one({"_id": ObjectId(post_id)})
+    result = await post_collection.delete_one({"_id": ObjectId(post_id)})
+    if result.deleted_count == 1:
+        await tag_stats_service.record_change(post_to_delete.get("general_tags"), None)
+        if post_to_delete.get("has_text"):
+            await corpus_cache.invalidate(post_to_delete.get("general_tags"))
     return
 
 
 
 @router.get("/tags/", response_model=List[str])
 async def get_all_unique_tags():
-    tags = await post_collection.distinct("general_tags")
-    return tags
+    # Served from the incrementally maintained tag_stats collection
+    return await tag_stats_service.get_all_tags()
 
 @router.get("/tags/popular", response_model=List[str])
 async def get_popular_tags(limit: int = 10):
     """
     Returns the most popular tags (tags that appear in the most posts).
+    Read from tag_stats (O(number of tags)) instead of aggregating every post.
     """
-    # Aggregate to count tag occurrences
-    pipeline = [
-        {"$unwind": "$general_tags"},  # Flatten the tags array
-        {"$group": {"_id": "$general_tags", "count": {"$sum": 1}}},  # Count occurrences
-        {"$sort": {"count": -1}},  # Sort by count descending
-        {"$limit": limit},  # Limit to top N tags
-        {"$project": {"_id": 0, "tag": "$_id"}}  # Rename _id to tag
-    ]
-    
-    popular_tags = []
-    async for doc in post_collection.aggregate(pipeline):
-        if doc.get("tag"):
-            popular_tags.append(doc["tag"])
-    
-    return popular_tags
+    return await tag_stats_service.get_popular_tags(limit)
 
 
-@router.get("/highlights", response_model=List[Post])
-async def get_highlights():
+@router.get("/highlights", response_model=List[PostListItem])
+async def get_highlights(view: PostView = "full"):
     """
     Fetches the 20 most recently updated posts that have textual content
     (either text blocks or general tags).
     """
+    projection, helper = post_view(view)
     # This query finds documents where EITHER text_blocks OR general_tags is not empty
     query = {
-        "$or": [
-            {"text_blocks": {"$ne": []}},
+        "$or": HAS_TEXT["$or"] + [
             {"general_tags": {"$ne": []}}
         ]
     }
 
-    posts_cursor = post_collection.find(query).sort("updated_at", -1).limit(20)
+    posts_cursor = post_collection.find(query, projection).sort("updated_at", -1).limit(20)
 
     highlights = []
     async for post in posts_cursor:
-        highlights.append(post_helper(post))
+        highlights.append(helper(post))
 
     return highlights
 
@@ -336,29 +398,40 @@ async def get_highlights():
 
 from backend.services.llm_service import llm_service
 from backend.services.editor_llm_service import editor_llm_service
+from backend.services.vision_chat_sessions import vision_chat_sessions, MissingImageError
+from backend.sse import sse_event, sse_response
+
+
+async def _aggregate_tag_text(tag: str) -> str:
+    """Joins the content of every text block on posts carrying the given tag."""
+    async def build() -> str:
+        # Only the non-empty block contents cross the wire (aggregation pipeline)
+        aggregated_text = await extract_corpus({"general_tags": tag})
+        return "\n\n".join(aggregated_text)
+
+    # Shared by /summary/{tag} and /summary/generate_story until a write touches the tag
+    entry = await corpus_cache.get_or_build("tag", [tag], build)
+    return entry.text
 
 @router.get("/summary/{tag}")
-async def get_tag_summary(tag: str):
+async def get_tag_summary(tag: str, mode: SummaryMode = "auto"):
     """
     Aggregates text from all posts with the given tag and generates a summary and plot suggestions using LLM.
+
+    `mode=packed` summarizes the corpus packed into one prompt (large tags are cut
+    to the token budget); `mode=hierarchical` map-reduces over the whole corpus.
+    `auto` (default) uses hierarchical only when the corpus exceeds the budget.
     """
-    # Find all posts that have the specified tag in their general_tags list
-    query = {"general_tags": tag}
-    posts_cursor = post_collection.find(query)
+    full_text = await _aggregate_tag_text(tag)
     
-    aggregated_text = []
-    
-    async for post in posts_cursor:
-        # Extract text from text_blocks
-        if "text_blocks" in post:
-            for block in post["text_blocks"]:
-                if "content" in block and block["content"]:
-                    aggregated_text.append(block["content"])
-                    
-    full_text = "\n\n".join(aggregated_text)
+    if mode == "auto":
+        mode = "hierarchical" if count_tokens(full_text) > settings.CORPUS_TOKENS_SUMMARY else "packed"
     
     # Generate summary and plots
-    result = llm_service.generate_summary_and_plots(full_text)
+    if mode == "hierarchical":
+        result = await llm_service.generate_hierarchical_summary(full_text)
+    else:
+        result = await llm_service.generate_summary_and_plots(full_text)
     
     return result
 
@@ -367,23 +440,10 @@ async def generate_story(request: StoryGenerationRequest):
     """
     Generates a long story based on the aggregated text of a tag, a plot suggestion, and user commentary.
     """
-    # Find all posts that have the specified tag in their general_tags list
-    query = {"general_tags": request.tag}
-    posts_cursor = post_collection.find(query)
-    
-    aggregated_text = []
-    
-    async for post in posts_cursor:
-        # Extract text from text_blocks
-        if "text_blocks" in post:
-            for block in post["text_blocks"]:
-                if "content" in block and block["content"]:
-                    aggregated_text.append(block["content"])
-                    
-    full_text = "\n\n".join(aggregated_text)
+    full_text = await _aggregate_tag_text(request.tag)
     
     # Generate story
-    result = llm_service.generate_story_from_plot(
+    result = await llm_service.generate_story_from_plot(
         aggregated_text=full_text,
         plot_suggestion=request.plot_suggestion,
         user_commentary=request.user_commentary
@@ -391,31 +451,49 @@ async def generate_story(request: StoryGenerationRequest):
     
     return result
 
-@router.get("/untagged/random", response_model=List[Post])
-async def get_random_untagged_posts(limit: int = 5):
+@router.post("/summary/generate_story/stream")
+async def generate_story_stream(request: StoryGenerationRequest):
+    """
+    Streaming variant of /summary/generate_story (Server-Sent Events).
+    Emits 'token' events with story prose as it is generated and a final
+    'done' event with the same shape as the blocking endpoint ({"story": ...}).
+    """
+    full_text = await _aggregate_tag_text(request.tag)
+
+    async def events():
+        parts = []
+        try:
+            async for token in llm_service.stream_story_from_plot(
+                aggregated_text=full_text,
+                plot_suggestion=request.plot_suggestion,
+                user_commentary=request.user_commentary
+            ):
+                parts.append(token)
+                yield sse_event("token", {"text": token})
+            yield sse_event("done", {"story": "".join(parts).strip()})
+        except Exception as e:
+            print(f"Error in streaming story generation: {e}")
+            yield sse_event("error", {"detail": str(e)})
+
+    return sse_response(events())
+
+@router.get("/untagged/random", response_model=List[PostListItem])
+async def get_random_untagged_posts(
+    limit: int = 5,
+    exclude_ids: Optional[List[str]] = Query(None),
+    view: PostView = "full"
+):
     """
     Fetches random posts that have no general_tags or empty general_tags.
+    Pass `exclude_ids` (repeatable) to skip posts already shown this session.
     """
-    # Query for posts with no general_tags or empty general_tags
-    query = {
-        "$or": [
-            {"general_tags": {"$exists": False}},
-            {"general_tags": []},
-            {"general_tags": {"$eq": None}}
-        ]
-    }
-    
-    # Get all matching posts
-    posts_cursor = post_collection.find(query)
-    all_posts = []
-    async for post in posts_cursor:
-        all_posts.append(post_helper(post))
-    
-    # Randomly select up to 'limit' posts
-    if len(all_posts) <= limit:
-        return all_posts
-    else:
-        return random.sample(all_posts, limit)
+    # Missing, null and [] general_tags, as one index-backed $in
+    query = {"general_tags": {"$in": [None, []]}}
+
+    # Per-item random lookups on the indexed rand key: only `limit` posts are read
+    projection, helper = post_view(view)
+    posts = await sample_posts(query, limit, exclude_ids=exclude_ids, projection=projection)
+    return [helper(post) for post in posts]
 
 @router.patch("/{post_id}/add-tag", response_model=Post)
 async def add_tag_to_post(post_id: str, request: AddTagRequest):
@@ -427,34 +505,20 @@ async def add_tag_to_post(post_id: str, request: AddTagRequest):
     except InvalidId:
         raise HTTPException(status_code=400, detail="Invalid ObjectId format")
     
-    # Get the current post
-    post = await post_collection.find_one({"_id": obj_id})
-    if not post:
-        raise HTTPException(status_code=404, detail=f"Post with id {post_id} not found")
-    
-    # Get current tags or initialize empty list
-    current_tags = post.get("general_tags", []) or []
-    
-    # Add tag if it doesn't exist
-    if request.tag not in current_tags:
-        current_tags.append(request.tag)
-    
-    # Update the post
-    update_data = {
-        "general_tags": current_tags,
-        "updated_at": datetime.now(timezone.utc)
-    }
-    
-    result = await post_collection.update_one(
-        {"_id": obj_id},
-        {"$set": update_data}
+    # Add the tag server-side (no-op if present) and get the post back in one trip
+    updated_post, tag_added = await add_tag_to_post_document(
+        obj_id,
+        request.tag,
+        {"$set": {"updated_at": datetime.now(timezone.utc)}}
     )
+    if updated_post is None:
+        raise HTTPException(status_code=404, detail=f"Post with id {post_id} not found")
     
-    if result.modified_count == 1 or result.matched_count == 1:
-        updated_post = await post_collection.find_one({"_id": obj_id})
-        return post_helper(updated_post)
-    
-    raise HTTPException(status_code=500, detail="Failed to update post")
+    if tag_added:
+        await tag_stats_service.record_change(None, [request.tag])
+        if updated_post.get("has_text"):
+            await corpus_cache.invalidate([request.tag])
+    return post_helper(updated_post)
 
 @router.patch("/{post_id}/add-tag-and-story", response_model=Post)
 async def add_tag_and_story_to_post(post_id: str, request: AddTagAndStoryRequest):
@@ -467,21 +531,6 @@ async def add_tag_and_story_to_post(post_id: str, request: AddTagAndStoryRequest
     except InvalidId:
         raise HTTPException(status_code=400, detail="Invalid ObjectId format")
     
-    # Get the current post
-    post = await post_collection.find_one({"_id": obj_id})
-    if not post:
-        raise HTTPException(status_code=404, detail=f"Post with id {post_id} not found")
-    
-    # Get current tags or initialize empty list
-    current_tags = post.get("general_tags", []) or []
-    
-    # Add tag if it doesn't exist
-    if request.tag not in current_tags:
-        current_tags.append(request.tag)
-    
-    # Get current text blocks or initialize empty list
-    current_text_blocks = post.get("text_blocks", []) or []
-    
     # Create a new text block for the story
     # Use 'paragraph' type for the story, or you could use a custom type like 'story'
     new_story_block = {
@@ -491,26 +540,16 @@ async def add_tag_and_story_to_post(post_id: str, request: AddTagAndStoryRequest
         "color": None
     }
     
-    # Add the story block to the text blocks
-    current_text_blocks.append(new_story_block)
-    
-    # Update the post with both tag and story
-    update_data = {
-        "general_tags": current_tags,
-        "text_blocks": current_text_blocks,
-        "updated_at": datetime.now(timezone.utc)
-    }
-    
-    result = await post_collection.update_one(
-        {"_id": obj_id},
-        {"$set": update_data}
-    )
-    
-    if result.modified_count == 1 or result.matched_count == 1:
-        updated_post = await post_collection.find_one({"_id": obj_id})
-        return post_helper(updated_post)
+    # Push the story block and add the tag (if missing) in a single write
+    update = push_text_blocks({"$set": {"updated_at": datetime.now(timezone.utc)}}, [new_story_block])
+    updated_post, tag_added = await add_tag_to_post_document(obj_id, request.tag, update)
+    if updated_post is None:
+        raise HTTPException(status_code=404, detail=f"Post with id {post_id} not found")
     
-    raise HTTPException(status_code=500, detail="Failed to update post")
+    if tag_added:
+        await tag_stats_service.record_change(None, [request.tag])
+    await corpus_cache.invalidate(updated_post.get("general_tags"))
+    return post_helper(updated_post)
 
 @router.post("/summary/generate_story_flow")
 async def generate_story_flow(request: StoryFlowRequest):
@@ -518,7 +557,11 @@ async def generate_story_flow(request: StoryFlowRequest):
     Generates a summarized flow of the story in phrases/keywords (ev1->ev2->ev3 format).
     detail_level: "small" (3-5 events), "med" (5-10 events), "big" (10-15 events)
     """
-    result = llm_service.generate_story_flow(request.story, request.detail_level)
+    result = await llm_service.generate_story_flow(
+        request.story,
+        request.detail_level,
+        bypass_cache=request.bypass_cache
+    )
     return result
 
 @router.post("/suggestions/generate")
@@ -528,7 +571,7 @@ async def generate_post_suggestion(request: PostSuggestionRequest):
     """
     # Convert Pydantic models to dict for LLM service
     text_blocks_dict = [block.dict() for block in request.text_blocks]
-    result = editor_llm_service.generate_post_suggestion(
+    result = await editor_llm_service.generate_post_suggestion(
         text_blocks=text_blocks_dict,
         suggestion_type=request.suggestion_type,
         user_commentary=request.user_commentary or ""
@@ -545,7 +588,7 @@ async def vision_chat(request: VisionChatRequest):
     text_blocks_dict = [block.dict() for block in request.text_blocks] if request.text_blocks else []
     conversation_dict = [msg.dict() for msg in request.conversation_history] if request.conversation_history else []
     
-    result = editor_llm_service.chat_with_vision(
+    result = await editor_llm_service.chat_with_vision(
         image_url=request.image_url,
         text_blocks=text_blocks_dict,
         user_message=request.user_message,
@@ -553,12 +596,89 @@ async def vision_chat(request: VisionChatRequest):
     )
     return result
 
+@router.post("/chat/vision/stream")
+async def vision_chat_stream(request: VisionChatRequest):
+    """
+    Streaming variant of /chat/vision (Server-Sent Events).
+    Emits 'draft' events from the vision stage, 'token' events for the final
+    answer and a closing 'done' event with {"response": ...}.
+    """
+    text_blocks_dict = [block.dict() for block in request.text_blocks] if request.text_blocks else []
+    conversation_dict = [msg.dict() for msg in request.conversation_history] if request.conversation_history else []
+
+    async def events():
+        response_parts = []
+        try:
+            async for event, text in editor_llm_service.stream_chat_with_vision(
+                image_url=request.image_url,
+                text_blocks=text_blocks_dict,
+                user_message=request.user_message,
+                conversation_history=conversation_dict
+            ):
+                if event == "token":
+                    response_parts.append(text)
+                yield sse_event(event, {"text": text})
+            yield sse_event("done", {"response": "".join(response_parts).strip()})
+        except Exception as e:
+            print(f"Error in streaming vision chat: {e}")
+            yield sse_event("error", {"detail": str(e)})
+
+    return sse_response(events())
+
+@router.post("/chat/vision/sessions", response_model=VisionChatSession, status_code=201)
+async def create_vision_chat_session(request: VisionChatSessionCreate):
+    """
+    Starts a server-side vision chat session.
+    With post_id, the image and text blocks are read from the post; the image
+    is analysed once here instead of on every turn.
+    """
+    if not request.post_id and not request.image_url:
+        raise HTTPException(status_code=400, detail="Provide post_id or image_url")
+
+    try:
+        session = await vision_chat_sessions.create(
+            post_id=request.post_id,
+            image_url=request.image_url,
+            text_blocks=[block.dict() for block in request.text_blocks] if request.text_blocks else []
+        )
+    except MissingImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Post with id {request.post_id} not found")
+    return session
+
+@router.get("/chat/vision/sessions/{session_id}", response_model=VisionChatSession)
+async def get_vision_chat_session(session_id: str):
+    """Returns a vision chat session's state (analysis, summary, recent messages)."""
+    session = await vision_chat_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Vision chat session not found or expired")
+    return session
+
+@router.post("/chat/vision/sessions/{session_id}/messages", response_model=VisionChatTurn)
+async def send_vision_chat_message(session_id: str, request: VisionChatSessionMessage):
+    """
+    One turn of a vision chat session: only the new message is sent; image
+    analysis, block context and history are kept on the server.
+    """
+    response = await vision_chat_sessions.send(session_id, request.message, look_again=request.look_again)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Vision chat session not found or expired")
+    return {"session_id": session_id, "response": response}
+
+@router.delete("/chat/vision/sessions/{session_id}", status_code=204)
+async def delete_vision_chat_session(session_id: str):
+    """Ends a vision chat session."""
+    if not await vision_chat_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Vision chat session not found or expired")
+    return
+
 @router.post("/rewrite/vision")
 async def vision_rewrite(request: VisionRewriteRequest):
     """
     Rewrites a text block with awareness of the image content.
     """
-    result = editor_llm_service.rewrite_with_vision(
+    result = await editor_llm_service.rewrite_with_vision(
         image_url=request.image_url,
         block_content=request.block_content,
         rewrite_instruction=request.rewrite_instruction or ""
@@ -573,10 +693,35 @@ async def expand_flow_node(request: NodeExpansionRequest):
     
     Called when user clicks on a node in the StoryFlow visualization.
     """
-    result = editor_llm_service.generate_node_expansion(
+    result = await editor_llm_service.generate_node_expansion(
         node_text=request.node_text,
         image_url=request.image_url,
         story_context=request.story_context
     )
     return result
 
+@router.post("/flow/expand-node/stream")
+async def expand_flow_node_stream(request: NodeExpansionRequest):
+    """
+    Streaming variant of /flow/expand-node (Server-Sent Events).
+    Emits 'draft' events for the visual analysis, 'token' events for the
+    literary expansion and a closing 'done' event with {"expansion": ...}.
+    """
+    async def events():
+        expansion_parts = []
+        try:
+            async for event, text in editor_llm_service.stream_node_expansion(
+                node_text=request.node_text,
+                image_url=request.image_url,
+                story_context=request.story_context
+            ):
+                if event == "token":
+                    expansion_parts.append(text)
+                yield sse_event(event, {"text": text})
+            yield sse_event("done", {"expansion": "".join(expansion_parts).strip()})
+        except Exception as e:
+            print(f"Error in streaming node expansion: {e}")
+            yield sse_event("error", {"detail": str(e)})
+
+    return sse_response(events())
+
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Literal, Union
+from typing_extensions import Annotated
 from datetime import datetime
 import uuid
 
@@ -14,6 +15,7 @@ class StoryBlock(BaseModel):
     associated_image_id: Optional[str] = None
     image_url: Optional[str] = None
     coherence_score: Optional[float] = None
+    segment_hash: Optional[str] = None  # Content hash when last segmented (see story_block_service)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -32,6 +34,7 @@ class Epic(BaseModel):
     Main schema for Epic/Novel story.
     Represents a complete multi-block story with associated images.
     """
+    view: Literal["full"] = "full"
     id: str
     title: str
     description: Optional[str] = None
@@ -44,6 +47,35 @@ class Epic(BaseModel):
     metadata: EpicMetadata = Field(default_factory=EpicMetadata)
 
 
+class EpicSummary(BaseModel):
+    """
+    Slim epic shape for listings (view=summary): no story blocks.
+    """
+    view: Literal["summary"] = "summary"
+    id: str
+    title: str
+    description: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    status: str = "draft"
+    generation_mode: str
+    source_tags: List[str] = []
+    metadata: EpicMetadata = Field(default_factory=EpicMetadata)
+
+
+# "full" returns whole epics; "summary" leaves out story_blocks
+EpicView = Literal["full", "summary"]
+
+# How a story is cut into blocks (see services/story_block_service.py);
+# "texttiling" is local and skips the LLM round trip
+SegmentationMode = Literal["boundaries", "full_text", "texttiling"]
+
+# Coherence scoring for POST /epics/{id}/rescore: batched LLM or local lexical
+CoherenceScorer = Literal["llm", "lexical"]
+
+EpicListItem = Annotated[Union[Epic, EpicSummary], Field(discriminator="view")]
+
+
 class EpicCreate(BaseModel):
     """
     Schema for creating a new epic.
@@ -76,6 +108,7 @@ class FullStoryGenerationRequest(BaseModel):
     use_all_text: bool = True  # If True, use all text_blocks; if False, use only selected tags
     generation_prompt: str
     user_commentary: Optional[str] = None
+    segmentation_mode: Optional[SegmentationMode] = None  # Default: settings.SEGMENTATION_MODE
 
 
 class StoryCompletionRequest(BaseModel):
@@ -115,11 +148,41 @@ class AddVisionTextToPostRequest(BaseModel):
     text_type: str = "paragraph"  # Type of text block
 
 
+class StoryBlockPage(BaseModel):
+    """
+    One page of an epic's story blocks, in sequence order.
+    """
+    blocks: List[StoryBlock]
+    next_after: Optional[int] = None  # Pass as `after` for the next page (None on the last page)
+
+
+class CharacterNote(BaseModel):
+    """
+    A character as tracked by an epic's narrative memory.
+    """
+    name: str
+    notes: str = ""
+
+
+class NarrativeMemory(BaseModel):
+    """
+    Running memory of an epic used for continuation prompts.
+    Covers blocks up to `summarized_through`; later blocks are sent verbatim.
+    """
+    summary: str = ""
+    characters: List[CharacterNote] = []
+    threads: List[str] = []
+    summarized_through: int = 0  # sequence_order of the last folded block
+    updated_at: Optional[datetime] = None
+
+
 class PaginatedEpics(BaseModel):
     """
     Paginated response for epic listings.
     """
-    epics: List[Epic]
-    total_pages: int
-    current_page: int
-    total_count: int
+    epics: List[EpicListItem]
+    # Page mode fills the counts; cursor mode skips them
+    total_pages: Optional[int] = None
+    current_page: Optional[int] = None
+    total_count: Optional[int] = None
+    next_cursor: Optional[str] = None  # Opaque token for the next page (None on the last page)
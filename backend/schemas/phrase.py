@@ -20,7 +20,8 @@ class PhraseLearning(BaseModel):
     id: Optional[str] = None
     user_id: str = "default"  # For future multi-user support
     enhancement: PhraseEnhancement
-    embedding: Optional[List[float]] = None  # Vector embedding of enhanced phrase
+    embedding: Optional[bytes] = None  # float32 hashing vector of the learning text (services/text_vectorizer.py)
+    embedding_model: Optional[str] = None  # Vectorizer version that produced `embedding`
     usage_count: int = 0  # How many times this learning was applied
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -1,6 +1,7 @@
 # BaseModel is the foundational Pydantic class that all pydantic schemas inherit from
 from pydantic import BaseModel, Field
-from typing import Optional,Dict, List
+from typing import Optional,Dict, List, Literal, Union
+from typing_extensions import Annotated
 from datetime import datetime
 import uuid
 
@@ -27,8 +28,15 @@ class Highlight(BaseModel):
     block_id: Optional[str] = None  # Which text block it came from
     created_at: Optional[datetime] = None
 
+# "full" returns whole posts; "summary" projects only what gallery grids render
+PostView = Literal["full", "summary"]
+
+# /summary/{tag}: single packed prompt, map-reduce over the whole corpus, or pick by size
+SummaryMode = Literal["auto", "packed", "hierarchical"]
+
 # main schema for post object, used for response
 class Post(BaseModel):
+    view: Literal["full"] = "full"
     id: str
     photo_url: str
     photo_public_id: str
@@ -39,6 +47,17 @@ class Post(BaseModel):
     associated_epics: Optional[List[EpicRef]] = []
     highlights: Optional[List[Highlight]] = []  # NEW: Underlined text collection
 
+# slim schema for list endpoints called with view=summary
+class PostSummary(BaseModel):
+    view: Literal["summary"] = "summary"
+    id: str
+    photo_url: str
+    updated_at: Optional[datetime] = None
+    general_tags: Optional[List[str]] = None
+    text_block_count: int = 0
+
+PostListItem = Annotated[Union[Post, PostSummary], Field(discriminator="view")]
+
 class PostUpdate(BaseModel):
     text_blocks: Optional[List[TextBlock]] = None
     bounding_box_tags: Optional[dict[str, BoundingBox]] = None
@@ -46,9 +65,11 @@ class PostUpdate(BaseModel):
     highlights: Optional[List[Highlight]] = None  # NEW: Can update highlights
 
 class PaginatedPosts(BaseModel):
-    posts: List[Post]
-    total_pages: int
-    current_page: int
+    posts: List[PostListItem]
+    # Page mode fills total_pages/current_page; cursor mode skips the count
+    total_pages: Optional[int] = None
+    current_page: Optional[int] = None
+    next_cursor: Optional[str] = None  # Opaque token for the next page (None on the last page)
 
 class StoryGenerationRequest(BaseModel):
     tag: str
@@ -65,6 +86,7 @@ class AddTagAndStoryRequest(BaseModel):
 class StoryFlowRequest(BaseModel):
     story: str
     detail_level: Optional[str] = "med"  # "small", "med", "big"
+    bypass_cache: bool = False  # Force a fresh generation instead of the cached flow
 
 class PostSuggestionRequest(BaseModel):
     text_blocks: List[TextBlock]
@@ -81,6 +103,31 @@ class VisionChatRequest(BaseModel):
     user_message: str
     conversation_history: Optional[List[ChatMessage]] = []
 
+class VisionChatSessionCreate(BaseModel):
+    # Either a post (image and text blocks are read server-side) or an image URL
+    post_id: Optional[str] = None
+    image_url: Optional[str] = None
+    text_blocks: Optional[List[TextBlock]] = []
+
+class VisionChatSessionMessage(BaseModel):
+    message: str
+    look_again: bool = False  # Re-send the image to the vision model for this turn
+
+class VisionChatSession(BaseModel):
+    session_id: str
+    image_url: str
+    post_id: Optional[str] = None
+    image_analysis: str
+    summary: str = ""  # Compacted conversation older than `recent`
+    recent: List[ChatMessage] = []
+    turns: int = 0
+    created_at: datetime
+    last_active_at: datetime
+
+class VisionChatTurn(BaseModel):
+    session_id: str
+    response: str
+
 class VisionRewriteRequest(BaseModel):
     image_url: str
     block_content: str
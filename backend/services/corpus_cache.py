@@ -0,0 +1,150 @@
+"""
+Corpus Cache - built prompt corpora keyed by tag set.
+
+/summary/{tag}, /summary/generate_story and epic generation often rebuild
+the same corpus seconds apart. Built corpora are stored in `corpus_cache`
+as {kind, tags, all_posts, text, content_hash, token_count}. Post writers
+that change text_blocks or general_tags call invalidate() with the post's
+tags, which drops only the entries for those tags (plus all-posts corpora).
+A TTL index bounds the lifetime of any entry a racing write could have left
+stale. Each corpus is one document, so corpora over CORPUS_CACHE_MAX_BYTES
+(kept well below MongoDB's 16 MB document limit) are built but not stored.
+
+Identical corpora have identical content hashes and produce identical
+prompts, so the LLM response cache (keyed by prompt content) hits for them.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+from pydantic import BaseModel
+
+from backend.config import settings
+from backend.database import corpus_cache_collection
+from backend.services.corpus_packer import count_tokens
+
+
+class CorpusEntry(BaseModel):
+    """A built corpus."""
+    text: str
+    content_hash: str
+    token_count: int
+    cached: bool = False
+
+
+class CorpusCache:
+    """MongoDB-backed cache of built corpora with per-tag invalidation."""
+
+    def __init__(self, collection, max_bytes: int):
+        """
+        Args:
+            collection: corpus_cache collection
+            max_bytes: Largest corpus text (UTF-8) that is stored
+        """
+        self.collection = collection
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.oversize = 0
+
+    @staticmethod
+    def make_key(kind: str, tags: Optional[Iterable[str]]) -> str:
+        """Key for a corpus kind and tag set (None = all posts)."""
+        tag_list = sorted(set(tags)) if tags else None
+        raw = json.dumps({"kind": kind, "tags": tag_list}, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get_or_build(
+        self,
+        kind: str,
+        tags: Optional[List[str]],
+        builder: Callable[[], Awaitable[str]]
+    ) -> CorpusEntry:
+        """
+        Return the cached corpus or build and store it.
+
+        Args:
+            kind: Corpus flavor (e.g. "tag", "epic:2000"); part of the key
+            tags: Tag set the corpus is built from (None/[] for all posts)
+            builder: Coroutine function producing the corpus text
+
+        Returns:
+            CorpusEntry (cached=True when served from the cache)
+        """
+        key = self.make_key(kind, tags)
+        try:
+            doc = await self.collection.find_one({"_id": key}, {"text": 1, "content_hash": 1, "token_count": 1})
+        except Exception as e:
+            print(f"⚠️ Corpus cache lookup failed: {e}")
+            doc = None
+
+        if doc is not None:
+            self.hits += 1
+            return CorpusEntry(
+                text=doc["text"],
+                content_hash=doc["content_hash"],
+                token_count=doc["token_count"],
+                cached=True
+            )
+
+        self.misses += 1
+        text = await builder()
+        encoded = text.encode("utf-8")
+        entry = CorpusEntry(
+            text=text,
+            content_hash=hashlib.sha256(encoded).hexdigest(),
+            token_count=count_tokens(text)
+        )
+        if len(encoded) > self.max_bytes:
+            # Would fail (or crowd) the document size limit; rebuilt per request
+            self.oversize += 1
+            print(f"⚠️ Corpus for {kind} {tags or 'all posts'} is {len(encoded)} bytes, not cached")
+            return entry
+        try:
+            await self.collection.replace_one(
+                {"_id": key},
+                {
+                    "_id": key,
+                    "kind": kind,
+                    "tags": sorted(set(tags)) if tags else [],
+                    "all_posts": not tags,
+                    "text": entry.text,
+                    "content_hash": entry.content_hash,
+                    "token_count": entry.token_count,
+                    "created_at": datetime.now(timezone.utc),
+                },
+                upsert=True
+            )
+        except Exception as e:
+            print(f"⚠️ Corpus cache write failed: {e}")
+        return entry
+
+    async def invalidate(self, tags: Optional[Iterable[str]]) -> None:
+        """
+        Drop corpora a write to a post with these tags can have changed.
+
+        Args:
+            tags: The post's tags before and after the write
+        """
+        tag_list = [tag for tag in set(tags or []) if tag]
+        query = {"$or": [{"all_posts": True}, {"tags": {"$in": tag_list}}]} if tag_list else {"all_posts": True}
+        try:
+            await self.collection.delete_many(query)
+        except Exception as e:
+            print(f"⚠️ Corpus cache invalidation failed: {e}")
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this worker process."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "oversize": self.oversize,
+        }
+
+
+# Singleton instance
+corpus_cache = CorpusCache(corpus_cache_collection, max_bytes=settings.CORPUS_CACHE_MAX_BYTES)
@@ -0,0 +1,55 @@
+"""
+Corpus Extractor - server-side extraction of post text for LLM prompts.
+
+A single aggregation pipeline $match-es the posts, $unwind-s their
+text_blocks and $project-s only non-empty `content` strings, so image URLs,
+bounding boxes, highlights and the rest of each post never leave MongoDB.
+Results are streamed in CORPUS_BATCH_SIZE batches.
+"""
+
+from typing import List, Optional
+
+from backend.config import settings
+from backend.database import post_collection
+from backend.services.post_fields import HAS_TEXT
+
+
+def corpus_pipeline(match: dict, sort: Optional[dict] = None) -> list:
+    """
+    Aggregation stages yielding one {"content": str} document per non-empty text block.
+
+    Args:
+        match: Post filter (HAS_TEXT is added so the (has_text, ...) index is used)
+        sort: Optional post order, e.g. {"updated_at": -1}
+    """
+    pipeline = [{"$match": {"$and": [match, HAS_TEXT]} if match else HAS_TEXT}]
+    if sort:
+        pipeline.append({"$sort": sort})
+    pipeline += [
+        {"$project": {"_id": 0, "text_blocks.content": 1}},
+        {"$unwind": "$text_blocks"},
+        {"$project": {"content": "$text_blocks.content"}},
+        {"$match": {"content": {"$type": "string", "$regex": r"\S"}}},
+    ]
+    return pipeline
+
+
+def corpus_cursor(match: dict, sort: Optional[dict] = None, batch_size: Optional[int] = None):
+    """
+    Open a streaming cursor over the text blocks of the matching posts.
+    Close it (await cursor.close()) when stopping early.
+    """
+    return post_collection.aggregate(
+        corpus_pipeline(match, sort),
+        batchSize=batch_size or settings.CORPUS_BATCH_SIZE
+    )
+
+
+async def extract_corpus(match: dict, sort: Optional[dict] = None) -> List[str]:
+    """
+    All non-empty text block contents of the matching posts.
+
+    Returns:
+        Block contents in post order
+    """
+    return [doc["content"] async for doc in corpus_cursor(match, sort)]
@@ -0,0 +1,260 @@
+"""
+Corpus Packer - fit post text into an LLM prompt by tokens, not characters.
+
+Text blocks are deduplicated (exact, after whitespace/case normalization,
+and near-duplicates by word-shingle Jaccard similarity) and then packed
+whole, in order, until the token budget is used. A block that does not fit
+is skipped rather than cut mid-sentence, and later shorter blocks can still
+use the remaining space. Every pack reports what was dropped and why.
+
+Token counts are estimated locally: the Groq-hosted models' tokenizers are
+not available offline, so words and punctuation are counted as BPE pieces,
+with long words costing extra pieces. This tracks real counts closely
+enough for budgeting and costs microseconds per block.
+"""
+
+import hashlib
+import re
+import sys
+from typing import Dict, Iterable, List, Set, Tuple
+
+from pydantic import BaseModel
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+_WORD_RE = re.compile(r"\w+")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Stop feeding blocks once less than this many tokens of budget remain
+_MIN_USEFUL_TOKENS = 24
+
+
+def count_tokens(text: str) -> int:
+    """Estimated token count of a text."""
+    pieces = _PIECE_RE.findall(text)
+    return len(pieces) + sum(len(piece) // 6 for piece in pieces)
+
+
+class PackResult(BaseModel):
+    """Packed corpus plus a report of what was left out."""
+    text: str = ""
+    tokens: int = 0
+    token_budget: int = 0
+    blocks_seen: int = 0
+    blocks_packed: int = 0
+    duplicates_dropped: int = 0
+    near_duplicates_dropped: int = 0
+    over_budget_dropped: int = 0
+    tokens_dropped: int = 0
+
+    def report(self) -> dict:
+        """Summary of the pack for API responses and logs."""
+        return self.model_dump(exclude={"text"})
+
+
+class CorpusPacker:
+    """
+    Incremental packer: feed blocks with add() (e.g. straight from a cursor)
+    and stop reading once `full` is set.
+    """
+
+    def __init__(
+        self,
+        token_budget: int,
+        near_duplicate_threshold: float = 0.8,
+        shingle_size: int = 3,
+        separator: str = "\n\n"
+    ):
+        """
+        Args:
+            token_budget: Maximum estimated tokens of packed text
+            near_duplicate_threshold: Jaccard similarity at which a block counts as a near-duplicate
+            shingle_size: Words per shingle for near-duplicate detection
+            separator: Joiner between packed blocks
+        """
+        self.token_budget = token_budget
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.shingle_size = shingle_size
+        self.separator = separator
+        self._separator_tokens = count_tokens(separator)
+        self._blocks: List[str] = []
+        self._hashes: Set[str] = set()
+        self._shingles: List[Set[tuple]] = []
+        self._shingle_index: Dict[tuple, List[int]] = {}
+        self._result = PackResult(token_budget=token_budget)
+
+    @property
+    def full(self) -> bool:
+        """No meaningful budget left."""
+        return self.token_budget - self._result.tokens < _MIN_USEFUL_TOKENS
+
+    def _shingle(self, words: List[str]) -> Set[tuple]:
+        n = self.shingle_size
+        return {tuple(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+    def _is_near_duplicate(self, shingles: Set[tuple]) -> bool:
+        """Compare only against kept blocks sharing at least one shingle."""
+        overlap: Dict[int, int] = {}
+        for shingle in shingles:
+            for idx in self._shingle_index.get(shingle, ()):
+                overlap[idx] = overlap.get(idx, 0) + 1
+        for idx, shared in overlap.items():
+            union = len(shingles) + len(self._shingles[idx]) - shared
+            if union and shared / union >= self.near_duplicate_threshold:
+                return True
+        return False
+
+    def add(self, block: str) -> bool:
+        """
+        Offer one text block.
+
+        Returns:
+            True if the block was packed
+        """
+        text = " ".join(block.split())
+        if not text:
+            return False
+        result = self._result
+        result.blocks_seen += 1
+        tokens = count_tokens(text)
+
+        key = hashlib.sha1(text.lower().encode("utf-8")).hexdigest()
+        if key in self._hashes:
+            result.duplicates_dropped += 1
+            result.tokens_dropped += tokens
+            return False
+
+        words = _WORD_RE.findall(text.lower())
+        shingles = self._shingle(words) if len(words) >= self.shingle_size else set()
+        if shingles and self._is_near_duplicate(shingles):
+            result.near_duplicates_dropped += 1
+            result.tokens_dropped += tokens
+            return False
+
+        cost = tokens + (self._separator_tokens if self._blocks else 0)
+        if result.tokens + cost > self.token_budget:
+            result.over_budget_dropped += 1
+            result.tokens_dropped += tokens
+            return False
+
+        self._hashes.add(key)
+        idx = len(self._shingles)
+        self._shingles.append(shingles)
+        for shingle in shingles:
+            self._shingle_index.setdefault(shingle, []).append(idx)
+        self._blocks.append(text)
+        result.tokens += cost
+        result.blocks_packed += 1
+        return True
+
+    @property
+    def blocks(self) -> List[str]:
+        """Packed blocks (normalized), in order."""
+        return list(self._blocks)
+
+    def result(self) -> PackResult:
+        """The packed text and drop report."""
+        self._result.text = self.separator.join(self._blocks)
+        return self._result
+
+
+def pack_blocks(blocks: Iterable[str], token_budget: int, **options) -> PackResult:
+    """
+    Deduplicate and pack whole text blocks into a token budget.
+
+    Args:
+        blocks: Text blocks in priority order
+        token_budget: Maximum estimated tokens
+        **options: CorpusPacker options
+
+    Returns:
+        PackResult with the packed text and a drop report
+    """
+    packer = CorpusPacker(token_budget, **options)
+    for block in blocks:
+        packer.add(block)
+    return packer.result()
+
+
+def pack_text(text: str, token_budget: int, **options) -> PackResult:
+    """pack_blocks for a corpus already joined with blank lines."""
+    return pack_blocks(text.split("\n\n"), token_budget, **options)
+
+
+def _split_oversized(text: str, max_tokens: int) -> List[str]:
+    """Split one block that exceeds max_tokens at sentence (then word) boundaries."""
+    pieces: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for sentence in _SENTENCE_END_RE.split(text):
+        units = [sentence] if count_tokens(sentence) <= max_tokens else sentence.split()
+        for unit in units:
+            tokens = count_tokens(unit)
+            if current and current_tokens + tokens > max_tokens:
+                pieces.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(unit)
+            current_tokens += tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_blocks(
+    blocks: Iterable[str],
+    chunk_tokens: int,
+    boundary_divisor: int = 4,
+    **options
+) -> Tuple[List[str], PackResult]:
+    """
+    Deduplicate a whole corpus and split it into token-bounded chunks.
+
+    Chunk boundaries are content-defined: once a chunk holds half its budget,
+    it closes after any block whose hash is divisible by `boundary_divisor`
+    (and always before it would overflow). Inserting or editing a block then
+    only moves the boundaries next to it, so the other chunks keep their exact
+    text - and their cached summaries.
+
+    Args:
+        blocks: Text blocks in corpus order
+        chunk_tokens: Maximum estimated tokens per chunk
+        boundary_divisor: Average spacing (in blocks) of content-defined boundaries
+        **options: CorpusPacker options
+
+    Returns:
+        (chunk texts, dedup report of the whole corpus)
+    """
+    packer = CorpusPacker(sys.maxsize, **options)
+    for block in blocks:
+        packer.add(block)
+    report = packer.result()
+    report.text = ""
+    report.token_budget = 0
+
+    separator = packer.separator
+    separator_tokens = count_tokens(separator)
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    def close() -> None:
+        nonlocal current, current_tokens
+        if current:
+            chunks.append(separator.join(current))
+        current, current_tokens = [], 0
+
+    for block in packer.blocks:
+        tokens = count_tokens(block)
+        pieces = [block] if tokens <= chunk_tokens else _split_oversized(block, chunk_tokens)
+        for piece in pieces:
+            tokens = count_tokens(piece)
+            cost = tokens + (separator_tokens if current else 0)
+            if current and current_tokens + cost > chunk_tokens:
+                close()
+                cost = tokens
+            current.append(piece)
+            current_tokens += cost
+            digest = int(hashlib.sha1(piece.encode("utf-8")).hexdigest()[:8], 16)
+            if current_tokens >= chunk_tokens // 2 and digest % boundary_divisor == 0:
+                close()
+    close()
+    return chunks, report
@@ -1,22 +1,18 @@
 import json
-from groq import Groq
+from typing import AsyncIterator, Optional, Tuple
+from backend.services.llm_gateway import llm_gateway
+from backend.services.corpus_packer import pack_blocks
 from backend.config import settings
 
 class EditorLLMService:
     def __init__(self):
-        # Initialize Groq client with API key from settings
-        if settings.GROQ_API_KEY:
-            self.client = Groq(api_key=settings.GROQ_API_KEY)
-        else:
-            self.client = None
-            print("Warning: GROQ_API_KEY not found in settings. Editor LLM features will be disabled.")
-            
+        # Model roles from the shared client registry (see llm_clients.py)
         # Literary refinement model (high quality text generation)
-        self.literary_model = "openai/gpt-oss-120b"
+        self.literary_model = "literary"
         # Vision model (image understanding)
-        self.vision_model = "meta-llama/llama-4-maverick-17b-128e-instruct"
+        self.vision_model = "editor_vision"
 
-    def _literary_refine(self, raw_text: str, context: str = "", style_hint: str = "evocative literary prose") -> str:
+    async def _literary_refine(self, raw_text: str, context: str = "", style_hint: str = "evocative literary prose") -> str:
         """
         Refines raw text (typically from vision model) into rich, literary prose.
         This is the second stage of the two-stage pipeline.
@@ -29,9 +25,23 @@ class EditorLLMService:
         Returns:
             Refined, literary text
         """
-        if not self.client or not raw_text:
+        if not llm_gateway.is_available() or not raw_text:
             return raw_text
-        
+
+        try:
+            response_content = await llm_gateway.chat(
+                messages=self._literary_refine_messages(raw_text, context, style_hint),
+                model=self.literary_model,
+                max_tokens=2000,
+                temperature=0.85,  # Higher creativity for literary output
+            )
+            return response_content.strip()
+        except Exception as e:
+            print(f"Error in literary refinement: {e}")
+            return raw_text  # Fallback to raw text on error
+
+    def _literary_refine_messages(self, raw_text: str, context: str, style_hint: str) -> list:
+        """Builds the chat messages for the literary refinement stage."""
         prompt = f"""You are a master literary craftsperson. Transform the following raw text into {style_hint}.
 
 RAW TEXT (from image analysis):
@@ -53,37 +63,30 @@ REQUIREMENTS:
 
 Write ONLY the refined prose, nothing else:"""
 
-        try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a literary artist. You transform plain descriptions into evocative prose. Output only the refined text with no preamble."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    }
-                ],
-                model=self.literary_model,
-                max_tokens=2000,
-                temperature=0.85,  # Higher creativity for literary output
-            )
-            return chat_completion.choices[0].message.content.strip()
-        except Exception as e:
-            print(f"Error in literary refinement: {e}")
-            return raw_text  # Fallback to raw text on error
+        return [
+            {
+                "role": "system",
+                "content": "You are a literary artist. You transform plain descriptions into evocative prose. Output only the refined text with no preamble."
+            },
+            {
+                "role": "user",
+                "content": prompt,
+            }
+        ]
 
-    def generate_post_suggestion(self, text_blocks: list, suggestion_type: str, user_commentary: str = "") -> dict:
+    async def generate_post_suggestion(self, text_blocks: list, suggestion_type: str, user_commentary: str = "") -> dict:
         """
         Generates suggestions (short prose or story) based on existing text blocks.
         suggestion_type: "short_prose" or "story"
         """
-        if not self.client:
+        if not llm_gateway.is_available():
             return {"suggestion": "LLM service is not configured (missing GROQ_API_KEY)."}
 
-        # Extract content from text blocks
-        content_text = "\n\n".join([block.get("content", "") for block in text_blocks if block.get("content")])
+        # Extract content from text blocks (whole, deduplicated blocks up to the token budget)
+        content_text = pack_blocks(
+            [block.get("content", "") for block in text_blocks if block.get("content")],
+            settings.CORPUS_TOKENS_POST_SUGGESTION
+        ).text
         
         if not content_text.strip():
             return {"suggestion": "No text content available to generate suggestions."}
@@ -97,7 +100,7 @@ Write ONLY the refined prose, nothing else:"""
         You are a creative writer. Based on the following existing text blocks, generate new content.
 
         EXISTING TEXT BLOCKS:
-        {content_text[:5000]}
+        {content_text}
 
         USER COMMENTARY/INSTRUCTIONS:
         {user_commentary if user_commentary else "No specific instructions provided."}
@@ -115,7 +118,7 @@ Write ONLY the refined prose, nothing else:"""
         """
 
         try:
-            chat_completion = self.client.chat.completions.create(
+            response_content = await llm_gateway.chat(
                 messages=[
                     {
                         "role": "system",
@@ -129,40 +132,26 @@ Write ONLY the refined prose, nothing else:"""
                 model=self.literary_model,
                 response_format={"type": "json_object"},
             )
-
-            response_content = chat_completion.choices[0].message.content
             return json.loads(response_content)
 
         except Exception as e:
             print(f"Error in LLM post suggestion generation: {e}")
             return {"suggestion": "Error generating suggestion."}
 
-    def chat_with_vision(self, image_url: str, text_blocks: list, user_message: str, conversation_history: list = None) -> dict:
-        """
-        Vision-enabled chat using a TWO-STAGE PIPELINE:
-        Stage 1: Maverick analyzes the image and generates raw understanding
-        Stage 2: GPT-OSS-120B refines the output into literary prose
-        
-        Args:
-            image_url: URL of the image to analyze
-            text_blocks: Existing text blocks for context
-            user_message: User's chat message
-            conversation_history: Previous messages in the conversation
-            
-        Returns:
-            Dictionary with 'response' key containing the refined AI response
-        """
-        if not self.client:
-            return {"response": "LLM service is not configured (missing GROQ_API_KEY)."}
-
-        # Build context from text blocks
+    @staticmethod
+    def blocks_context(text_blocks: list) -> str:
+        """Text blocks as prompt context for the vision chat prompts."""
         if text_blocks and len(text_blocks) > 0:
-            blocks_context = "\n\n".join([
+            return "\n\n".join([
                 f"[{block.get('type', 'paragraph')}]: {block.get('content', '')}" 
                 for block in text_blocks if block.get('content')
             ])
-        else:
-            blocks_context = "No written content yet."
+        return "No written content yet."
+
+    def _vision_chat_context(self, text_blocks: list, conversation_history: list = None) -> tuple:
+        """Builds the (blocks_context, conv_context) strings used by the vision chat prompts."""
+        # Build context from text blocks
+        blocks_context = self.blocks_context(text_blocks)
 
         # Build conversation context
         conv_context = ""
@@ -171,6 +160,10 @@ Write ONLY the refined prose, nothing else:"""
                 role = "User" if msg.get("role") == "user" else "Assistant"
                 conv_context += f"{role}: {msg.get('content', '')}\n"
 
+        return blocks_context, conv_context
+
+    def _vision_chat_messages(self, image_url: str, blocks_context: str, conv_context: str, user_message: str) -> list:
+        """Builds the stage-1 (vision understanding) messages for vision chat."""
         # ═══════════════════════════════════════════════════════════════════
         # STAGE 1: MAVERICK - Vision Understanding
         # ═══════════════════════════════════════════════════════════════════
@@ -192,7 +185,7 @@ Provide a detailed, helpful response that:
 
 Respond clearly and concisely:"""
 
-        messages = [
+        return [
             {"role": "system", "content": "You are a vision-enabled assistant. Describe what you see and respond helpfully. Be direct and avoid repetition."},
             {"role": "user", "content": [
                 {"type": "image_url", "image_url": {"url": image_url}},
@@ -200,115 +193,339 @@ Respond clearly and concisely:"""
             ]}
         ]
 
+    @staticmethod
+    def _needs_literary(raw_vision_response: str, user_message: str) -> bool:
+        """Whether a vision answer is worth a literary refinement pass."""
+        return len(raw_vision_response) > 150 or any(
+            keyword in user_message.lower() 
+            for keyword in ['story', 'describe', 'write', 'narrative', 'prose', 'literary', 'tell me about', 'elaborate', 'expand']
+        )
+
+    async def chat_with_vision(self, image_url: str, text_blocks: list, user_message: str, conversation_history: list = None) -> dict:
+        """
+        Vision-enabled chat using a TWO-STAGE PIPELINE:
+        Stage 1: Maverick analyzes the image and generates raw understanding
+        Stage 2: GPT-OSS-120B refines the output into literary prose
+        
+        Args:
+            image_url: URL of the image to analyze
+            text_blocks: Existing text blocks for context
+            user_message: User's chat message
+            conversation_history: Previous messages in the conversation
+            
+        Returns:
+            Dictionary with 'response' key containing the refined AI response
+        """
+        if not llm_gateway.is_available():
+            return {"response": "LLM service is not configured (missing GROQ_API_KEY)."}
+
+        blocks_context, conv_context = self._vision_chat_context(text_blocks, conversation_history)
+
         try:
-            # Stage 1: Get raw vision understanding from Maverick
-            vision_completion = self.client.chat.completions.create(
-                messages=messages,
-                model=self.vision_model,
-                max_tokens=1500,
-                temperature=0.7,
+            response = await self._two_stage_vision_answer(image_url, blocks_context, conv_context, user_message)
+            return {"response": response}
+
+        except Exception as e:
+            print(f"Error in vision chat: {e}")
+            # Fallback to text-only model
+            return await self._fallback_text_chat(blocks_context, user_message, conv_context)
+
+    async def _two_stage_vision_answer(self, image_url: str, blocks_context: str, conv_context: str, user_message: str) -> str:
+        """Vision stage on the image, then literary refinement when worthwhile (raises on vision failure)."""
+        messages = self._vision_chat_messages(image_url, blocks_context, conv_context, user_message)
+
+        # Stage 1: Get raw vision understanding from Maverick
+        raw_vision_response = await llm_gateway.chat(
+            messages=messages,
+            model=self.vision_model,
+            max_tokens=1500,
+            temperature=0.7,
+        )
+        
+        # ═══════════════════════════════════════════════════════════════════
+        # STAGE 2: GPT-OSS - Literary Refinement
+        # ═══════════════════════════════════════════════════════════════════
+        # Determine if literary refinement is appropriate
+        # (Skip for short/simple queries like "what color is X?")
+        if self._needs_literary(raw_vision_response, user_message):
+            return await self._literary_refine(
+                raw_text=raw_vision_response,
+                context=f"Story context: {blocks_context[:1000]}\nUser asked: {user_message}",
+                style_hint="evocative, literary prose suitable for a visual story"
             )
+        # For simple queries, return the raw response
+        return raw_vision_response
+
+    async def analyze_image_for_chat(self, image_url: str, blocks_context: str) -> str:
+        """
+        One-time detailed analysis of a vision chat session's image.
+        Later turns answer from this text instead of re-processing the image.
+        
+        Args:
+            image_url: URL of the image
+            blocks_context: The post's text blocks (for what to pay attention to)
             
-            raw_vision_response = vision_completion.choices[0].message.content
-            
-            # ═══════════════════════════════════════════════════════════════════
-            # STAGE 2: GPT-OSS - Literary Refinement
-            # ═══════════════════════════════════════════════════════════════════
-            # Determine if literary refinement is appropriate
-            # (Skip for short/simple queries like "what color is X?")
-            needs_literary = len(raw_vision_response) > 150 or any(
-                keyword in user_message.lower() 
-                for keyword in ['story', 'describe', 'write', 'narrative', 'prose', 'literary', 'tell me about', 'elaborate', 'expand']
+        Returns:
+            The analysis text (empty string on failure)
+        """
+        if not llm_gateway.is_available():
+            return ""
+
+        prompt = f"""Study this image for a writer who will ask you questions about it without seeing it again.
+
+EXISTING STORY CONTEXT:
+{blocks_context[:2000]}
+
+Describe, in detail and without embellishment:
+1. Subjects: people, creatures, objects - appearance, pose, expression, clothing
+2. Setting: place, time of day, weather, era
+3. Light, colour palette and composition
+4. Mood and atmosphere
+5. Small or easily missed details, including any visible text
+6. Elements that connect to the story context above
+
+Write dense, factual notes (at most 400 words)."""
+
+        try:
+            response = await llm_gateway.chat(
+                messages=[
+                    {"role": "system", "content": "You are a meticulous visual analyst."},
+                    {"role": "user", "content": [
+                        {"type": "image_url", "image_url": {"url": image_url}},
+                        {"type": "text", "text": prompt}
+                    ]}
+                ],
+                model=self.vision_model,
+                max_tokens=900,
+                temperature=0.2,
+                cache=True,
             )
+            return response.strip()
+        except Exception as e:
+            print(f"Error analyzing image for vision chat: {e}")
+            return ""
+
+    async def chat_in_session(
+        self,
+        image_url: str,
+        image_analysis: str,
+        blocks_context: str,
+        summary: str,
+        recent: list,
+        user_message: str,
+        look_again: bool = False
+    ) -> str:
+        """
+        Answer one vision chat session turn.
+        
+        By default a single text-model call answers from the stored image
+        analysis, compacted summary and recent messages; look_again (or a
+        session without an analysis) runs the two-stage pipeline on the image.
+        
+        Args:
+            image_url: Session image
+            image_analysis: Stored analysis of the image
+            blocks_context: The post's text blocks
+            summary: Compacted summary of older messages
+            recent: Recent messages [{"role", "content"}]
+            user_message: The new message
+            look_again: Re-send the image to the vision model
             
-            if needs_literary:
-                refined_response = self._literary_refine(
-                    raw_text=raw_vision_response,
-                    context=f"Story context: {blocks_context[:1000]}\nUser asked: {user_message}",
-                    style_hint="evocative, literary prose suitable for a visual story"
-                )
-                return {"response": refined_response}
-            else:
-                # For simple queries, return the raw response
-                return {"response": raw_vision_response}
+        Returns:
+            The assistant's answer
+        """
+        if not llm_gateway.is_available():
+            return "LLM service is not configured (missing GROQ_API_KEY)."
 
-        except Exception as e:
-            print(f"Error in vision chat: {e}")
-            # Fallback to text-only model
-            return self._fallback_text_chat(blocks_context, user_message, conv_context)
+        conv_context = f"(Earlier, summarized) {summary}\n" if summary else ""
+        for msg in recent:
+            role = "User" if msg.get("role") == "user" else "Assistant"
+            conv_context += f"{role}: {msg.get('content', '')}\n"
 
-    def _fallback_text_chat(self, blocks_context: str, user_message: str, conv_context: str) -> dict:
-        """Fallback to text-only chat if vision fails."""
         try:
-            prompt = f"""EXISTING TEXT BLOCKS:
-{blocks_context}
+            if look_again or not image_analysis:
+                return await self._two_stage_vision_answer(image_url, blocks_context, conv_context, user_message)
+
+            prompt = f"""You are helping a writer with an image you have already studied.
+
+IMAGE ANALYSIS:
+{image_analysis}
+
+EXISTING STORY CONTEXT:
+{blocks_context[:2000]}
 
 CONVERSATION SO FAR:
 {conv_context}
 
-USER MESSAGE: {user_message}
+USER REQUEST: {user_message}
 
-Please respond helpfully based on the text context provided."""
+Answer the request directly, grounded in the image analysis and the story
+context. Use evocative, literary prose when the user asks for writing;
+answer plainly for simple factual questions."""
 
-            chat_completion = self.client.chat.completions.create(
+            response = await llm_gateway.chat(
                 messages=[
-                    {"role": "system", "content": "You are a creative writing assistant helping with prose and storytelling."},
+                    {"role": "system", "content": "You are a creative writing assistant with a detailed knowledge of the image under discussion."},
                     {"role": "user", "content": prompt}
                 ],
                 model=self.literary_model,
                 max_tokens=2000,
+                temperature=0.8,
             )
+            return response.strip()
 
-            return {"response": chat_completion.choices[0].message.content}
         except Exception as e:
-            print(f"Error in fallback chat: {e}")
-            return {"response": "Sorry, I encountered an error. Please try again."}
+            print(f"Error in vision chat session turn: {e}")
+            result = await self._fallback_text_chat(blocks_context, user_message, conv_context)
+            return result["response"]
 
-    def generate_node_expansion(self, node_text: str, image_url: str, story_context: str) -> dict:
+    async def compact_conversation(self, summary: str, messages: list) -> Optional[str]:
         """
-        Generates a detailed literary expansion for a specific story flow node.
-        Used when user clicks on a node in the StoryFlow visualization.
+        Fold older chat messages into a session's running summary.
         
         Args:
-            node_text: The text of the clicked node (e.g., "The storm arrives")
-            image_url: URL of the associated image
-            story_context: The full story/text blocks for context
+            summary: Current summary (may be empty)
+            messages: Messages leaving the verbatim window, oldest first
             
         Returns:
-            Dictionary with 'expansion' key containing rich literary prose about this moment
+            Updated summary, or None on failure
         """
-        if not self.client:
-            return {"expansion": "LLM service is not configured."}
+        if not llm_gateway.is_available():
+            return None
 
-        # Stage 1: Vision understanding of the image focused on this moment
-        vision_prompt = f"""Look at this image and focus on elements that relate to this story moment:
+        transcript = "\n".join(
+            f"{'User' if msg.get('role') == 'user' else 'Assistant'}: {msg.get('content', '')}"
+            for msg in messages
+        )
+        prompt = f"""Update the running summary of a conversation between a writer and an assistant about an image.
 
-STORY MOMENT: "{node_text}"
+CURRENT SUMMARY:
+{summary or "(none yet)"}
 
-FULL STORY CONTEXT:
-{story_context[:3000]}
+NEW MESSAGES:
+{transcript}
 
-Identify and describe visual elements that connect to or illuminate this specific moment. 
-What in the image resonates with "{node_text}"?"""
+Write the updated summary in at most 200 words. Keep the writer's requests,
+decisions, preferred tone and any text drafted so far; drop pleasantries."""
 
         try:
-            vision_completion = self.client.chat.completions.create(
+            response = await llm_gateway.chat(
                 messages=[
-                    {"role": "system", "content": "You are a visual analyst connecting image details to story moments."},
-                    {"role": "user", "content": [
-                        {"type": "image_url", "image_url": {"url": image_url}},
-                        {"type": "text", "text": vision_prompt}
-                    ]}
+                    {"role": "system", "content": "You summarize conversations faithfully and concisely."},
+                    {"role": "user", "content": prompt}
                 ],
+                model=self.literary_model,
+                max_tokens=400,
+                temperature=0.2,
+            )
+            return response.strip() or None
+        except Exception as e:
+            print(f"Error compacting vision chat history: {e}")
+            return None
+
+    async def stream_chat_with_vision(self, image_url: str, text_blocks: list, user_message: str, conversation_history: list = None) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Streaming variant of chat_with_vision.
+        Yields (event, text) pairs: "draft" deltas while the vision stage runs,
+        then "token" deltas of the final answer (the literary refinement, or the
+        raw vision answer for simple queries).
+        """
+        blocks_context, conv_context = self._vision_chat_context(text_blocks, conversation_history)
+        messages = self._vision_chat_messages(image_url, blocks_context, conv_context, user_message)
+
+        raw_parts = []
+        try:
+            async for delta in llm_gateway.stream_chat(
                 model=self.vision_model,
-                max_tokens=800,
+                messages=messages,
+                max_tokens=1500,
                 temperature=0.7,
+            ):
+                raw_parts.append(delta)
+                yield "draft", delta
+        except Exception as e:
+            print(f"Error in vision chat stream: {e}")
+            # Fallback to text-only model
+            async for delta in llm_gateway.stream_chat(
+                model=self.literary_model,
+                messages=self._fallback_text_chat_messages(blocks_context, user_message, conv_context),
+                max_tokens=2000,
+            ):
+                yield "token", delta
+            return
+
+        raw_vision_response = "".join(raw_parts)
+        if not self._needs_literary(raw_vision_response, user_message):
+            yield "token", raw_vision_response
+            return
+
+        refine_messages = self._literary_refine_messages(
+            raw_vision_response,
+            context=f"Story context: {blocks_context[:1000]}\nUser asked: {user_message}",
+            style_hint="evocative, literary prose suitable for a visual story"
+        )
+        async for delta in llm_gateway.stream_chat(
+            model=self.literary_model,
+            messages=refine_messages,
+            max_tokens=2000,
+            temperature=0.85,
+        ):
+            yield "token", delta
+
+    async def _fallback_text_chat(self, blocks_context: str, user_message: str, conv_context: str) -> dict:
+        """Fallback to text-only chat if vision fails."""
+        try:
+            response_content = await llm_gateway.chat(
+                messages=self._fallback_text_chat_messages(blocks_context, user_message, conv_context),
+                model=self.literary_model,
+                max_tokens=2000,
             )
-            
-            visual_analysis = vision_completion.choices[0].message.content
-            
-            # Stage 2: Literary expansion using both visual analysis and story context
-            expansion_prompt = f"""You are a literary master expanding a story moment into rich prose.
+
+            return {"response": response_content}
+        except Exception as e:
+            print(f"Error in fallback chat: {e}")
+            return {"response": "Sorry, I encountered an error. Please try again."}
+
+    def _fallback_text_chat_messages(self, blocks_context: str, user_message: str, conv_context: str) -> list:
+        """Builds the text-only chat messages used when the vision stage fails."""
+        prompt = f"""EXISTING TEXT BLOCKS:
+{blocks_context}
+
+CONVERSATION SO FAR:
+{conv_context}
+
+USER MESSAGE: {user_message}
+
+Please respond helpfully based on the text context provided."""
+
+        return [
+            {"role": "system", "content": "You are a creative writing assistant helping with prose and storytelling."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _node_vision_messages(self, node_text: str, image_url: str, story_context: str) -> list:
+        """Builds the stage-1 (visual analysis) messages for node expansion."""
+        vision_prompt = f"""Look at this image and focus on elements that relate to this story moment:
+
+STORY MOMENT: "{node_text}"
+
+FULL STORY CONTEXT:
+{story_context[:3000]}
+
+Identify and describe visual elements that connect to or illuminate this specific moment. 
+What in the image resonates with "{node_text}"?"""
+
+        return [
+            {"role": "system", "content": "You are a visual analyst connecting image details to story moments."},
+            {"role": "user", "content": [
+                {"type": "image_url", "image_url": {"url": image_url}},
+                {"type": "text", "text": vision_prompt}
+            ]}
+        ]
+
+    def _node_expansion_messages(self, node_text: str, visual_analysis: str, story_context: str) -> list:
+        """Builds the stage-2 (literary expansion) messages for node expansion."""
+        expansion_prompt = f"""You are a literary master expanding a story moment into rich prose.
 
 THE MOMENT: "{node_text}"
 
@@ -328,28 +545,80 @@ Write a vivid, immersive literary passage (2-3 paragraphs) that:
 
 Write ONLY the expansion prose, no preamble or explanation:"""
 
-            literary_completion = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": "You are a literary artist creating evocative prose."},
-                    {"role": "user", "content": expansion_prompt}
-                ],
+        return [
+            {"role": "system", "content": "You are a literary artist creating evocative prose."},
+            {"role": "user", "content": expansion_prompt}
+        ]
+
+    async def generate_node_expansion(self, node_text: str, image_url: str, story_context: str) -> dict:
+        """
+        Generates a detailed literary expansion for a specific story flow node.
+        Used when user clicks on a node in the StoryFlow visualization.
+        
+        Args:
+            node_text: The text of the clicked node (e.g., "The storm arrives")
+            image_url: URL of the associated image
+            story_context: The full story/text blocks for context
+            
+        Returns:
+            Dictionary with 'expansion' key containing rich literary prose about this moment
+        """
+        if not llm_gateway.is_available():
+            return {"expansion": "LLM service is not configured."}
+
+        try:
+            # Stage 1: Vision understanding of the image focused on this moment
+            visual_analysis = await llm_gateway.chat(
+                messages=self._node_vision_messages(node_text, image_url, story_context),
+                model=self.vision_model,
+                max_tokens=800,
+                temperature=0.7,
+            )
+            
+            # Stage 2: Literary expansion using both visual analysis and story context
+            expansion = await llm_gateway.chat(
+                messages=self._node_expansion_messages(node_text, visual_analysis, story_context),
                 model=self.literary_model,
                 max_tokens=1500,
                 temperature=0.85,
             )
             
-            return {"expansion": literary_completion.choices[0].message.content.strip()}
+            return {"expansion": expansion.strip()}
             
         except Exception as e:
             print(f"Error in node expansion: {e}")
             return {"expansion": f"Unable to expand this moment. Error: {str(e)}"}
 
-    def rewrite_with_vision(self, image_url: str, block_content: str, rewrite_instruction: str = "") -> dict:
+    async def stream_node_expansion(self, node_text: str, image_url: str, story_context: str) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Streaming variant of generate_node_expansion.
+        Yields (event, text) pairs: "draft" deltas of the visual analysis,
+        then "token" deltas of the literary expansion.
+        """
+        analysis_parts = []
+        async for delta in llm_gateway.stream_chat(
+            model=self.vision_model,
+            messages=self._node_vision_messages(node_text, image_url, story_context),
+            max_tokens=800,
+            temperature=0.7,
+        ):
+            analysis_parts.append(delta)
+            yield "draft", delta
+
+        async for delta in llm_gateway.stream_chat(
+            model=self.literary_model,
+            messages=self._node_expansion_messages(node_text, "".join(analysis_parts), story_context),
+            max_tokens=1500,
+            temperature=0.85,
+        ):
+            yield "token", delta
+
+    async def rewrite_with_vision(self, image_url: str, block_content: str, rewrite_instruction: str = "") -> dict:
         """
         Rewrites a text block with awareness of the image content.
         Uses two-stage pipeline for literary quality.
         """
-        if not self.client:
+        if not llm_gateway.is_available():
             return {"rewritten": "LLM service is not configured (missing GROQ_API_KEY)."}
 
         instruction = rewrite_instruction if rewrite_instruction else "Enhance and improve this text while keeping it synchronized with what's visible in the image."
@@ -378,7 +647,7 @@ Return ONLY a valid JSON object:
         ]
 
         try:
-            chat_completion = self.client.chat.completions.create(
+            response_content = await llm_gateway.chat(
                 messages=[
                     {"role": "system", "content": "You are a creative rewriting assistant with vision capabilities. You output JSON."},
                     {"role": "user", "content": user_content}
@@ -387,13 +656,11 @@ Return ONLY a valid JSON object:
                 max_tokens=1500,
                 response_format={"type": "json_object"},
             )
-
-            response_content = chat_completion.choices[0].message.content
             result = json.loads(response_content)
             
             # Apply literary refinement to the rewritten content
             if result.get("rewritten"):
-                result["rewritten"] = self._literary_refine(
+                result["rewritten"] = await self._literary_refine(
                     result["rewritten"],
                     context=f"Original: {block_content}",
                     style_hint="polished literary prose"
@@ -4,16 +4,45 @@ Handles epic CRUD operations, story generation, and image associations.
 Follows Single Responsibility Principle.
 """
 
+import asyncio
 import uuid
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from bson.objectid import ObjectId
+from pymongo import ReturnDocument
 
 from backend.database import epic_collection, post_collection
+from backend.pagination import apply_cursor, sort_spec, next_cursor_for
+from backend.services.post_fields import push_text_blocks
+from backend.services.post_sampler import sample_posts
 from backend.schemas.epic import Epic, StoryBlock, EpicMetadata
 from backend.services.llm_service import llm_service
-from backend.services.story_block_service import story_block_service
+from backend.services.story_block_service import story_block_service, segment_hash
 from backend.services.vision_service import vision_service
+from backend.services.corpus_packer import CorpusPacker
+from backend.services.corpus_extractor import corpus_cursor
+from backend.services.corpus_cache import corpus_cache
+from backend.services.post_writer import update_post_document
+from backend.services.story_block_store import story_block_store, is_external, EXTERNAL_STORAGE
+from backend.services.narrative_memory import narrative_memory, render_memory
+from backend.background import spawn
+from backend.config import settings
+
+class EpicConflictError(RuntimeError):
+    """Raised when an epic changed while a multi-step rewrite of it was being prepared."""
+
+
+# Listing fields for view=summary; story_blocks never leave MongoDB
+EPIC_SUMMARY_PROJECTION = {
+    "title": 1,
+    "description": 1,
+    "created_at": 1,
+    "updated_at": 1,
+    "status": 1,
+    "generation_mode": 1,
+    "source_tags": 1,
+    "metadata": 1,
+}
 
 
 class EpicService:
@@ -39,6 +68,7 @@ class EpicService:
             Formatted epic dictionary
         """
         return {
+            "view": "full",
             "id": str(epic_doc["_id"]),
             "title": epic_doc.get("title", "Untitled Epic"),
             "description": epic_doc.get("description"),
@@ -56,6 +86,23 @@ class EpicService:
             })
         }
     
+    @staticmethod
+    def epic_summary_helper(epic_doc: dict) -> dict:
+        """
+        Convert a MongoDB epic document (projected with EPIC_SUMMARY_PROJECTION)
+        to the slim listing shape.
+        
+        Args:
+            epic_doc: Raw MongoDB document without story_blocks
+            
+        Returns:
+            Formatted epic summary dictionary
+        """
+        summary = EpicService.epic_helper(epic_doc)
+        summary.pop("story_blocks")
+        summary["view"] = "summary"
+        return summary
+    
     async def create_epic(
         self,
         title: str,
@@ -92,31 +139,131 @@ class EpicService:
                 "total_images": 0,
                 "generation_prompt": None,
                 "user_commentary": None
-            }
+            },
+            **self._new_epic_storage()
         }
         
         await epic_collection.insert_one(epic_doc)
         return self.epic_helper(epic_doc)
     
-    async def get_epic_by_id(self, epic_id: str) -> Optional[dict]:
+    # ==================== BLOCK STORAGE ====================
+    # Blocks are embedded in the epic document by default; epics created with
+    # EPIC_BLOCK_STORAGE="collection" (or migrated) keep them in story_blocks.
+    
+    @staticmethod
+    def _new_epic_storage() -> dict:
+        """Storage marker for newly created epics."""
+        if settings.EPIC_BLOCK_STORAGE == EXTERNAL_STORAGE:
+            return {"block_storage": EXTERNAL_STORAGE}
+        return {}
+    
+    @staticmethod
+    def _new_block(block_data: dict, sequence_order: int) -> dict:
+        """
+        Story block document for one segmented block.
+        
+        Args:
+            block_data: Segmenter output ('content', 'coherence_score')
+            sequence_order: Position in the epic
+        """
+        content = block_data.get("content", "")
+        return {
+            "block_id": f"story_block_{uuid.uuid4()}",
+            "sequence_order": sequence_order,
+            "content": content,
+            "associated_image_id": None,
+            "image_url": None,
+            "coherence_score": block_data.get("coherence_score", 0.7),
+            "segment_hash": segment_hash(content),
+            "created_at": datetime.now(timezone.utc)
+        }
+    
+    async def _attach_blocks(self, epic_doc: dict) -> dict:
+        """Load externally stored blocks into an epic document (no-op when embedded)."""
+        if is_external(epic_doc):
+            epic_doc["story_blocks"] = await story_block_store.list_blocks(str(epic_doc["_id"]))
+        return epic_doc
+    
+    async def _attach_blocks_many(self, epic_docs: List[dict]) -> List[dict]:
+        """Batch variant of _attach_blocks for listings (one query for all epics)."""
+        external_ids = [str(doc["_id"]) for doc in epic_docs if is_external(doc)]
+        if external_ids:
+            grouped = await story_block_store.blocks_for_epics(external_ids)
+            for doc in epic_docs:
+                if is_external(doc):
+                    doc["story_blocks"] = grouped.get(str(doc["_id"]), [])
+        return epic_docs
+    
+    async def _is_external_epic(self, epic_id: str) -> Optional[bool]:
+        """Storage mode of an epic, or None if it does not exist."""
+        epic_doc = await epic_collection.find_one({"_id": ObjectId(epic_id)}, {"block_storage": 1})
+        if epic_doc is None:
+            return None
+        return is_external(epic_doc)
+    
+    async def get_epic_by_id(self, epic_id: str, include_blocks: bool = True) -> Optional[dict]:
         """
         Retrieve an epic by ID.
         
         Args:
             epic_id: Epic ID
+            include_blocks: Load story blocks (False returns an empty list,
+                for clients that page them via list_blocks)
             
         Returns:
             Epic document or None
         """
         try:
-            epic_doc = await epic_collection.find_one({"_id": ObjectId(epic_id)})
+            projection = None if include_blocks else {"story_blocks": 0}
+            epic_doc = await epic_collection.find_one({"_id": ObjectId(epic_id)}, projection)
             if epic_doc:
+                if include_blocks:
+                    await self._attach_blocks(epic_doc)
                 return self.epic_helper(epic_doc)
             return None
         except Exception as e:
             print(f"Error fetching epic {epic_id}: {e}")
             return None
     
+    async def list_blocks(
+        self,
+        epic_id: str,
+        after: Optional[int] = None,
+        limit: int = 50
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Page through an epic's story blocks in sequence order.
+        
+        Args:
+            epic_id: Epic ID
+            after: sequence_order of the last block already loaded
+            limit: Blocks per page
+            
+        Returns:
+            {"blocks", "next_after"} (next_after is None on the last page),
+            or None if the epic does not exist
+        """
+        try:
+            epic_doc = await epic_collection.find_one({"_id": ObjectId(epic_id)}, {"block_storage": 1})
+        except Exception as e:
+            print(f"Error fetching epic {epic_id}: {e}")
+            return None
+        if epic_doc is None:
+            return None
+        
+        if is_external(epic_doc):
+            # Indexed range scan on (epic_id, sequence_order)
+            blocks = await story_block_store.list_blocks(epic_id, after=after, limit=limit)
+        else:
+            epic_doc = await epic_collection.find_one({"_id": ObjectId(epic_id)}, {"story_blocks": 1})
+            blocks = sorted(epic_doc.get("story_blocks", []), key=lambda b: b.get("sequence_order", 0))
+            if after is not None:
+                blocks = [b for b in blocks if b.get("sequence_order", 0) > after]
+            blocks = blocks[:limit]
+        
+        next_after = blocks[-1].get("sequence_order") if len(blocks) == limit else None
+        return {"blocks": blocks, "next_after": next_after}
+    
     async def update_epic(self, epic_id: str, update_data: dict) -> Optional[dict]:
         """
         Update an epic.
@@ -131,6 +278,15 @@ class EpicService:
         try:
             update_data["updated_at"] = datetime.now(timezone.utc)
             
+            if "story_blocks" in update_data:
+                # Rebuilt from the new blocks on the next continuation
+                update_data["narrative_memory"] = None
+                external = await self._is_external_epic(epic_id)
+                if external is None:
+                    return None
+                if external:
+                    await story_block_store.replace_blocks(epic_id, update_data.pop("story_blocks"))
+            
             result = await epic_collection.update_one(
                 {"_id": ObjectId(epic_id)},
                 {"$set": update_data}
@@ -143,6 +299,398 @@ class EpicService:
             print(f"Error updating epic {epic_id}: {e}")
             return None
     
+    # ==================== BLOCK-LEVEL WRITES ====================
+    # Touch only the affected array elements instead of $set-ting the whole
+    # story_blocks array, so write size is proportional to the change.
+    # The storage mode is part of each write's filter rather than read first:
+    # the mode new epics use is tried first, and a write that does not match
+    # (other mode) has no effect, so the common case is a single round trip.
+    
+    # Epic filters for each storage mode
+    _EMBEDDED = {"block_storage": {"$ne": EXTERNAL_STORAGE}}
+    _EXTERNAL = {"block_storage": EXTERNAL_STORAGE}
+    
+    @staticmethod
+    def _storage_order(embedded, external) -> tuple:
+        """The two per-mode writes, the configured storage mode first."""
+        if settings.EPIC_BLOCK_STORAGE == EXTERNAL_STORAGE:
+            return external, embedded
+        return embedded, external
+    
+    async def update_block(
+        self,
+        epic_id: str,
+        block_id: str,
+        fields: dict,
+        extra_block_filter: Optional[dict] = None,
+        inc: Optional[dict] = None
+    ) -> Optional[dict]:
+        """
+        Update fields of a single story block in place (arrayFilters).
+        
+        Args:
+            epic_id: Epic ID
+            block_id: Story block ID
+            fields: Block fields to set, e.g. {"image_url": ...}
+            extra_block_filter: Extra conditions the block must meet for the update to apply
+            inc: Top-level counters to $inc in the same write, e.g. {"metadata.total_images": 1}
+            
+        Returns:
+            Updated epic, or None if the epic/block (matching the conditions) was not found
+        """
+        epic_update = {"$set": {"updated_at": datetime.now(timezone.utc)}}
+        if inc:
+            epic_update["$inc"] = inc
+        
+        async def embedded() -> Optional[dict]:
+            block_match = {"block_id": block_id, **(extra_block_filter or {})}
+            update = {**epic_update, "$set": {
+                **epic_update["$set"],
+                **{f"story_blocks.$[blk].{key}": value for key, value in fields.items()}
+            }}
+            epic_doc = await epic_collection.find_one_and_update(
+                {"_id": ObjectId(epic_id), **self._EMBEDDED, "story_blocks": {"$elemMatch": block_match}},
+                update,
+                array_filters=[{f"blk.{key}": value for key, value in block_match.items()}],
+                return_document=ReturnDocument.AFTER
+            )
+            return self.epic_helper(epic_doc) if epic_doc else None
+        
+        async def external() -> Optional[dict]:
+            # Only external epics have blocks in the store
+            block = await story_block_store.update_block(epic_id, block_id, fields, extra_block_filter)
+            if block is None:
+                return None
+            epic_doc = await epic_collection.find_one_and_update(
+                {"_id": ObjectId(epic_id)}, epic_update, return_document=ReturnDocument.AFTER
+            )
+            return self.epic_helper(await self._attach_blocks(epic_doc)) if epic_doc else None
+        
+        try:
+            for write in self._storage_order(embedded, external):
+                epic = await write()
+                if epic is not None:
+                    return epic
+        except Exception as e:
+            print(f"Error updating block {block_id} of epic {epic_id}: {e}")
+        return None
+    
+    async def append_blocks(self, epic_id: str, blocks: List[dict]) -> Optional[dict]:
+        """
+        Append story blocks with $push/$each and bump metadata.total_blocks.
+        
+        Args:
+            epic_id: Epic ID
+            blocks: Story block documents to append
+            
+        Returns:
+            Updated epic or None
+        """
+        update = {
+            "$inc": {"metadata.total_blocks": len(blocks)},
+            "$set": {"updated_at": datetime.now(timezone.utc)}
+        }
+        
+        async def embedded() -> Optional[dict]:
+            epic_doc = await epic_collection.find_one_and_update(
+                {"_id": ObjectId(epic_id), **self._EMBEDDED},
+                {**update, "$push": {"story_blocks": {"$each": blocks}}},
+                return_document=ReturnDocument.AFTER
+            )
+            return self.epic_helper(epic_doc) if epic_doc else None
+        
+        async def external() -> Optional[dict]:
+            epic_doc = await epic_collection.find_one_and_update(
+                {"_id": ObjectId(epic_id), **self._EXTERNAL},
+                update,
+                return_document=ReturnDocument.AFTER
+            )
+            if epic_doc is None:
+                return None
+            await story_block_store.insert_blocks(epic_id, blocks)
+            return self.epic_helper(await self._attach_blocks(epic_doc))
+        
+        try:
+            for write in self._storage_order(embedded, external):
+                epic = await write()
+                if epic is not None:
+                    return epic
+        except Exception as e:
+            print(f"Error appending blocks to epic {epic_id}: {e}")
+        return None
+    
+    async def update_blocks(self, epic_id: str, block_fields: Dict[str, dict]) -> Optional[dict]:
+        """
+        Update fields of several story blocks in one write.
+        
+        Args:
+            epic_id: Epic ID
+            block_fields: {block_id: fields to set}, e.g. {"story_block_1": {"coherence_score": 0.8}}
+            
+        Returns:
+            Updated epic or None
+        """
+        touched = {"$set": {"updated_at": datetime.now(timezone.utc)}}
+        
+        async def embedded() -> Optional[dict]:
+            # One arrayFilters identifier per block
+            update = {"$set": dict(touched["$set"])}
+            array_filters = []
+            for n, (block_id, fields) in enumerate(block_fields.items()):
+                for key, value in fields.items():
+                    update["$set"][f"story_blocks.$[b{n}].{key}"] = value
+                array_filters.append({f"b{n}.block_id": block_id})
+            
+            epic_doc = await epic_collection.find_one_and_update(
+                {"_id": ObjectId(epic_id), **self._EMBEDDED},
+                update,
+                array_filters=array_filters or None,
+                return_document=ReturnDocument.AFTER
+            )
+            return self.epic_helper(epic_doc) if epic_doc else None
+        
+        async def external() -> Optional[dict]:
+            epic_doc = await epic_collection.find_one_and_update(
+                {"_id": ObjectId(epic_id), **self._EXTERNAL},
+                touched,
+                return_document=ReturnDocument.AFTER
+            )
+            if epic_doc is None:
+                return None
+            await story_block_store.update_blocks(epic_id, block_fields)
+            return self.epic_helper(await self._attach_blocks(epic_doc))
+        
+        try:
+            for write in self._storage_order(embedded, external):
+                epic = await write()
+                if epic is not None:
+                    return epic
+        except Exception as e:
+            print(f"Error updating blocks of epic {epic_id}: {e}")
+        return None
+    
+    async def rescore_blocks(self, epic_id: str, scorer: str = "llm", bypass_cache: bool = False) -> Optional[dict]:
+        """
+        Refresh coherence_score on every block of an epic.
+        
+        Args:
+            epic_id: Epic ID
+            scorer: "llm" (batched, cached per block) or "lexical" (local only)
+            bypass_cache: Re-score blocks whose scores are cached
+            
+        Returns:
+            Updated epic or None
+        """
+        epic = await self.get_epic_by_id(epic_id)
+        if not epic:
+            return None
+        
+        blocks = epic["story_blocks"]
+        if not blocks:
+            return epic
+        
+        scores = await story_block_service.score_blocks(
+            [block["content"] for block in blocks],
+            use_llm=scorer == "llm",
+            bypass_cache=bypass_cache
+        )
+        return await self.update_blocks(epic_id, {
+            block["block_id"]: {"coherence_score": score}
+            for block, score in zip(blocks, scores)
+        })
+    
+    async def resegment_blocks(
+        self,
+        epic_id: str,
+        incremental: bool = True,
+        mode: Optional[str] = None,
+        bypass_cache: bool = False
+    ) -> Optional[dict]:
+        """
+        Re-segment an epic's story, keeping block ids and images where the text survives.
+        
+        With incremental=True only blocks edited since they were segmented (content
+        no longer matches segment_hash, or no hash recorded) are re-segmented, one
+        run of consecutive edited blocks at a time; untouched blocks are kept as
+        they are. With incremental=False the whole story is one run.
+        
+        Inside a run, each old block hands its block_id, associated_image_id and
+        image_url to the new block holding most of its text (blocks with images
+        first), so associations survive re-segmentation.
+        
+        Args:
+            epic_id: Epic ID
+            incremental: Re-segment only edited regions
+            mode: Segmentation mode (default: settings.SEGMENTATION_MODE)
+            bypass_cache: Force fresh segmentation of the runs
+            
+        Returns:
+            Updated epic or None if it does not exist
+            
+        Raises:
+            EpicConflictError: The epic was modified while re-segmenting
+        """
+        epic_doc = await epic_collection.find_one({"_id": ObjectId(epic_id)})
+        if epic_doc is None:
+            return None
+        await self._attach_blocks(epic_doc)
+        blocks = epic_doc.get("story_blocks", [])
+        
+        # Runs [start, end) of consecutive blocks to re-segment
+        runs = []
+        run_start = None
+        for i, block in enumerate(blocks):
+            dirty = not incremental or block.get("segment_hash") != segment_hash(block.get("content", ""))
+            if dirty and run_start is None:
+                run_start = i
+            elif not dirty and run_start is not None:
+                runs.append((run_start, i))
+                run_start = None
+        if run_start is not None:
+            runs.append((run_start, len(blocks)))
+        
+        if not runs:
+            return self.epic_helper(epic_doc)
+        
+        replacements = []
+        for start, end in runs:
+            new_blocks = await self._resegment_run(blocks[start:end], mode, bypass_cache)
+            replacements.append((start, end, new_blocks))
+        
+        return await self._splice_blocks(epic_doc, blocks, replacements)
+    
+    async def _resegment_run(self, old_blocks: List[dict], mode: Optional[str], bypass_cache: bool) -> List[dict]:
+        """Segment the joined text of consecutive blocks and carry ids/images over by text overlap."""
+        run_text = "\n\n".join(block.get("content", "") for block in old_blocks)
+        old_ranges = []
+        pos = 0
+        for block in old_blocks:
+            length = len(block.get("content", ""))
+            old_ranges.append((pos, pos + length))
+            pos += length + 2
+        
+        blocks_data = await story_block_service.segment_story(run_text, bypass_cache=bypass_cache, mode=mode)
+        new_blocks = [self._new_block(block_data, 0) for block_data in blocks_data]
+        
+        # Where each new block sits in the run (exact for boundary/local cuts;
+        # "full_text" output the model rewrote is not found and starts fresh)
+        new_ranges = []
+        search_from = 0
+        for block in new_blocks:
+            found = run_text.find(block["content"], search_from) if block["content"] else -1
+            if found < 0:
+                new_ranges.append(None)
+                continue
+            new_ranges.append((found, found + len(block["content"])))
+            search_from = found + len(block["content"])
+        
+        # Greedy matching: old blocks with images first, then by overlap; an old
+        # block only moves to a new block that holds most of its text
+        pairs = []
+        for o, (old_start, old_end) in enumerate(old_ranges):
+            for n, new_range in enumerate(new_ranges):
+                if new_range is None:
+                    continue
+                overlap = min(old_end, new_range[1]) - max(old_start, new_range[0])
+                if overlap > 0 and overlap * 2 >= old_end - old_start:
+                    pairs.append((bool(old_blocks[o].get("associated_image_id")), overlap, o, n))
+        taken_old, taken_new = set(), set()
+        for _, _, o, n in sorted(pairs, reverse=True):
+            if o in taken_old or n in taken_new:
+                continue
+            taken_old.add(o)
+            taken_new.add(n)
+            old = old_blocks[o]
+            new_blocks[n].update({
+                "block_id": old["block_id"],
+                "associated_image_id": old.get("associated_image_id"),
+                "image_url": old.get("image_url"),
+                "created_at": old.get("created_at") or new_blocks[n]["created_at"],
+            })
+        return new_blocks
+    
+    async def _splice_blocks(
+        self,
+        epic_doc: dict,
+        blocks: List[dict],
+        replacements: List[Tuple[int, int, List[dict]]]
+    ) -> dict:
+        """
+        Write re-segmented runs back in one targeted update.
+        
+        Embedded epics get a single pipeline update that splices the new blocks
+        between slices of the stored array (untouched blocks are not re-sent)
+        and renumbers sequence_order; external epics get one bulk write. The
+        write is conditional on updated_at, so concurrent edits are not lost.
+        """
+        epic_id = str(epic_doc["_id"])
+        final_blocks = []
+        pos = 0
+        for start, end, new_blocks in replacements:
+            final_blocks += blocks[pos:start] + new_blocks
+            pos = end
+        final_blocks += blocks[pos:]
+        total_images = sum(1 for block in final_blocks if block.get("associated_image_id"))
+        
+        guard = {"_id": epic_doc["_id"], "updated_at": epic_doc.get("updated_at")}
+        metadata = {
+            "metadata.total_blocks": len(final_blocks),
+            "metadata.total_images": total_images,
+            "narrative_memory": None,  # rebuilt from the new blocks on the next continuation
+            "updated_at": datetime.now(timezone.utc),
+        }
+        
+        if is_external(epic_doc):
+            updated = await epic_collection.find_one_and_update(
+                guard, {"$set": metadata}, return_document=ReturnDocument.AFTER
+            )
+            if updated is None:
+                raise EpicConflictError(f"Epic {epic_id} changed during re-segmentation")
+            
+            inserted = []
+            renumbered = {}
+            removed = [block["block_id"] for start, end, _ in replacements for block in blocks[start:end]]
+            new_ids = {id(block) for _, _, new_blocks in replacements for block in new_blocks}
+            for order, block in enumerate(final_blocks, start=1):
+                if id(block) in new_ids:
+                    inserted.append({**block, "sequence_order": order})
+                elif block.get("sequence_order") != order:
+                    renumbered[block["block_id"]] = order
+            await story_block_store.splice_blocks(epic_id, removed, inserted, renumbered)
+            return self.epic_helper(await self._attach_blocks(updated))
+        
+        pieces = []
+        pos = 0
+        for start, end, new_blocks in replacements:
+            if start > pos:
+                pieces.append({"$slice": ["$story_blocks", pos, start - pos]})
+            if new_blocks:
+                pieces.append({"$literal": new_blocks})
+            pos = end
+        if pos < len(blocks):
+            pieces.append({"$slice": ["$story_blocks", pos, len(blocks) - pos]})
+        
+        pipeline = [
+            {"$set": {"story_blocks": {"$concatArrays": pieces}}},
+            {"$set": {"story_blocks": {"$map": {
+                "input": {"$range": [0, {"$size": "$story_blocks"}]},
+                "as": "idx",
+                "in": {"$mergeObjects": [
+                    {"$arrayElemAt": ["$story_blocks", "$$idx"]},
+                    {"sequence_order": {"$add": ["$$idx", 1]}}
+                ]}
+            }}}},
+            {"$set": metadata},
+        ]
+        updated = await epic_collection.find_one_and_update(
+            {**guard, "story_blocks": {"$size": len(blocks)}},
+            pipeline,
+            return_document=ReturnDocument.AFTER
+        )
+        if updated is None:
+            raise EpicConflictError(f"Epic {epic_id} changed during re-segmentation")
+        return self.epic_helper(updated)
+    
     async def delete_epic(self, epic_id: str) -> bool:
         """
         Delete an epic.
@@ -155,6 +703,8 @@ class EpicService:
         """
         try:
             result = await epic_collection.delete_one({"_id": ObjectId(epic_id)})
+            # Externally stored blocks (no-op for embedded epics)
+            await story_block_store.delete_blocks(epic_id)
             return result.deleted_count > 0
         except Exception as e:
             print(f"Error deleting epic {epic_id}: {e}")
@@ -164,23 +714,47 @@ class EpicService:
         self,
         page: int = 1,
         limit: int = 20,
-        status: Optional[str] = None
+        status: Optional[str] = None,
+        cursor: Optional[str] = None,
+        view: str = "full"
     ) -> Dict[str, Any]:
         """
         List epics with pagination.
         
         Args:
-            page: Page number
+            page: Page number (compatibility mode, ignored when cursor is given)
             limit: Items per page
             status: Filter by status (optional)
+            cursor: Keyset cursor from a previous page's next_cursor
+            view: "full" or "summary" (projects away story_blocks)
             
         Returns:
-            Dictionary with epics, total_pages, current_page, total_count
+            Dictionary with epics and next_cursor; page mode also returns
+            total_pages, current_page, total_count
+            
+        Raises:
+            ValueError: If the cursor is malformed
         """
+        sort_fields = ["updated_at", "_id"]
         query = {}
         if status:
             query["status"] = status
         
+        if view == "summary":
+            projection, helper = EPIC_SUMMARY_PROJECTION, self.epic_summary_helper
+        else:
+            projection, helper = None, self.epic_helper
+        
+        if cursor:
+            query = apply_cursor(query, cursor, sort_fields)
+            docs = await epic_collection.find(query, projection).sort(sort_spec(sort_fields)).limit(limit).to_list(length=limit)
+            if view != "summary":
+                await self._attach_blocks_many(docs)
+            return {
+                "epics": [helper(epic_doc) for epic_doc in docs],
+                "next_cursor": next_cursor_for(docs, limit, sort_fields)
+            }
+        
         total_count = await epic_collection.count_documents(query)
         
         if total_count == 0:
@@ -192,11 +766,11 @@ class EpicService:
             }
         
         skip = (page - 1) * limit
-        cursor = epic_collection.find(query).sort("updated_at", -1).skip(skip).limit(limit)
+        docs = await epic_collection.find(query, projection).sort(sort_spec(sort_fields)).skip(skip).limit(limit).to_list(length=limit)
+        if view != "summary":
+            await self._attach_blocks_many(docs)
         
-        epics = []
-        async for epic_doc in cursor:
-            epics.append(self.epic_helper(epic_doc))
+        epics = [helper(epic_doc) for epic_doc in docs]
         
         import math
         total_pages = math.ceil(total_count / limit)
@@ -205,7 +779,8 @@ class EpicService:
             "epics": epics,
             "total_pages": total_pages,
             "current_page": page,
-            "total_count": total_count
+            "total_count": total_count,
+            "next_cursor": next_cursor_for(docs, limit, sort_fields)
         }
     
     async def generate_full_story(
@@ -215,7 +790,8 @@ class EpicService:
         source_tags: Optional[List[str]],
         use_all_text: bool,
         generation_prompt: str,
-        user_commentary: Optional[str]
+        user_commentary: Optional[str],
+        segmentation_mode: Optional[str] = None
     ) -> dict:
         """
         Generate a full epic story from posts.
@@ -227,6 +803,7 @@ class EpicService:
             use_all_text: Use all text_blocks or only from tagged posts
             generation_prompt: Main story direction
             user_commentary: Additional user input
+            segmentation_mode: Block segmentation engine (default: settings.SEGMENTATION_MODE)
             
         Returns:
             Created epic with generated story blocks
@@ -235,32 +812,102 @@ class EpicService:
         aggregated_text = await self._aggregate_text_from_posts(source_tags, use_all_text)
         
         # Step 2: Generate epic story using LLM
-        story_result = llm_service.generate_epic_story(
+        story_result = await llm_service.generate_epic_story(
+            aggregated_text=aggregated_text,
+            generation_prompt=generation_prompt,
+            user_commentary=user_commentary or "",
+            source_tags=source_tags
+        )
+        
+        return await self._create_epic_from_story(
+            title=title,
+            description=description,
+            source_tags=source_tags,
+            generation_prompt=generation_prompt,
+            user_commentary=user_commentary,
+            story_result=story_result,
+            segmentation_mode=segmentation_mode
+        )
+    
+    async def stream_full_story(
+        self,
+        title: str,
+        description: Optional[str],
+        source_tags: Optional[List[str]],
+        use_all_text: bool,
+        generation_prompt: str,
+        user_commentary: Optional[str],
+        segmentation_mode: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Streaming variant of generate_full_story.
+        
+        Yields:
+            ("token", text) for each story delta as it is generated, then
+            ("done", epic) once the story is segmented and saved
+        """
+        aggregated_text = await self._aggregate_text_from_posts(source_tags, use_all_text)
+        
+        parts = []
+        async for token in llm_service.stream_epic_story(
             aggregated_text=aggregated_text,
             generation_prompt=generation_prompt,
             user_commentary=user_commentary or "",
             source_tags=source_tags
+        ):
+            parts.append(token)
+            yield "token", token
+        
+        story_text = "".join(parts).strip()
+        story_result = {
+            "story": story_text,
+            "themes": await llm_service.generate_story_themes(story_text),
+        }
+        
+        epic = await self._create_epic_from_story(
+            title=title,
+            description=description,
+            source_tags=source_tags,
+            generation_prompt=generation_prompt,
+            user_commentary=user_commentary,
+            story_result=story_result,
+            segmentation_mode=segmentation_mode
         )
+        yield "done", epic
+    
+    async def _create_epic_from_story(
+        self,
+        title: str,
+        description: Optional[str],
+        source_tags: Optional[List[str]],
+        generation_prompt: str,
+        user_commentary: Optional[str],
+        story_result: dict,
+        segmentation_mode: Optional[str] = None
+    ) -> dict:
+        """
+        Segment a generated story into blocks and save it as a new epic.
         
+        Args:
+            story_result: Parsed LLM output with 'story', 'title_suggestion', 'themes'
+            segmentation_mode: Block segmentation engine (default: settings.SEGMENTATION_MODE)
+            
+        Returns:
+            Created epic
+        """
         story_text = story_result.get("story", "")
         title_suggestion = story_result.get("title_suggestion", title)
         themes = story_result.get("themes", [])
         
         # Step 3: Segment story into blocks
-        blocks_data = await story_block_service.segment_story(story_text)
+        blocks_data = await story_block_service.segment_story(story_text, mode=segmentation_mode)
         
         # Step 4: Create story blocks
         story_blocks = []
         for block_data in blocks_data:
-            story_blocks.append({
-                "block_id": f"story_block_{uuid.uuid4()}",
-                "sequence_order": block_data.get("sequence_order", len(story_blocks) + 1),
-                "content": block_data.get("content", ""),
-                "associated_image_id": None,
-                "image_url": None,
-                "coherence_score": block_data.get("coherence_score", 0.7),
-                "created_at": datetime.now(timezone.utc)
-            })
+            story_blocks.append(
+                self._new_block(block_data, block_data.get("sequence_order", len(story_blocks) + 1))
+            )
         
         # Step 5: Create epic
         epic_doc = {
@@ -279,10 +926,15 @@ class EpicService:
                 "generation_prompt": generation_prompt,
                 "user_commentary": user_commentary,
                 "themes": themes
-            }
+            },
+            **self._new_epic_storage()
         }
         
-        await epic_collection.insert_one(epic_doc)
+        if is_external(epic_doc):
+            await epic_collection.insert_one({**epic_doc, "story_blocks": []})
+            await story_block_store.insert_blocks(str(epic_doc["_id"]), story_blocks)
+        else:
+            await epic_collection.insert_one(epic_doc)
         return self.epic_helper(epic_doc)
     
     async def complete_story(
@@ -302,21 +954,25 @@ class EpicService:
         Returns:
             Updated epic with new blocks
         """
-        # Get existing epic
-        epic = await self.get_epic_by_id(epic_id)
-        if not epic:
+        # Narrative memory of earlier blocks + the last K blocks verbatim
+        # (constant-size context however long the epic is). Folding is bounded
+        # here; the newest blocks the memory does not cover yet are sent
+        # verbatim, older unfolded ones are omitted until the background fold.
+        refreshed = await narrative_memory.refresh(epic_id, max_folds=narrative_memory.sync_folds)
+        if refreshed is None:
             return None
+        memory, recent_blocks, unfolded_blocks = refreshed
         
-        # Aggregate existing story
         existing_story = "\n\n".join([
-            block["content"] for block in epic["story_blocks"]
+            block["content"] for block in unfolded_blocks + recent_blocks
         ])
         
         # Generate continuation
-        continuation_result = llm_service.complete_epic_story(
+        continuation_result = await llm_service.complete_epic_story(
             existing_story=existing_story,
             continuation_prompt=continuation_prompt,
-            user_commentary=user_commentary or ""
+            user_commentary=user_commentary or "",
+            story_memory=render_memory(memory)
         )
         
         continuation_text = continuation_result.get("continuation", "")
@@ -325,29 +981,21 @@ class EpicService:
         new_blocks_data = await story_block_service.segment_story(continuation_text)
         
         # Create new story blocks
-        current_max_order = max([b["sequence_order"] for b in epic["story_blocks"]], default=0)
+        current_max_order = max([b["sequence_order"] for b in recent_blocks], default=0)
         new_story_blocks = []
         
         for block_data in new_blocks_data:
-            new_story_blocks.append({
-                "block_id": f"story_block_{uuid.uuid4()}",
-                "sequence_order": current_max_order + block_data.get("sequence_order", len(new_story_blocks) + 1),
-                "content": block_data.get("content", ""),
-                "associated_image_id": None,
-                "image_url": None,
-                "coherence_score": block_data.get("coherence_score", 0.7),
-                "created_at": datetime.now(timezone.utc)
-            })
-        
-        # Update epic
-        all_blocks = epic["story_blocks"] + new_story_blocks
-        update_data = {
-            "story_blocks": all_blocks,
-            "metadata.total_blocks": len(all_blocks),
-            "updated_at": datetime.now(timezone.utc)
-        }
+            new_story_blocks.append(self._new_block(
+                block_data,
+                current_max_order + block_data.get("sequence_order", len(new_story_blocks) + 1)
+            ))
         
-        return await self.update_epic(epic_id, update_data)
+        # Append only the new blocks
+        updated_epic = await self.append_blocks(epic_id, new_story_blocks)
+        if updated_epic:
+            # Fold blocks that left the verbatim window before the next continuation
+            spawn(narrative_memory.refresh_quietly(epic_id))
+        return updated_epic
     
     async def associate_image_with_block(
         self,
@@ -368,57 +1016,46 @@ class EpicService:
         Returns:
             Updated epic
         """
-        # Get epic and post
-        epic = await self.get_epic_by_id(epic_id)
-        if not epic:
-            return None
-        
-        post = await post_collection.find_one({"_id": ObjectId(image_post_id)})
+        post = await post_collection.find_one({"_id": ObjectId(image_post_id)}, {"photo_url": 1})
         if not post:
             return None
         
-        # Find the block
-        block_index = None
-        block_content = None
-        for i, block in enumerate(epic["story_blocks"]):
-            if block["block_id"] == block_id:
-                block_index = i
-                block_content = block["content"]
-                break
-        
-        if block_index is None:
-            return None
-        
-        # Update block with image association
-        epic["story_blocks"][block_index]["associated_image_id"] = image_post_id
-        epic["story_blocks"][block_index]["image_url"] = post.get("photo_url")
-        
-        # Count total images
-        total_images = sum(1 for b in epic["story_blocks"] if b.get("associated_image_id"))
-        
-        # Update epic
-        update_data = {
-            "story_blocks": epic["story_blocks"],
-            "metadata.total_images": total_images,
-            "updated_at": datetime.now(timezone.utc)
+        image_fields = {
+            "associated_image_id": image_post_id,
+            "image_url": post.get("photo_url")
         }
         
-        await epic_collection.update_one(
-            {"_id": ObjectId(epic_id)},
-            {"$set": update_data}
+        # First image on this block: count it in the same write
+        epic = await self.update_block(
+            epic_id,
+            block_id,
+            image_fields,
+            extra_block_filter={"associated_image_id": None},
+            inc={"metadata.total_images": 1}
         )
+        if epic is None:
+            # Block already had an image (or epic/block missing): replace it, count unchanged
+            epic = await self.update_block(epic_id, block_id, image_fields)
+        if epic is None:
+            return None
         
         # Optionally sync to post
+        block_content = next(
+            (b.get("content") for b in epic["story_blocks"] if b.get("block_id") == block_id),
+            None
+        )
         if sync_to_post and block_content:
             await self._sync_block_to_post(image_post_id, block_content, epic_id, epic.get("title", "Untitled Epic"))
         
-        return await self.get_epic_by_id(epic_id)
+        return epic
     
     async def suggest_images_for_block(
         self,
         epic_id: str,
         block_id: str,
-        count: int = 3
+        count: int = 3,
+        bypass_cache: bool = False,
+        exclude_ids: Optional[List[str]] = None
     ) -> List[dict]:
         """
         Suggest random images WITHOUT text_blocks for a story block.
@@ -428,51 +1065,40 @@ class EpicService:
             epic_id: Epic ID
             block_id: Block ID
             count: Number of suggestions (default 3)
+            bypass_cache: Regenerate subtitles instead of using cached ones
+            exclude_ids: Post ids already suggested in this session
             
         Returns:
             List of suggested post documents with generated subtitles
         """
-        import random
-        
         # Get posts with images but NO text_blocks
         query = {
             "photo_url": {"$exists": True},
-            "$or": [
-                {"text_blocks": {"$exists": False}},
-                {"text_blocks": {"$size": 0}}
-            ]
+            "has_text": {"$ne": True}
         }
         
-        cursor = post_collection.find(query)
-        all_posts = await cursor.to_list(length=None)
-        
-        if not all_posts:
+        # Per-item random lookups on the indexed rand key, only `count` posts read
+        selected = await sample_posts(query, count, exclude_ids=exclude_ids)
+        if not selected:
             return []
         
-        if len(all_posts) <= count:
-            selected = all_posts
-        else:
-            # Random selection
-            selected = random.sample(all_posts, count)
-        
-        # Generate subtitles for each image using Vision AI
-        results = []
-        for post in selected:
+        async def with_subtitle(post: dict) -> dict:
             post_dict = self._post_helper(post)
             
             # Generate subtitle suggestion using Vision AI
             try:
                 subtitle = await vision_service.generate_image_subtitle(
-                    post.get("photo_url")
+                    post.get("photo_url"),
+                    bypass_cache=bypass_cache
                 )
                 post_dict["suggested_subtitle"] = subtitle
             except Exception as e:
                 print(f"Error generating subtitle for post {post.get('_id')}: {e}")
                 post_dict["suggested_subtitle"] = ""
-            
-            results.append(post_dict)
+            return post_dict
         
-        return results
+        # Subtitles for all suggestions concurrently (the gateway caps parallelism)
+        return list(await asyncio.gather(*(with_subtitle(post) for post in selected)))
     
     async def _aggregate_text_from_posts(
         self,
@@ -490,23 +1116,32 @@ class EpicService:
             Aggregated text string
         """
         query = {}
+        source_tags = None
         
         if not use_all and tags:
             query["general_tags"] = {"$in": tags}
+            source_tags = tags
         
-        # Get posts with text_blocks
-        query["text_blocks"] = {"$exists": True, "$not": {"$size": 0}}
-        
-        cursor = post_collection.find(query).limit(50)  # Limit to avoid overwhelming
-        
-        texts = []
-        async for post in cursor:
-            for block in post.get("text_blocks", []):
-                content = block.get("content", "").strip()
-                if content:
-                    texts.append(content)
+        async def build() -> str:
+            # Text blocks of posts with text, newest first, extracted server-side;
+            # stop reading as soon as the prompt budget is used up
+            packer = CorpusPacker(settings.CORPUS_TOKENS_EPIC)
+            cursor = corpus_cursor(query, sort={"updated_at": -1})
+            try:
+                async for doc in cursor:
+                    packer.add(doc["content"])
+                    if packer.full:
+                        break
+            finally:
+                await cursor.close()
+            
+            corpus = packer.result()
+            print(f"📦 Epic corpus: {corpus.report()}")
+            return corpus.text
         
-        return "\n\n".join(texts)
+        # Reused until a write touches text or tags of a matching post
+        entry = await corpus_cache.get_or_build(f"epic:{settings.CORPUS_TOKENS_EPIC}", source_tags, build)
+        return entry.text
     
     async def _sync_block_to_post(self, post_id: str, block_content: str, epic_id: str, epic_title: str):
         """
@@ -530,31 +1165,29 @@ class EpicService:
             "title": epic_title
         }
         
-        # Check if epic is already associated to avoid duplicates
-        post = await post_collection.find_one({"_id": ObjectId(post_id)})
-        associated_epics = post.get("associated_epics", [])
-        
-        # Add if not present
-        if not any(e.get("epic_id") == epic_id for e in associated_epics):
-            await post_collection.update_one(
-                {"_id": ObjectId(post_id)},
-                {
-                    "$push": {
-                        "text_blocks": text_block,
-                        "associated_epics": epic_ref
-                    },
-                    "$set": {"updated_at": datetime.now(timezone.utc)}
-                }
-            )
-        else:
+        # Link the epic only if not already associated (checked in the match filter)
+        post = await update_post_document(
+            ObjectId(post_id),
+            push_text_blocks({
+                "$push": {"associated_epics": epic_ref},
+                "$set": {"updated_at": datetime.now(timezone.utc)}
+            }, [text_block]),
+            extra_filter={"associated_epics.epic_id": {"$ne": epic_id}},
+            projection={"general_tags": 1}
+        )
+        
+        if post is None:
             # Just add text block if epic already linked
-            await post_collection.update_one(
-                {"_id": ObjectId(post_id)},
-                {
-                    "$push": {"text_blocks": text_block},
+            post = await update_post_document(
+                ObjectId(post_id),
+                push_text_blocks({
                     "$set": {"updated_at": datetime.now(timezone.utc)}
-                }
+                }, [text_block]),
+                projection={"general_tags": 1}
             )
+        
+        if post is not None:
+            await corpus_cache.invalidate(post.get("general_tags"))
     
     @staticmethod
     def _post_helper(post_doc: dict) -> dict:
@@ -0,0 +1,202 @@
+"""
+LLM Cache - content-addressed cache for deterministic LLM responses.
+Keys are derived from (model, normalized prompt, sampling params).
+Two tiers: an in-process LRU for hot entries and a Mongo collection with a
+TTL index so entries survive restarts and are shared between workers.
+"""
+
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReplaceOne
+
+from backend.config import settings
+from backend.database import llm_cache_collection
+
+# Params that change how a request is sent, not what the model returns
+_NON_SEMANTIC_PARAMS = {"timeout", "stream"}
+
+
+class LLMCache:
+    """
+    Two-tier (memory LRU + MongoDB) cache for LLM completions.
+    Mongo failures are logged and treated as misses so the cache can never
+    break a generation. The TTL index is declared in backend/indexes.py.
+    """
+
+    def __init__(self, collection, max_entries: int, ttl_seconds: int):
+        """Initialize the LRU tier and remember the Mongo tier settings."""
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self.memory_hits = 0
+        self.mongo_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize_text(text: str) -> str:
+        """Collapse whitespace so indentation changes don't produce new keys."""
+        return re.sub(r"\s+", " ", text).strip()
+
+    @classmethod
+    def _normalize_content(cls, content: Any) -> Any:
+        """Normalize message content (plain text or multimodal parts)."""
+        if isinstance(content, str):
+            return cls._normalize_text(content)
+        if isinstance(content, list):
+            parts = []
+            for part in content:
+                if isinstance(part, dict) and part.get("type") == "text":
+                    parts.append({"type": "text", "text": cls._normalize_text(part.get("text", ""))})
+                else:
+                    parts.append(part)
+            return parts
+        return content
+
+    @classmethod
+    def make_key(cls, model: str, messages: List[Dict[str, Any]], params: Dict[str, Any]) -> str:
+        """
+        Build a content-addressed key for a completion request.
+
+        Args:
+            model: Resolved model id
+            messages: Chat messages
+            params: Sampling parameters
+
+        Returns:
+            Hex SHA-256 digest
+        """
+        payload = {
+            "model": model,
+            "messages": [
+                {"role": m.get("role"), "content": cls._normalize_content(m.get("content"))}
+                for m in messages
+            ],
+            "params": {k: v for k, v in sorted(params.items()) if k not in _NON_SEMANTIC_PARAMS},
+        }
+        encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, value: str) -> None:
+        """Insert into the LRU tier, evicting the least recently used entry."""
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Returns:
+            The cached response text, or None on a miss
+        """
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return self._memory[key]
+
+        try:
+            doc = await self.collection.find_one({"_id": key}, {"response": 1})
+        except Exception as e:
+            print(f"⚠️ LLM cache lookup failed: {e}")
+            doc = None
+
+        if doc is not None:
+            self.mongo_hits += 1
+            self._remember(key, doc["response"])
+            return doc["response"]
+
+        self.misses += 1
+        return None
+
+    async def get_many(self, keys: List[str]) -> Dict[str, str]:
+        """
+        Look up several cached responses with at most one Mongo query.
+
+        Returns:
+            {key: response} for the keys that hit
+        """
+        found: Dict[str, str] = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                found[key] = self._memory[key]
+            else:
+                missing.append(key)
+
+        if missing:
+            try:
+                async for doc in self.collection.find({"_id": {"$in": missing}}, {"response": 1}):
+                    self.mongo_hits += 1
+                    self._remember(doc["_id"], doc["response"])
+                    found[doc["_id"]] = doc["response"]
+            except Exception as e:
+                print(f"⚠️ LLM cache lookup failed: {e}")
+            self.misses += len(missing) - sum(1 for key in missing if key in found)
+        return found
+
+    async def set_many(self, values: Dict[str, str], model: str) -> None:
+        """Store several responses in both tiers with one bulk write."""
+        if not values:
+            return
+        now = datetime.now(timezone.utc)
+        for key, value in values.items():
+            self._remember(key, value)
+        try:
+            await self.collection.bulk_write([
+                ReplaceOne(
+                    {"_id": key},
+                    {"_id": key, "model": model, "response": value, "created_at": now},
+                    upsert=True
+                )
+                for key, value in values.items()
+            ], ordered=False)
+        except Exception as e:
+            print(f"⚠️ LLM cache write failed: {e}")
+
+    async def set(self, key: str, value: str, model: str) -> None:
+        """Store a response in both tiers."""
+        self._remember(key, value)
+        try:
+            await self.collection.replace_one(
+                {"_id": key},
+                {
+                    "_id": key,
+                    "model": model,
+                    "response": value,
+                    "created_at": datetime.now(timezone.utc),
+                },
+                upsert=True
+            )
+        except Exception as e:
+            print(f"⚠️ LLM cache write failed: {e}")
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this worker process."""
+        lookups = self.memory_hits + self.mongo_hits + self.misses
+        hits = self.memory_hits + self.mongo_hits
+        return {
+            "memory_hits": self.memory_hits,
+            "mongo_hits": self.mongo_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "max_memory_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+# Singleton instance
+llm_cache = LLMCache(
+    llm_cache_collection,
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,100 @@
+"""
+LLM Client Registry - one process-wide Groq client and its HTTP connection pool.
+Owns the per-model configuration (model id, timeout, max_tokens) so services
+refer to models by role instead of hard-coding ids and building their own clients.
+"""
+
+import asyncio
+from typing import Dict, Optional
+import httpx
+from groq import AsyncGroq, DefaultAsyncHttpxClient
+from pydantic import BaseModel
+from backend.config import settings
+
+
+class ModelConfig(BaseModel):
+    """Configuration for one model role."""
+    model_id: str
+    timeout: float = 60.0  # Seconds for a whole completion request
+    max_tokens: Optional[int] = None  # Default when the caller doesn't pass one
+
+
+# Model roles used across the services
+DEFAULT_MODELS: Dict[str, ModelConfig] = {
+    # Long-form generation and literary refinement
+    "literary": ModelConfig(model_id="openai/gpt-oss-120b", timeout=110.0),
+    # Vision chat / rewrite / node expansion in the editor
+    "editor_vision": ModelConfig(model_id="meta-llama/llama-4-maverick-17b-128e-instruct", timeout=60.0, max_tokens=1500),
+    # Image analysis for subtitles, phrases and vision suggestions
+    "vision": ModelConfig(model_id="meta-llama/llama-4-scout-17b-16e-instruct", timeout=45.0, max_tokens=1024),
+    # Story segmentation and coherence scoring
+    "analysis": ModelConfig(model_id="llama-3.3-70b-versatile", timeout=60.0, max_tokens=4096),
+}
+
+
+class LLMClientRegistry:
+    """
+    Holds the single AsyncGroq client shared by every service.
+    The client is created lazily so the pool binds to the running event loop.
+    """
+
+    def __init__(self, models: Dict[str, ModelConfig]):
+        """Register the model roles; the client itself is built on first use."""
+        self.models = dict(models)
+        self._client: Optional[AsyncGroq] = None
+
+    def is_configured(self) -> bool:
+        """Check if a Groq API key is available."""
+        return bool(settings.GROQ_API_KEY)
+
+    def get_client(self) -> AsyncGroq:
+        """Return the shared client, creating it and its connection pool if needed."""
+        if self._client is None:
+            http_client = DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(120.0, connect=10.0),
+            )
+            self._client = AsyncGroq(api_key=settings.GROQ_API_KEY, http_client=http_client)
+        return self._client
+
+    def model(self, role: str) -> ModelConfig:
+        """
+        Resolve a model role to its configuration.
+        Unknown roles are treated as raw model ids with default settings.
+        """
+        config = self.models.get(role)
+        if config is None:
+            config = ModelConfig(model_id=role)
+        return config
+
+    async def warm_up(self) -> None:
+        """
+        Open keep-alive connections to Groq ahead of the first real request,
+        so the TLS handshakes are paid at startup instead of by a user.
+        """
+        if not self.is_configured():
+            return
+
+        client = self.get_client()
+        try:
+            await asyncio.gather(*[
+                client.models.list(timeout=10.0)
+                for _ in range(settings.LLM_WARM_CONNECTIONS)
+            ])
+            print(f"✅ Warmed {settings.LLM_WARM_CONNECTIONS} Groq connection(s)")
+        except Exception as e:
+            print(f"⚠️ Groq connection warm-up failed: {e}")
+
+    async def close(self) -> None:
+        """Close the shared client and release its pooled connections."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+# Singleton instance
+llm_client_registry = LLMClientRegistry(DEFAULT_MODELS)
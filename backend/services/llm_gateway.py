@@ -0,0 +1,154 @@
+"""
+LLM Gateway - the single async entry point for Groq chat completions.
+Every service that talks to an LLM goes through here so that slow generations
+never block the event loop and only a bounded number run at the same time.
+"""
+
+import asyncio
+import json
+import re
+from typing import List, Dict, Any, AsyncIterator, Optional
+from backend.config import settings
+from backend.services.llm_clients import llm_client_registry
+from backend.services.llm_cache import llm_cache
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised when a completion is requested but GROQ_API_KEY is not configured."""
+
+
+def parse_json_object(text: str) -> Optional[dict]:
+    """
+    Parse a JSON object from model output.
+    Falls back to the outermost {...} span when the model added extra text.
+    """
+    try:
+        result = json.loads(text)
+        return result if isinstance(result, dict) else None
+    except (TypeError, ValueError):
+        pass
+
+    json_match = re.search(r'\{.*\}', text or "", re.DOTALL)
+    if json_match:
+        try:
+            return json.loads(json_match.group())
+        except ValueError:
+            return None
+    return None
+
+
+class LLMGateway:
+    """
+    Async wrapper around the Groq chat completions API.
+    Calls are awaited (non-blocking) and gated by a semaphore so a burst of
+    generations cannot starve the worker of Groq connections.
+    """
+
+    def __init__(self, max_concurrency: int = 4):
+        """Initialize the concurrency limiter; the client comes from the shared registry."""
+        if not llm_client_registry.is_configured():
+            print("Warning: GROQ_API_KEY not found in settings. LLM gateway is disabled.")
+
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def is_available(self) -> bool:
+        """Check if the gateway can reach Groq."""
+        return llm_client_registry.is_configured()
+
+    async def chat(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        cache: bool = False,
+        bypass_cache: bool = False,
+        **params: Any
+    ) -> str:
+        """
+        Run a chat completion and return the text of the first choice.
+
+        Args:
+            model: Model role from the client registry (or a raw Groq model id)
+            messages: Chat messages in OpenAI format
+            cache: Serve/store the response through the LLM cache
+                   (only for deterministic, repeatable prompts)
+            bypass_cache: Skip the cache lookup but still refresh the stored entry
+            **params: Extra sampling parameters (temperature, max_tokens, ...)
+
+        Returns:
+            The message content of the first choice
+        """
+        if not self.is_available():
+            raise LLMUnavailableError("LLM gateway is not configured (missing GROQ_API_KEY).")
+
+        config = llm_client_registry.model(model)
+        if config.max_tokens is not None:
+            params.setdefault("max_tokens", config.max_tokens)
+        params.setdefault("timeout", config.timeout)
+
+        cache_key = None
+        if cache:
+            cache_key = llm_cache.make_key(config.model_id, messages, params)
+            if not bypass_cache:
+                cached = await llm_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
+        async with self._semaphore:
+            completion = await llm_client_registry.get_client().chat.completions.create(
+                model=config.model_id,
+                messages=messages,
+                **params
+            )
+
+        content = completion.choices[0].message.content
+        if cache_key is not None and content:
+            await llm_cache.set(cache_key, content, config.model_id)
+        return content
+
+    async def stream_chat(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        **params: Any
+    ) -> AsyncIterator[str]:
+        """
+        Run a streaming chat completion, yielding content deltas as they arrive.
+        The concurrency slot is held until the stream is exhausted or closed.
+
+        Args:
+            model: Model role from the client registry (or a raw Groq model id)
+            messages: Chat messages in OpenAI format
+            **params: Extra sampling parameters (temperature, max_tokens, ...)
+
+        Yields:
+            Non-empty text deltas
+        """
+        if not self.is_available():
+            raise LLMUnavailableError("LLM gateway is not configured (missing GROQ_API_KEY).")
+
+        config = llm_client_registry.model(model)
+        if config.max_tokens is not None:
+            params.setdefault("max_tokens", config.max_tokens)
+        params.setdefault("timeout", config.timeout)
+
+        async with self._semaphore:
+            stream = await llm_client_registry.get_client().chat.completions.create(
+                model=config.model_id,
+                messages=messages,
+                stream=True,
+                **params
+            )
+            try:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        yield delta
+            finally:
+                await stream.close()
+
+
+# Singleton instance
+llm_gateway = LLMGateway(max_concurrency=settings.LLM_MAX_CONCURRENCY)
@@ -1,41 +1,27 @@
+import asyncio
 import json
-from groq import Groq
+from typing import AsyncIterator, List, Optional, Tuple
+from backend.services.llm_gateway import llm_gateway
+from backend.services.corpus_packer import chunk_blocks, count_tokens, pack_blocks, pack_text
 from backend.config import settings
 
+# Output instructions for the streaming story prompts: the tokens go straight
+# to the client, so the model must write prose, not a JSON envelope
+_PLAIN_STORY_FORMAT = """Return ONLY the story itself as plain prose, with paragraphs separated by blank lines.
+        Do not wrap it in JSON or markdown, and do not add a title, headings or any commentary."""
+
 class LLMService:
     def __init__(self):
-        # Initialize Groq client with API key from settings
-        if settings.GROQ_API_KEY:
-            self.client = Groq(api_key=settings.GROQ_API_KEY)
-        else:
-            self.client = None
-            print("Warning: GROQ_API_KEY not found in settings. LLM features will be disabled.")
-            
-        # Model can be easily switched here
-        self.model = "openai/gpt-oss-120b"
-
-    def generate_summary_and_plots(self, text_content: str) -> dict:
-        """
-        Analyzes the provided text content to generate a summary and plot suggestions.
-        Returns a dictionary with 'summary' and 'plot_suggestions'.
-        """
-        if not self.client:
-            return {
-                "summary": "LLM service is not configured (missing GROQ_API_KEY).",
-                "plot_suggestions": []
-            }
-
-        if not text_content.strip():
-            return {
-                "summary": "No text content available to summarize.",
-                "plot_suggestions": []
-            }
+        # Model role from the shared client registry (see llm_clients.py)
+        self.model = "literary"
 
+    def _summary_and_plots_messages(self, content: str, source: str) -> list:
+        """Builds the chat messages for the summary + plot suggestions prompt."""
         prompt = f"""
-        You are a creative assistant. Analyze the following text content extracted from posts:
+        You are a creative assistant. Analyze the following {source}:
 
         TEXT CONTENT:
-        {text_content[:10000]}  # Limit content length to avoid token limits if necessary
+        {content}
 
         TASKS:
         1. Summarize the main themes and details in the text.
@@ -56,24 +42,47 @@ class LLMService:
         Do not include any markdown formatting (like ```json) or extra text outside the JSON object.
         """
 
+        return [
+            {
+                "role": "system",
+                "content": "You are a helpful assistant that outputs JSON."
+            },
+            {
+                "role": "user",
+                "content": prompt,
+            }
+        ]
+
+    async def generate_summary_and_plots(self, text_content: str) -> dict:
+        """
+        Analyzes the provided text content to generate a summary and plot suggestions.
+        Returns a dictionary with 'summary' and 'plot_suggestions'.
+        """
+        if not llm_gateway.is_available():
+            return {
+                "summary": "LLM service is not configured (missing GROQ_API_KEY).",
+                "plot_suggestions": []
+            }
+
+        if not text_content.strip():
+            return {
+                "summary": "No text content available to summarize.",
+                "plot_suggestions": []
+            }
+
+        # Whole, deduplicated blocks up to the token budget
+        corpus = pack_text(text_content, settings.CORPUS_TOKENS_SUMMARY)
+        print(f"📦 Summary corpus: {corpus.report()}")
+
         try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful assistant that outputs JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    }
-                ],
+            response_content = await llm_gateway.chat(
+                messages=self._summary_and_plots_messages(corpus.text, "text content extracted from posts"),
                 model=self.model,
                 response_format={"type": "json_object"},
             )
-
-            response_content = chat_completion.choices[0].message.content
-            return json.loads(response_content)
+            result = json.loads(response_content)
+            result["corpus"] = corpus.report()
+            return result
 
         except Exception as e:
             print(f"Error in LLM generation: {e}")
@@ -82,18 +91,141 @@ class LLMService:
                 "plot_suggestions": ["Error generating suggestions."]
             }
 
-    def generate_story_from_plot(self, aggregated_text: str, plot_suggestion: str, user_commentary: str) -> dict:
+    async def _summarize_chunk(self, chunk: str, semaphore: asyncio.Semaphore) -> Optional[str]:
         """
-        Generates a long story based on the aggregated text, a specific plot suggestion, and user commentary.
+        Map step: summarize one corpus chunk.
+        The prompt is a pure function of the chunk text, so responses are cached
+        by chunk content and unchanged chunks are never re-summarized.
         """
-        if not self.client:
-            return {"story": "LLM service is not configured (missing GROQ_API_KEY)."}
+        prompt = f"""
+        Summarize the following excerpt from a collection of posts. Keep the
+        concrete details a storyteller would need: characters, places, images,
+        events, moods and recurring motifs. Use at most 200 words.
+
+        EXCERPT:
+        {chunk}
+
+        OUTPUT FORMAT:
+        Return ONLY a valid JSON object: {{"summary": "..."}}
+        """
+
+        try:
+            async with semaphore:
+                response_content = await llm_gateway.chat(
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "You are a helpful assistant that outputs JSON."
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt,
+                        }
+                    ],
+                    model=self.model,
+                    response_format={"type": "json_object"},
+                    cache=True,
+                )
+            return json.loads(response_content).get("summary") or None
+        except Exception as e:
+            print(f"Error summarizing corpus chunk: {e}")
+            return None
+
+    async def _map_chunks(self, chunks: List[str], semaphore: asyncio.Semaphore) -> Tuple[List[str], int]:
+        """Summarize chunks concurrently; returns (summaries in order, failed count)."""
+        summaries = await asyncio.gather(*(self._summarize_chunk(chunk, semaphore) for chunk in chunks))
+        kept = [summary for summary in summaries if summary]
+        return kept, len(summaries) - len(kept)
 
+    async def generate_hierarchical_summary(self, text_content: str) -> dict:
+        """
+        Map-reduce variant of generate_summary_and_plots covering the whole corpus.
+
+        The corpus is deduplicated and split into SUMMARY_CHUNK_TOKENS chunks,
+        chunks are summarized concurrently (at most SUMMARY_MAP_CONCURRENCY at a
+        time), chunk summaries are re-chunked and summarized again until they fit
+        CORPUS_TOKENS_SUMMARY, and a final reduce produces the summary and plots.
+        """
+        if not llm_gateway.is_available():
+            return {
+                "summary": "LLM service is not configured (missing GROQ_API_KEY).",
+                "plot_suggestions": []
+            }
+
+        if not text_content.strip():
+            return {
+                "summary": "No text content available to summarize.",
+                "plot_suggestions": []
+            }
+
+        chunks, corpus = chunk_blocks(text_content.split("\n\n"), settings.SUMMARY_CHUNK_TOKENS)
+        print(f"📦 Summary corpus: {corpus.report()} in {len(chunks)} chunks")
+
+        semaphore = asyncio.Semaphore(settings.SUMMARY_MAP_CONCURRENCY)
+        summaries, failed = await self._map_chunks(chunks, semaphore)
+        levels = 1
+
+        # Reduce intermediate summaries until they fit the final prompt
+        while len(summaries) > 1 and count_tokens("\n\n".join(summaries)) > settings.CORPUS_TOKENS_SUMMARY:
+            level_chunks, _ = chunk_blocks(summaries, settings.SUMMARY_CHUNK_TOKENS)
+            if len(level_chunks) >= len(summaries):
+                break  # summaries too long to merge further; pack_text trims below
+            summaries, level_failed = await self._map_chunks(level_chunks, semaphore)
+            failed += level_failed
+            levels += 1
+
+        if not summaries:
+            return {
+                "summary": "Error generating summary.",
+                "plot_suggestions": ["Error generating suggestions."]
+            }
+
+        reduced = pack_blocks(summaries, settings.CORPUS_TOKENS_SUMMARY)
+
+        try:
+            response_content = await llm_gateway.chat(
+                messages=self._summary_and_plots_messages(
+                    reduced.text,
+                    "summaries of consecutive parts of a collection of posts"
+                ),
+                model=self.model,
+                response_format={"type": "json_object"},
+            )
+            result = json.loads(response_content)
+            result["corpus"] = corpus.report()
+            result["map_reduce"] = {
+                "chunks": len(chunks),
+                "levels": levels,
+                "failed_chunks": failed,
+            }
+            return result
+
+        except Exception as e:
+            print(f"Error in LLM generation: {e}")
+            return {
+                "summary": "Error generating summary.",
+                "plot_suggestions": ["Error generating suggestions."]
+            }
+
+    def _story_from_plot_messages(self, aggregated_text: str, plot_suggestion: str, user_commentary: str, plain_text: bool = False) -> list:
+        """
+        Builds the chat messages for generate_story_from_plot and its streaming variant.
+        plain_text asks for the bare story (streamed to clients as it is written)
+        instead of the JSON object the blocking call parses.
+        """
+        context = pack_text(aggregated_text, settings.CORPUS_TOKENS_STORY)
+        if plain_text:
+            output_format = _PLAIN_STORY_FORMAT
+        else:
+            output_format = """Return ONLY a valid JSON object with the following structure:
+        {
+            "story": "Your long generated story here..."
+        }"""
         prompt = f"""
         You are a creative storyteller. Write a compelling, long-form story based on the following inputs:
 
         1. BACKGROUND CONTEXT (from existing posts):
-        {aggregated_text[:5000]}
+        {context.text}
 
         2. PLOT SUGGESTION (core idea):
         {plot_suggestion}
@@ -108,41 +240,58 @@ class LLMService:
         - Incorporate the user's commentary to refine the style, add specific details, or guide the character development as requested.
         
         OUTPUT FORMAT:
-        Return ONLY a valid JSON object with the following structure:
-        {{
-            "story": "Your long generated story here..."
-        }}
+        {output_format}
         """
 
+        return [
+            {
+                "role": "system",
+                "content": "You are a creative storyteller." if plain_text else "You are a helpful assistant that outputs JSON."
+            },
+            {
+                "role": "user",
+                "content": prompt,
+            }
+        ]
+
+    async def generate_story_from_plot(self, aggregated_text: str, plot_suggestion: str, user_commentary: str) -> dict:
+        """
+        Generates a long story based on the aggregated text, a specific plot suggestion, and user commentary.
+        """
+        if not llm_gateway.is_available():
+            return {"story": "LLM service is not configured (missing GROQ_API_KEY)."}
+
+        messages = self._story_from_plot_messages(aggregated_text, plot_suggestion, user_commentary)
+
         try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful assistant that outputs JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    }
-                ],
+            response_content = await llm_gateway.chat(
+                messages=messages,
                 model=self.model,
                 response_format={"type": "json_object"},
             )
-
-            response_content = chat_completion.choices[0].message.content
             return json.loads(response_content)
 
         except Exception as e:
             print(f"Error in LLM story generation: {e}")
             return {"story": "Error generating story."}
 
-    def generate_story_flow(self, story: str, detail_level: str = "med") -> dict:
+    async def stream_story_from_plot(self, aggregated_text: str, plot_suggestion: str, user_commentary: str) -> AsyncIterator[str]:
+        """
+        Streaming variant of generate_story_from_plot.
+        Yields story prose deltas as they arrive; the concatenated text is the
+        'story' value the blocking call returns.
+        """
+        messages = self._story_from_plot_messages(aggregated_text, plot_suggestion, user_commentary, plain_text=True)
+        async for token in llm_gateway.stream_chat(model=self.model, messages=messages):
+            yield token
+
+    async def generate_story_flow(self, story: str, detail_level: str = "med", bypass_cache: bool = False) -> dict:
         """
         Generates a summarized flow of the story in phrases/keywords (ev1->ev2->ev3 format).
         detail_level: "small" (3-5 events), "med" (5-10 events), "big" (10-15 events)
+        Responses are cached by prompt; bypass_cache forces a fresh generation.
         """
-        if not self.client:
+        if not llm_gateway.is_available():
             return {"flow": "LLM service is not configured (missing GROQ_API_KEY)."}
 
         # Determine event count based on detail level
@@ -179,7 +328,7 @@ class LLMService:
         """
 
         try:
-            chat_completion = self.client.chat.completions.create(
+            response_content = await llm_gateway.chat(
                 messages=[
                     {
                         "role": "system",
@@ -192,9 +341,9 @@ class LLMService:
                 ],
                 model=self.model,
                 response_format={"type": "json_object"},
+                cache=True,
+                bypass_cache=bypass_cache,
             )
-
-            response_content = chat_completion.choices[0].message.content
             return json.loads(response_content)
 
         except Exception as e:
@@ -203,30 +352,28 @@ class LLMService:
 
 
 
-    def generate_epic_story(self, aggregated_text: str, generation_prompt: str, user_commentary: str = "", source_tags: list = None) -> dict:
+    def _epic_story_messages(self, aggregated_text: str, generation_prompt: str, user_commentary: str = "", source_tags: list = None, plain_text: bool = False) -> list:
         """
-        Generates a long-form epic story based on aggregated text from posts.
-        This is specifically for the Epic/Novel feature.
-        
-        Args:
-            aggregated_text: Combined text from selected posts
-            generation_prompt: Main prompt/direction for the story
-            user_commentary: Additional user input/direction
-            source_tags: Tags used to source the content
-            
-        Returns:
-            Dictionary with 'story' key containing the generated epic
+        Builds the chat messages for generate_epic_story and its streaming variant.
+        plain_text asks for the bare story instead of the JSON object.
         """
-        if not self.client:
-            return {"story": "LLM service is not configured (missing GROQ_API_KEY)."}
-
         tag_context = f"Source tags: {', '.join(source_tags)}" if source_tags else "No specific tags"
+        context = pack_text(aggregated_text, settings.CORPUS_TOKENS_EPIC)
+        if plain_text:
+            output_format = _PLAIN_STORY_FORMAT
+        else:
+            output_format = """Return ONLY a valid JSON object with the following structure:
+        {
+            "story": "Your epic story here...",
+            "title_suggestion": "Suggested title for the epic",
+            "themes": ["theme1", "theme2", "theme3"]
+        }"""
         
         prompt = f"""
         You are a master storyteller creating an epic, long-form narrative.
         
         CONTEXT FROM EXISTING CONTENT:
-        {aggregated_text[:8000]}
+        {context.text}
         
         {tag_context}
         
@@ -250,32 +397,47 @@ class LLMService:
         (as images will be paired with sections of this story).
         
         OUTPUT FORMAT:
-        Return ONLY a valid JSON object with the following structure:
-        {{
-            "story": "Your epic story here...",
-            "title_suggestion": "Suggested title for the epic",
-            "themes": ["theme1", "theme2", "theme3"]
-        }}
+        {output_format}
         """
 
+        system = "You are a master storyteller specializing in epic, literary narratives."
+        return [
+            {
+                "role": "system",
+                "content": system if plain_text else f"{system} You output JSON."
+            },
+            {
+                "role": "user",
+                "content": prompt,
+            }
+        ]
+
+    async def generate_epic_story(self, aggregated_text: str, generation_prompt: str, user_commentary: str = "", source_tags: list = None) -> dict:
+        """
+        Generates a long-form epic story based on aggregated text from posts.
+        This is specifically for the Epic/Novel feature.
+        
+        Args:
+            aggregated_text: Combined text from selected posts
+            generation_prompt: Main prompt/direction for the story
+            user_commentary: Additional user input/direction
+            source_tags: Tags used to source the content
+            
+        Returns:
+            Dictionary with 'story' key containing the generated epic
+        """
+        if not llm_gateway.is_available():
+            return {"story": "LLM service is not configured (missing GROQ_API_KEY)."}
+
+        messages = self._epic_story_messages(aggregated_text, generation_prompt, user_commentary, source_tags)
+
         try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a master storyteller specializing in epic, literary narratives. You output JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    }
-                ],
+            response_content = await llm_gateway.chat(
+                messages=messages,
                 model=self.model,
                 response_format={"type": "json_object"},
                 temperature=0.8,  # Higher creativity for epic stories
             )
-
-            response_content = chat_completion.choices[0].message.content
             return json.loads(response_content)
 
         except Exception as e:
@@ -286,26 +448,85 @@ class LLMService:
                 "themes": []
             }
 
-    def complete_epic_story(self, existing_story: str, continuation_prompt: str, user_commentary: str = "") -> dict:
+    async def stream_epic_story(self, aggregated_text: str, generation_prompt: str, user_commentary: str = "", source_tags: list = None) -> AsyncIterator[str]:
+        """
+        Streaming variant of generate_epic_story.
+        Yields story prose deltas as they arrive; the concatenated text is the
+        'story' value of the blocking call (see generate_story_themes for the rest).
+        """
+        messages = self._epic_story_messages(aggregated_text, generation_prompt, user_commentary, source_tags, plain_text=True)
+        async for token in llm_gateway.stream_chat(model=self.model, messages=messages, temperature=0.8):
+            yield token
+
+    async def generate_story_themes(self, story: str) -> List[str]:
+        """
+        Themes of a finished story (the 'themes' field a streamed epic story
+        does not carry). Cached by story text; [] on failure.
+        """
+        if not llm_gateway.is_available() or not story.strip():
+            return []
+
+        prompt = f"""
+        List the 3-5 main themes of the following story, each as a short phrase.
+
+        STORY:
+        {pack_text(story, settings.CORPUS_TOKENS_EPIC).text}
+
+        OUTPUT FORMAT:
+        Return ONLY a valid JSON object: {{"themes": ["theme1", "theme2", "theme3"]}}
+        """
+
+        try:
+            response_content = await llm_gateway.chat(
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that outputs JSON."},
+                    {"role": "user", "content": prompt},
+                ],
+                model=self.model,
+                response_format={"type": "json_object"},
+                max_tokens=150,
+                cache=True,
+            )
+            themes = json.loads(response_content).get("themes", [])
+            return [str(theme) for theme in themes] if isinstance(themes, list) else []
+
+        except Exception as e:
+            print(f"Error in story theme extraction: {e}")
+            return []
+
+    async def complete_epic_story(
+        self,
+        existing_story: str,
+        continuation_prompt: str,
+        user_commentary: str = "",
+        story_memory: Optional[str] = None
+    ) -> dict:
         """
         Continues/completes an existing epic story.
         
         Args:
-            existing_story: The story so far
+            existing_story: The most recent part of the story, verbatim
             continuation_prompt: Direction for how to continue
             user_commentary: Additional user guidance
+            story_memory: Rendered narrative memory (summary, characters, threads)
+                of everything before `existing_story`
             
         Returns:
             Dictionary with 'continuation' key containing the new content
         """
-        if not self.client:
+        if not llm_gateway.is_available():
             return {"continuation": "LLM service is not configured (missing GROQ_API_KEY)."}
 
+        memory_section = f"""
+        EARLIER IN THE STORY (narrative memory):
+        {story_memory}
+        """ if story_memory else ""
+
         prompt = f"""
         You are continuing an epic story. Here is the story so far:
-        
-        EXISTING STORY:
-        {existing_story[:8000]}
+        {memory_section}
+        MOST RECENT PASSAGES (verbatim):
+        {existing_story[-8000:]}
         
         CONTINUATION DIRECTION:
         {continuation_prompt}
@@ -329,7 +550,7 @@ class LLMService:
         """
 
         try:
-            chat_completion = self.client.chat.completions.create(
+            response_content = await llm_gateway.chat(
                 messages=[
                     {
                         "role": "system",
@@ -344,14 +565,89 @@ class LLMService:
                 response_format={"type": "json_object"},
                 temperature=0.8,
             )
-
-            response_content = chat_completion.choices[0].message.content
             return json.loads(response_content)
 
         except Exception as e:
             print(f"Error in story completion: {e}")
             return {"continuation": "Error generating story continuation."}
 
+    async def update_narrative_memory(self, memory: dict, new_passages: str, summary_words: int) -> Optional[dict]:
+        """
+        Fold new story passages into an epic's narrative memory.
+        
+        Args:
+            memory: Current memory ('summary', 'characters', 'threads')
+            new_passages: Story text that follows what the memory covers
+            summary_words: Word cap for the rewritten summary
+            
+        Returns:
+            Updated {'summary', 'characters', 'threads'}, or None on failure
+        """
+        if not llm_gateway.is_available():
+            return None
+
+        current = json.dumps({
+            "summary": memory.get("summary", ""),
+            "characters": memory.get("characters", []),
+            "threads": memory.get("threads", []),
+        }, ensure_ascii=False)
+
+        prompt = f"""
+        You maintain the running memory of a long story so that a writer can
+        continue it without rereading it.
+
+        CURRENT MEMORY (covers the story up to the passages below):
+        {current}
+
+        NEW PASSAGES:
+        {new_passages}
+
+        TASK:
+        Update the memory to also cover the new passages:
+        1. "summary": the whole story so far, at most {summary_words} words; compress older events more than recent ones
+        2. "characters": at most 12 entries {{"name": ..., "notes": ...}} with role, traits, relationships and current situation
+        3. "threads": at most 8 open plot threads, promises or mysteries not yet resolved (drop resolved ones)
+
+        OUTPUT FORMAT:
+        Return ONLY a valid JSON object:
+        {{
+            "summary": "...",
+            "characters": [{{"name": "...", "notes": "..."}}],
+            "threads": ["..."]
+        }}
+        """
+
+        try:
+            response_content = await llm_gateway.chat(
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a meticulous story editor. You output JSON."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt,
+                    }
+                ],
+                model=self.model,
+                response_format={"type": "json_object"},
+                temperature=0.3,
+            )
+            result = json.loads(response_content)
+        except Exception as e:
+            print(f"Error updating narrative memory: {e}")
+            return None
+
+        characters = [
+            {"name": str(c.get("name", "")), "notes": str(c.get("notes", ""))}
+            for c in result.get("characters") or [] if isinstance(c, dict) and c.get("name")
+        ]
+        return {
+            "summary": str(result.get("summary") or memory.get("summary", "")),
+            "characters": characters[:12],
+            "threads": [str(t) for t in result.get("threads") or [] if t][:8],
+        }
+
 
 
 llm_service = LLMService()
@@ -0,0 +1,246 @@
+"""
+Narrative Memory - constant-size context for continuing long epics.
+
+Each epic carries a `narrative_memory` field:
+    {summary, characters: [{name, notes}], threads: [str],
+     summarized_through: <sequence_order>, updated_at}
+The memory covers every block up to `summarized_through`; the last
+NARRATIVE_MEMORY_RECENT_BLOCKS blocks are always read verbatim. After each
+continuation, blocks that slid out of the verbatim window are folded into
+the memory (a small LLM call over just those blocks), so a continuation
+prompt is memory + K recent blocks no matter how long the epic grows.
+
+Rewriting an epic's blocks (edits, re-segmentation) clears the memory; it is
+rebuilt from the blocks in the background. A continuation only folds up to
+NARRATIVE_MEMORY_SYNC_FOLDS steps before answering. Of the blocks still
+waiting to be folded, only the newest ones that fit the fold token budget
+(at most _FOLD_MAX_BLOCKS) are sent verbatim; older unfolded blocks are
+left out of the prompt until the background refresh catches up. For a
+cleared or legacy memory on a long epic that can be most of the story, so
+run the backfill below after deploying and expect thinner context on the
+first continuation after a block rewrite.
+migrations/backfill_narrative_memory.py builds the memory of existing epics.
+"""
+
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+
+from backend.config import settings
+from backend.database import epic_collection
+from backend.services.corpus_packer import count_tokens
+from backend.services.llm_service import llm_service
+from backend.services.story_block_store import story_block_store, is_external
+
+# Blocks read per fold step (the token budget usually stops earlier)
+_FOLD_MAX_BLOCKS = 12
+
+
+def empty_memory() -> dict:
+    """Memory of an epic nothing has been folded into yet."""
+    return {"summary": "", "characters": [], "threads": [], "summarized_through": 0}
+
+
+def render_memory(memory: dict) -> str:
+    """Memory as prompt text (empty string when there is nothing to say)."""
+    parts = []
+    if memory.get("summary"):
+        parts.append(f"Summary: {memory['summary']}")
+    if memory.get("characters"):
+        parts.append("Characters:\n" + "\n".join(
+            f"- {c['name']}: {c.get('notes', '')}" for c in memory["characters"]
+        ))
+    if memory.get("threads"):
+        parts.append("Open threads:\n" + "\n".join(f"- {thread}" for thread in memory["threads"]))
+    return "\n\n".join(parts)
+
+
+class NarrativeMemoryService:
+    """Reads, folds and stores per-epic narrative memory."""
+
+    def __init__(self, recent_blocks: int, summary_words: int, fold_tokens: int, sync_folds: int):
+        """
+        Args:
+            recent_blocks: Blocks kept verbatim in continuation prompts (K)
+            summary_words: Word cap of the running summary
+            fold_tokens: Maximum tokens of block text folded per LLM call
+            sync_folds: Fold steps a request waits for before answering
+        """
+        self.recent_blocks = recent_blocks
+        self.summary_words = summary_words
+        self.fold_tokens = fold_tokens
+        self.sync_folds = sync_folds
+
+    async def _tail_blocks(self, epic_doc: dict) -> List[dict]:
+        """Last K blocks in sequence order, without loading the rest."""
+        if is_external(epic_doc):
+            cursor = story_block_store.collection.find(
+                {"epic_id": str(epic_doc["_id"])}, {"_id": 0, "epic_id": 0}
+            ).sort("sequence_order", -1).limit(self.recent_blocks)
+            blocks = await cursor.to_list(length=self.recent_blocks)
+            return blocks[::-1]
+
+        doc = await epic_collection.find_one(
+            {"_id": epic_doc["_id"]}, {"story_blocks": {"$slice": -self.recent_blocks}}
+        )
+        return (doc or {}).get("story_blocks", [])
+
+    async def _blocks_after(self, epic_doc: dict, after: int, before: int) -> List[dict]:
+        """Up to _FOLD_MAX_BLOCKS blocks with after < sequence_order < before."""
+        if is_external(epic_doc):
+            blocks = await story_block_store.list_blocks(str(epic_doc["_id"]), after=after, limit=_FOLD_MAX_BLOCKS)
+        else:
+            pipeline = [
+                {"$match": {"_id": epic_doc["_id"]}},
+                {"$project": {"blocks": {"$slice": [
+                    {"$filter": {
+                        "input": "$story_blocks",
+                        "cond": {"$gt": ["$$this.sequence_order", after]}
+                    }},
+                    _FOLD_MAX_BLOCKS
+                ]}}},
+            ]
+            docs = await epic_collection.aggregate(pipeline).to_list(length=1)
+            blocks = docs[0]["blocks"] if docs else []
+        return [block for block in blocks if block.get("sequence_order", 0) < before]
+
+    async def _latest_blocks_between(self, epic_doc: dict, after: int, before: int) -> List[dict]:
+        """Newest blocks with after < sequence_order < before that fit in fold_tokens."""
+        if is_external(epic_doc):
+            cursor = story_block_store.collection.find(
+                {"epic_id": str(epic_doc["_id"]), "sequence_order": {"$gt": after, "$lt": before}},
+                {"_id": 0, "epic_id": 0}
+            ).sort("sequence_order", -1).limit(_FOLD_MAX_BLOCKS)
+            newest_first = await cursor.to_list(length=_FOLD_MAX_BLOCKS)
+        else:
+            pipeline = [
+                {"$match": {"_id": epic_doc["_id"]}},
+                {"$project": {"blocks": {"$slice": [
+                    {"$filter": {
+                        "input": "$story_blocks",
+                        "cond": {"$and": [
+                            {"$gt": ["$$this.sequence_order", after]},
+                            {"$lt": ["$$this.sequence_order", before]},
+                        ]}
+                    }},
+                    -_FOLD_MAX_BLOCKS
+                ]}}},
+            ]
+            docs = await epic_collection.aggregate(pipeline).to_list(length=1)
+            newest_first = (docs[0]["blocks"] if docs else [])[::-1]
+
+        kept, tokens = [], 0
+        for block in newest_first:
+            tokens += count_tokens(block.get("content", ""))
+            if kept and tokens > self.fold_tokens:
+                break
+            kept.append(block)
+        return kept[::-1]
+
+    async def refresh(
+        self,
+        epic_id: str,
+        max_folds: Optional[int] = None
+    ) -> Optional[Tuple[dict, List[dict], List[dict]]]:
+        """
+        Fold blocks older than the verbatim window into the memory.
+
+        Usually a no-op or one small LLM call (the blocks added by the last
+        continuation); a cleared or legacy memory is rebuilt in fold_tokens
+        steps. Writes are conditional on summarized_through, so concurrent
+        refreshes of one epic never overwrite each other's progress.
+
+        Args:
+            epic_id: Epic ID
+            max_folds: Stop after this many LLM calls (None folds everything)
+
+        Returns:
+            (memory, last K blocks, unfolded blocks) or None if the epic does
+            not exist. Unfolded blocks are the newest blocks between the memory
+            and the window (within fold_tokens) when folding stopped early or
+            failed; [] when the memory is complete. Older unfolded blocks are
+            in neither the memory nor this list.
+        """
+        try:
+            epic_oid = ObjectId(epic_id)
+        except InvalidId:
+            return None
+        epic_doc = await epic_collection.find_one(
+            {"_id": epic_oid}, {"narrative_memory": 1, "block_storage": 1}
+        )
+        if epic_doc is None:
+            return None
+
+        stored = epic_doc.get("narrative_memory")
+        memory = stored or empty_memory()
+        tail = await self._tail_blocks(epic_doc)
+        if not tail:
+            return memory, tail, []
+        window_start = tail[0].get("sequence_order", 0)
+
+        folds = 0
+        while True:
+            if max_folds is not None and folds >= max_folds:
+                break
+            pending = await self._blocks_after(epic_doc, memory["summarized_through"], window_start)
+            if not pending:
+                return memory, tail, []
+            folds += 1
+
+            # At least one block per step, then as many as fit the token budget
+            batch, tokens = [], 0
+            for block in pending:
+                block_tokens = count_tokens(block.get("content", ""))
+                if batch and tokens + block_tokens > self.fold_tokens:
+                    break
+                batch.append(block)
+                tokens += block_tokens
+
+            folded = await llm_service.update_narrative_memory(
+                memory, "\n\n".join(block.get("content", "") for block in batch), self.summary_words
+            )
+            if folded is None:
+                break
+            folded["summarized_through"] = batch[-1]["sequence_order"]
+            folded["updated_at"] = datetime.now(timezone.utc)
+
+            guard = (
+                {"narrative_memory.summarized_through": memory["summarized_through"]}
+                if stored else {"narrative_memory": None}
+            )
+            result = await epic_collection.update_one(
+                {"_id": epic_doc["_id"], **guard}, {"$set": {"narrative_memory": folded}}
+            )
+            if result.matched_count == 0:
+                # Another refresh (or a block rewrite) got there first
+                latest = await epic_collection.find_one({"_id": epic_doc["_id"]}, {"narrative_memory": 1})
+                memory = (latest or {}).get("narrative_memory") or empty_memory()
+                break
+            memory, stored = folded, folded
+
+        unfolded = await self._latest_blocks_between(epic_doc, memory["summarized_through"], window_start)
+        if unfolded:
+            omitted = unfolded[0].get("sequence_order", 0) - memory["summarized_through"] - 1
+            print(
+                f"⚠️ Narrative memory of epic {epic_id} is behind: sending {len(unfolded)} unfolded blocks "
+                f"verbatim, omitting {max(omitted, 0)} older ones until the background refresh folds them"
+            )
+        return memory, tail, unfolded
+
+    async def refresh_quietly(self, epic_id: str) -> None:
+        """Background refresh after a continuation (errors are logged, not raised)."""
+        try:
+            await self.refresh(epic_id)
+        except Exception as e:
+            print(f"⚠️ Narrative memory refresh failed for epic {epic_id}: {e}")
+
+
+# Singleton instance
+narrative_memory = NarrativeMemoryService(
+    recent_blocks=settings.NARRATIVE_MEMORY_RECENT_BLOCKS,
+    summary_words=settings.NARRATIVE_MEMORY_SUMMARY_WORDS,
+    fold_tokens=settings.NARRATIVE_MEMORY_FOLD_TOKENS,
+    sync_folds=settings.NARRATIVE_MEMORY_SYNC_FOLDS,
+)
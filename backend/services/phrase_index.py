@@ -0,0 +1,185 @@
+"""
+Phrase Index - in-memory similarity index over phrase-learning vectors.
+
+Holds every learning's stored vector in one float32 matrix. A query is
+IDF-weighted with the current document frequencies and scored against all
+rows with a single matrix-vector product, so top-k retrieval over a few
+thousand learnings takes well under a millisecond. The index is loaded once
+(load() also backfills vectors for learnings saved before they existed) and
+then grows incrementally through add(). Every worker process holds its own
+index, so catch_up() periodically reads learnings newer than the newest one
+it has seen, which picks up the ones other workers saved.
+"""
+
+import asyncio
+import time
+from datetime import timedelta
+from typing import List, Optional, Tuple
+
+import numpy as np
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+
+from backend.services.text_vectorizer import HashingVectorizer, text_vectorizer
+
+# ObjectIds from different processes are only ordered to the second (and by
+# their clocks), so catch_up() re-reads this far behind its high-water mark
+_ID_CLOCK_SKEW = timedelta(seconds=60)
+
+_PROJECTION = {"enhancement": 1, "embedding": 1, "embedding_model": 1}
+
+
+def learning_text(enhancement: dict) -> str:
+    """Text a learning is indexed by: image context, tags and the enhanced phrase."""
+    return " ".join([
+        enhancement.get("image_context") or "",
+        " ".join(enhancement.get("tags") or []),
+        enhancement.get("enhanced_phrase") or "",
+    ])
+
+
+class PhraseVectorIndex:
+    """Top-k cosine similarity over IDF-weighted hashing vectors."""
+
+    def __init__(self, vectorizer: HashingVectorizer):
+        """Initialize an empty index."""
+        self.vectorizer = vectorizer
+        self.ids: list = []
+        self._rows: List[np.ndarray] = []
+        self._df = np.zeros(vectorizer.n_features, dtype=np.float32)
+        self._weighted: Optional[np.ndarray] = None  # IDF-weighted, row-normalized matrix
+        self._idf: Optional[np.ndarray] = None
+        self._known: set = set()
+        self._newest: Optional[ObjectId] = None  # high-water mark for catch_up()
+        self._synced_at = 0.0
+        self._sync_lock = asyncio.Lock()
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, doc_id, vector: np.ndarray) -> None:
+        """Add one learning's vector; the weighted matrix is rebuilt lazily on the next search."""
+        if doc_id in self._known:
+            return
+        self._known.add(doc_id)
+        if isinstance(doc_id, ObjectId) and (self._newest is None or doc_id > self._newest):
+            self._newest = doc_id
+        self.ids.append(doc_id)
+        self._rows.append(vector)
+        self._df += vector != 0
+        self._weighted = None
+
+    def _rebuild(self) -> None:
+        """Recompute IDF and the weighted, normalized matrix (vectorized)."""
+        n = len(self._rows)
+        self._idf = (np.log((1.0 + n) / (1.0 + self._df)) + 1.0).astype(np.float32)
+        weighted = np.vstack(self._rows) * self._idf
+        norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self._weighted = weighted / norms
+
+    def search(self, query_vector: np.ndarray, k: int = 5, min_score: float = 0.05) -> List[Tuple[object, float]]:
+        """
+        Most similar learnings to a query vector.
+
+        Args:
+            query_vector: Vector from the same vectorizer
+            k: Number of results
+            min_score: Drop matches below this cosine similarity
+
+        Returns:
+            [(doc_id, score)] best first
+        """
+        if not self.ids or not query_vector.any():
+            return []
+        if self._weighted is None:
+            self._rebuild()
+
+        query = query_vector * self._idf
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        scores = self._weighted @ (query / norm)
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[i], float(scores[i])) for i in top if scores[i] >= min_score]
+
+    async def load(self, collection) -> int:
+        """
+        Load every learning's vector, computing and storing missing/stale ones.
+
+        Returns:
+            Number of learnings indexed
+        """
+        model = self.vectorizer.model_name
+        backfill = []
+        ids, rows = [], []
+
+        self._synced_at = time.monotonic()
+        cursor = collection.find({}, _PROJECTION)
+        async for doc in cursor:
+            vector, stale = self._vector(doc)
+            if stale:
+                backfill.append(UpdateOne(
+                    {"_id": doc["_id"]},
+                    {"$set": {"embedding": self.vectorizer.to_bytes(vector), "embedding_model": model}}
+                ))
+            ids.append(doc["_id"])
+            rows.append(vector)
+
+        if backfill:
+            await collection.bulk_write(backfill, ordered=False)
+            print(f"✅ Computed phrase vectors for {len(backfill)} learnings")
+
+        # Learnings add()-ed while loading may or may not be in the snapshot
+        loaded = set(ids)
+        pending = [(doc_id, vector) for doc_id, vector in zip(self.ids, self._rows) if doc_id not in loaded]
+        self.ids, self._rows = [], []
+        self._known, self._newest = set(), None
+        self._df = np.zeros(self.vectorizer.n_features, dtype=np.float32)
+        for doc_id, vector in list(zip(ids, rows)) + pending:
+            self.add(doc_id, vector)
+        self.ready = True
+        return len(self.ids)
+
+    def _vector(self, doc: dict) -> Tuple[np.ndarray, bool]:
+        """A learning's stored vector, or a freshly computed one (flagged stale)."""
+        if doc.get("embedding_model") == self.vectorizer.model_name:
+            vector = self.vectorizer.from_bytes(doc.get("embedding"))
+            if vector is not None:
+                return vector, False
+        return self.vectorizer.transform(learning_text(doc.get("enhancement") or {})), True
+
+    async def catch_up(self, collection, max_age: float) -> int:
+        """
+        Index learnings saved since the last load/catch-up (e.g. by another
+        worker). Reads only the _id range past the high-water mark, and runs
+        at most once every max_age seconds; callers do not wait on a catch-up
+        another request already started.
+
+        Returns:
+            Number of learnings added
+        """
+        if not self.ready or self._sync_lock.locked() or time.monotonic() - self._synced_at < max_age:
+            return 0
+
+        async with self._sync_lock:
+            self._synced_at = time.monotonic()
+            query = {}
+            if self._newest is not None:
+                query = {"_id": {"$gte": ObjectId.from_datetime(self._newest.generation_time - _ID_CLOCK_SKEW)}}
+
+            added = 0
+            async for doc in collection.find(query, _PROJECTION):
+                if doc["_id"] in self._known:
+                    continue
+                self.add(doc["_id"], self._vector(doc)[0])
+                added += 1
+            return added
+
+
+# Singleton instance
+phrase_index = PhraseVectorIndex(text_vectorizer)
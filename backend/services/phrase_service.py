@@ -13,16 +13,23 @@ from backend.schemas.phrase import (
     PhraseLearning, 
     PhraseGenerationResponse
 )
-from backend.services.vision_service import VisionService
+from backend.services.vision_service import vision_service
+from backend.services.post_fields import push_text_blocks
+from backend.services.usage_counter import phrase_usage_counter
+from backend.services.post_writer import update_post_document
+from backend.services.corpus_cache import corpus_cache
+from backend.services.text_vectorizer import text_vectorizer
+from backend.services.phrase_index import phrase_index, learning_text
+from backend.config import settings
 
 
 class PhraseService:
     """Service for generating and learning from phrase enhancements"""
     
     def __init__(self):
-        self.vision_service = VisionService()
-        # Simple embedding using sentence similarity (can upgrade to sentence-transformers)
-        self.use_embeddings = False  # Start simple, can enable later
+        self.vision_service = vision_service
+        # Local hashing TF-IDF vectors + in-memory index (services/phrase_index.py)
+        self.use_embeddings = True
         
     async def generate_phrase(
         self, 
@@ -65,7 +72,7 @@ class PhraseService:
             if use_memory:
                 print(f"🧠 [PHRASE] Memory enabled, fetching learnings...")
                 try:
-                    learnings = await self._get_relevant_learnings(tags, "")
+                    learnings = await self._get_relevant_learnings(tags, self._post_text(post))
                     if learnings:
                         used_learning = True
                         similar_learnings = [str(l["_id"]) for l in learnings[:3]]
@@ -128,13 +135,20 @@ class PhraseService:
         )
         
         # Generate embedding if enabled
+        vector = None
         if self.use_embeddings:
-            learning.embedding = await self._generate_embedding(enhanced_phrase)
+            vector = text_vectorizer.transform(learning_text(enhancement.dict()))
+            learning.embedding = text_vectorizer.to_bytes(vector)
+            learning.embedding_model = text_vectorizer.model_name
         
         # Save to database
         learning_dict = learning.dict(exclude={"id"})
         result = await phrase_learning_collection.insert_one(learning_dict)
         
+        # Make it retrievable immediately
+        if vector is not None:
+            phrase_index.add(result.inserted_id, vector)
+        
         return str(result.inserted_id)
     
     async def save_phrase_to_post(
@@ -154,15 +168,18 @@ class PhraseService:
             "color": color
         }
         
-        result = await post_collection.update_one(
-            {"_id": ObjectId(post_id)},
-            {
-                "$push": {"text_blocks": text_block},
+        post = await update_post_document(
+            ObjectId(post_id),
+            push_text_blocks({
                 "$set": {"updated_at": datetime.now(timezone.utc)}
-            }
+            }, [text_block]),
+            projection={"general_tags": 1}
         )
+        if post is None:
+            return False
         
-        return result.modified_count > 0
+        await corpus_cache.invalidate(post.get("general_tags"))
+        return True
     
     async def _get_relevant_learnings(
         self,
@@ -173,29 +190,64 @@ class PhraseService:
         """
         Retrieve relevant past learnings based on tags and description
         
-        For now, uses tag matching. Can be upgraded to vector similarity.
+        Ranks by vector similarity when the phrase index is loaded, otherwise
+        (or when nothing is similar enough) falls back to tag matching.
         """
+        if self.use_embeddings and phrase_index.ready:
+            # Learnings saved through other workers since the last check
+            await phrase_index.catch_up(phrase_learning_collection, settings.PHRASE_INDEX_REFRESH_SECONDS)
+            learnings = await self._get_similar_learnings(tags, description, limit)
+            if learnings:
+                phrase_usage_counter.increment(learning["_id"] for learning in learnings)
+                return learnings
+        
         if not tags:
             # If no tags, get most recent learnings
-            cursor = phrase_learning_collection.find().sort("created_at", -1).limit(limit)
+            cursor = phrase_learning_collection.find({}, {"embedding": 0}).sort("created_at", -1).limit(limit)
             return await cursor.to_list(length=limit)
         
         # Find learnings with overlapping tags
         cursor = phrase_learning_collection.find(
-            {"enhancement.tags": {"$in": tags}}
+            {"enhancement.tags": {"$in": tags}},
+            {"embedding": 0}
         ).sort("usage_count", -1).limit(limit)
         
         learnings = await cursor.to_list(length=limit)
         
-        # Increment usage count for retrieved learnings
-        for learning in learnings:
-            await phrase_learning_collection.update_one(
-                {"_id": learning["_id"]},
-                {"$inc": {"usage_count": 1}}
-            )
+        # Increment usage count for retrieved learnings (buffered, flushed in bulk)
+        phrase_usage_counter.increment(learning["_id"] for learning in learnings)
         
         return learnings
     
+    async def _get_similar_learnings(
+        self,
+        tags: List[str],
+        description: str,
+        limit: int
+    ) -> List[dict]:
+        """
+        Top-k learnings by cosine similarity to the image's tags and text.
+        
+        Returns:
+            Learning documents, most similar first (empty if none qualify)
+        """
+        query_vector = text_vectorizer.transform(" ".join(tags or []) + " " + (description or ""))
+        hits = phrase_index.search(query_vector, k=limit)
+        if not hits:
+            return []
+        
+        docs = await phrase_learning_collection.find(
+            {"_id": {"$in": [doc_id for doc_id, _ in hits]}},
+            {"embedding": 0}
+        ).to_list(length=limit)
+        by_id = {doc["_id"]: doc for doc in docs}
+        return [by_id[doc_id] for doc_id, _ in hits if doc_id in by_id]
+    
+    @staticmethod
+    def _post_text(post: dict) -> str:
+        """Text content of a post, used as the similarity query alongside its tags."""
+        return " ".join(block.get("content", "") for block in post.get("text_blocks") or [])
+    
     def _build_learning_context(self, learnings: List[dict]) -> str:
         """
         Build a context string from past learnings to guide the LLM
@@ -277,22 +329,20 @@ Generate ONLY the phrase, no additional text:"""
             traceback.print_exc()
             raise
     
-    async def _generate_embedding(self, text: str) -> List[float]:
-        """
-        Generate vector embedding for semantic similarity
-        (Placeholder - can integrate sentence-transformers later)
-        """
-        # Simple hash-based embedding for now
-        # In production, use: sentence-transformers, OpenAI embeddings, etc.
-        import hashlib
-        hash_obj = hashlib.sha256(text.encode())
-        hash_bytes = hash_obj.digest()
-        # Convert to normalized vector
-        embedding = [float(b) / 255.0 for b in hash_bytes[:128]]
-        return embedding
+    async def load_index(self) -> None:
+        """Load the in-memory phrase index (startup hook, runs in the background)."""
+        if not self.use_embeddings:
+            return
+        try:
+            count = await phrase_index.load(phrase_learning_collection)
+            print(f"✅ Phrase index loaded: {count} learnings")
+        except Exception as e:
+            print(f"⚠️ Could not load phrase index, using tag matching: {e}")
     
     async def get_learning_stats(self) -> dict:
         """Get statistics about the learning database"""
+        # Make buffered usage increments visible in the ranking
+        await phrase_usage_counter.flush()
         total = await phrase_learning_collection.count_documents({})
         
         # Get most used learnings
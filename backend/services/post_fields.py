@@ -0,0 +1,63 @@
+"""
+Denormalized post fields.
+
+Posts carry `has_text` and `text_block_count` alongside `text_blocks` so the
+text feed can filter with an indexed equality instead of
+{"text_blocks": {"$exists": True, "$not": {"$size": 0}}}.
+Every writer that touches text_blocks must go through these helpers.
+"""
+
+from typing import List, Optional, Union
+
+from backend.services.post_writer import append_expression, as_pipeline
+
+
+# Readers filter on this rather than {"has_text": True}: posts written before
+# the field existed keep matching on text_blocks until the startup backfill
+# (migrations/backfill_text_fields.py) reaches them. Both branches are bounded
+# by the has_text index; the second one only fetches posts without the field.
+HAS_TEXT = {
+    "$or": [
+        {"has_text": True},
+        {"has_text": {"$exists": False}, "text_blocks.0": {"$exists": True}},
+    ]
+}
+
+
+def text_block_fields(text_blocks: Optional[list]) -> dict:
+    """
+    Denormalized fields for a post whose text_blocks are being set wholesale.
+
+    Args:
+        text_blocks: The complete new text_blocks list
+
+    Returns:
+        {"has_text": bool, "text_block_count": int} to merge into a $set / insert
+    """
+    count = len(text_blocks or [])
+    return {"has_text": count > 0, "text_block_count": count}
+
+
+def push_text_blocks(update: dict, blocks: List[dict]) -> Union[dict, List[dict]]:
+    """
+    Turn `update` into a pipeline update that also appends text blocks.
+
+    text_block_count is recomputed from the resulting array in the same
+    write (not $inc'd), so a post that predates the field still ends up with
+    its true count and never looks "already backfilled" with a wrong one.
+
+    Args:
+        update: Update document to extend ($set/$push/$inc operators)
+        blocks: Text blocks to append
+
+    Returns:
+        Pipeline update stages (the update unchanged if there are no blocks)
+    """
+    if not blocks:
+        return update
+
+    block_count = {"$size": "$text_blocks"}
+    return as_pipeline(update) + [
+        {"$set": {"text_blocks": append_expression("text_blocks", blocks)}},
+        {"$set": {"text_block_count": block_count, "has_text": {"$gt": [block_count, 0]}}},
+    ]
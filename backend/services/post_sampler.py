@@ -0,0 +1,101 @@
+"""
+Post Sampler - index-backed random sampling of posts.
+
+Every post carries a `rand` key, a uniform random float written when the
+post is created (migrations/backfill_random_keys.py fills in older posts).
+Each item of a sample is drawn separately: pick a random point r and read the
+first matching post with `rand >= r` from an index on (filter fields, rand),
+wrapping around to the lowest key when nothing lies above r. Posts already
+drawn are excluded from the next read. So a sample costs `limit` one-entry
+index reads instead of a scan of every matching post, and neighbours in `rand`
+order do not come back as a block. The draws are not perfectly uniform: a post
+that follows a wide gap in the keys is picked more often. With keys that are
+independent uniform floats, that bias is small enough for suggestions.
+
+A `$match` + `$sample` pipeline is only the fallback for posts that have no
+`rand` yet: after a `$match`, `$sample` reads and shuffles the whole
+matching set.
+"""
+
+import random
+from typing import Iterable, List, Optional
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+
+from backend.database import post_collection
+
+
+def random_key() -> dict:
+    """The `rand` field to merge into a new post document."""
+    return {"rand": random.random()}
+
+
+def _object_ids(ids: Optional[Iterable[str]]) -> List[ObjectId]:
+    """Parse post ids, silently dropping malformed ones."""
+    parsed = []
+    for post_id in ids or []:
+        try:
+            parsed.append(ObjectId(post_id))
+        except (InvalidId, TypeError):
+            continue
+    return parsed
+
+
+async def _read_range(match: dict, bound: dict, limit: int, projection: Optional[dict]) -> List[dict]:
+    """Matching posts whose rand falls in `bound`, in rand order."""
+    cursor = post_collection.find({**match, "rand": bound}, projection).sort("rand", 1).limit(limit)
+    return await cursor.to_list(length=limit)
+
+
+async def sample_posts(
+    query: dict,
+    limit: int,
+    exclude_ids: Optional[Iterable[str]] = None,
+    projection: Optional[dict] = None
+) -> List[dict]:
+    """
+    Randomly sample posts matching a query.
+
+    Args:
+        query: Match filter (an index on its fields + rand should exist)
+        limit: Maximum number of posts to return
+        exclude_ids: Post ids to leave out (e.g. already suggested this session)
+        projection: Optional fields to keep
+
+    Returns:
+        Up to `limit` raw post documents in random order
+    """
+    if limit <= 0:
+        return []
+
+    match = dict(query)
+    excluded = _object_ids(exclude_ids)
+    if excluded:
+        match = {"$and": [query, {"_id": {"$nin": excluded}}]} if query else {"_id": {"$nin": excluded}}
+
+    # One fresh random start point per item, wrapping around past 1.0
+    posts = []
+    while len(posts) < limit:
+        drawn = {"$and": [match, {"_id": {"$nin": [post["_id"] for post in posts]}}]} if posts else match
+        start = random.random()
+        found = await _read_range(drawn, {"$gte": start}, 1, projection)
+        if not found:
+            found = await _read_range(drawn, {"$lt": start}, 1, projection)
+        if not found:
+            # Every keyed match has been drawn
+            break
+        posts += found
+
+    if len(posts) < limit:
+        # Fewer keyed posts than requested: posts without a rand key (not
+        # backfilled yet) are only reachable through $sample
+        pipeline = [
+            {"$match": {"$and": [match, {"rand": {"$exists": False}}]}},
+            {"$sample": {"size": limit - len(posts)}},
+        ]
+        if projection:
+            pipeline.append({"$project": projection})
+        posts += await post_collection.aggregate(pipeline).to_list(length=limit - len(posts))
+
+    random.shuffle(posts)
+    return posts
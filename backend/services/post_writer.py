@@ -0,0 +1,132 @@
+"""
+Post Writer - single-round-trip mutations for post documents.
+
+Writers express their change as server-side update operators ($set, $push,
+$addToSet, $inc) and get the written document back from the same
+find_one_and_update call, instead of find_one -> rebuild lists in Python ->
+$set whole arrays -> find_one again. Concurrent edits from two tabs then
+compose instead of overwriting each other. Changes that derive fields from
+the written arrays (text_block_count) use pipeline updates; as_pipeline
+turns an operator document into the equivalent stages.
+"""
+
+from typing import List, Optional, Tuple, Union
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+
+from backend.database import post_collection
+
+
+def append_expression(field: str, items: list) -> dict:
+    """Aggregation expression for `field` with `items` appended (a missing/null array counts as [])."""
+    return {"$concatArrays": [{"$ifNull": [f"${field}", []]}, {"$literal": items}]}
+
+
+def as_pipeline(update: Union[dict, List[dict]]) -> List[dict]:
+    """
+    Equivalent pipeline stages for an operator update ($set, $push, $inc).
+
+    Args:
+        update: Operator update document, or a pipeline (returned as a copy)
+
+    Returns:
+        Pipeline update stages
+    """
+    if isinstance(update, list):
+        return list(update)
+
+    fields = {}
+    for op, values in update.items():
+        for field, value in values.items():
+            if op == "$set":
+                fields[field] = {"$literal": value}
+            elif op == "$push":
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                fields[field] = append_expression(field, items)
+            elif op == "$inc":
+                fields[field] = {"$add": [{"$ifNull": [f"${field}", 0]}, value]}
+            else:
+                raise ValueError(f"Unsupported update operator for a pipeline: {op}")
+    return [{"$set": fields}] if fields else []
+
+
+async def update_post_document(
+    obj_id: ObjectId,
+    update: Union[dict, List[dict]],
+    extra_filter: Optional[dict] = None,
+    projection: Optional[dict] = None
+) -> Optional[dict]:
+    """
+    Apply `update` to a post and return it as written.
+
+    Args:
+        obj_id: Post _id
+        update: MongoDB update document or pipeline
+        extra_filter: Additional match conditions (the update is skipped if they fail)
+        projection: Fields to return (default: whole post)
+
+    Returns:
+        The updated post document, or None if nothing matched
+    """
+    query = {"_id": obj_id, **(extra_filter or {})}
+    return await post_collection.find_one_and_update(
+        query, update, projection=projection, return_document=ReturnDocument.AFTER
+    )
+
+
+async def set_post_fields(obj_id: ObjectId, fields: dict) -> Tuple[Optional[dict], Optional[dict]]:
+    """
+    $set top-level fields on a post, returning both versions in one round trip.
+
+    The "after" document is derived from the pre-image, which is exact for a
+    pure top-level $set.
+
+    Returns:
+        (before, after) documents, or (None, None) if the post does not exist
+    """
+    before = await post_collection.find_one_and_update(
+        {"_id": obj_id}, {"$set": fields}, return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        return None, None
+    return before, {**before, **fields}
+
+
+async def add_tag_to_post_document(
+    obj_id: ObjectId,
+    tag: str,
+    update: Optional[Union[dict, List[dict]]] = None
+) -> Tuple[Optional[dict], bool]:
+    """
+    Add a tag to a post's general_tags (if missing) together with `update`.
+
+    The "tag is new" check is part of the match filter, so adding a tag is
+    one round trip and the caller learns whether the tag was added (for
+    tag_stats) without reading the post first. The same pipeline write
+    repairs a missing or null tag list; a post that already has the tag
+    costs a second write for the rest of `update`.
+
+    Args:
+        obj_id: Post _id
+        tag: Tag to add
+        update: Other operators (or pipeline stages) to apply in the same write
+
+    Returns:
+        (updated post or None if it does not exist, whether the tag was added)
+    """
+    update = update or {}
+
+    # $ne matches a list without the tag as well as a missing/null list;
+    # existing tags (even null elements) are kept, only a non-array is replaced
+    tags = {"$cond": [{"$isArray": "$general_tags"}, "$general_tags", []]}
+    tagged = as_pipeline(update) + [
+        {"$set": {"general_tags": {"$concatArrays": [tags, {"$literal": [tag]}]}}}
+    ]
+    post = await update_post_document(obj_id, tagged, {"general_tags": {"$ne": tag}})
+    if post is not None:
+        return post, True
+
+    # Tag already present (or no such post): apply the rest of the update only
+    if not update:
+        return await post_collection.find_one({"_id": obj_id}), False
+    return await update_post_document(obj_id, update), False
@@ -2,15 +2,104 @@
 Story Block Service for AI-powered story segmentation.
 Handles breaking down long stories into coherent blocks/paragraphs.
 Follows Single Responsibility Principle - only handles story segmentation logic.
+
+Segmentation modes:
+- "boundaries": the model sees numbered paragraphs and returns only the
+  paragraph index each block starts at, plus scores and summaries. Blocks
+  are cut from the original text locally and verified byte-for-byte.
+- "full_text": the model echoes every block's text back inside the JSON
+  (legacy; output grows with the story and long stories get truncated).
+- "texttiling": local lexical-cohesion segmentation (services/text_tiling.py),
+  no LLM round trip. Also the fallback when the LLM is unavailable or fails.
 """
 
+import asyncio
+import hashlib
 import json
 import re
-from typing import List, Dict, Any
-from groq import Groq
+from typing import List, Dict, Any, Optional, Tuple
 from backend.config import settings
+from backend.services.llm_gateway import llm_gateway, parse_json_object
+from backend.services.llm_cache import llm_cache
+from backend.services.llm_clients import llm_client_registry
+from backend.services.corpus_packer import count_tokens
+from backend.services.text_tiling import block_coherence, text_tiling_segmenter
 from backend.schemas.epic import StoryBlock
 
+# Blank line(s) between paragraphs; single line breaks when a story has none
+_PARAGRAPH_BREAK_RE = re.compile(r"\n[ \t]*\n\s*")
+_LINE_BREAK_RE = re.compile(r"\n\s*")
+
+# Cache namespace for per-block coherence scores (bump when the scoring prompt changes)
+_COHERENCE_TASK = "coherence-v1"
+
+
+def segment_hash(content: str) -> str:
+    """
+    Hash of a block's text as segmented. Stored on the block as `segment_hash`;
+    a block whose content no longer matches it was edited since segmentation.
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def paragraph_spans(text: str) -> List[Tuple[int, int]]:
+    """
+    (start, end) offsets of the paragraphs of `text`, whitespace trimmed.
+
+    Paragraphs are separated by blank lines, or by line breaks when the
+    text has no blank lines at all.
+    """
+    for separator in (_PARAGRAPH_BREAK_RE, _LINE_BREAK_RE):
+        spans = []
+        pos = 0
+        for match in list(separator.finditer(text)) + [None]:
+            end = match.start() if match else len(text)
+            segment = text[pos:end]
+            if segment.strip():
+                start = pos + len(segment) - len(segment.lstrip())
+                spans.append((start, pos + len(segment.rstrip())))
+            if match:
+                pos = match.end()
+        if len(spans) > 1:
+            break
+    return spans
+
+
+def blocks_from_boundaries(spans: List[Tuple[int, int]], starts: List[int]) -> List[Tuple[int, int]]:
+    """
+    Character ranges of blocks starting at the given paragraph indices.
+
+    Each block runs from its first paragraph to the paragraph before the next
+    block's start, so blocks keep the original text between their paragraphs.
+    """
+    ranges = []
+    for i, first in enumerate(starts):
+        last = (starts[i + 1] if i + 1 < len(starts) else len(spans)) - 1
+        ranges.append((spans[first][0], spans[last][1]))
+    return ranges
+
+
+def verify_blocks(text: str, ranges: List[Tuple[int, int]]) -> bool:
+    """
+    Check that blocks rebuild `text` exactly.
+
+    Re-joining the blocks with the original text between them must give the
+    input byte-for-byte, and everything outside the blocks must be whitespace
+    (nothing dropped, duplicated or reordered).
+    """
+    rebuilt = []
+    pos = 0
+    for start, end in ranges:
+        if start < pos or end < start or text[pos:start].strip():
+            return False
+        rebuilt.append(text[pos:start])
+        rebuilt.append(text[start:end])
+        pos = end
+    if text[pos:].strip():
+        return False
+    rebuilt.append(text[pos:])
+    return "".join(rebuilt).encode("utf-8") == text.encode("utf-8")
+
 
 class StoryBlockService:
     """
@@ -19,20 +108,20 @@ class StoryBlockService:
     """
     
     def __init__(self):
-        """Initialize Groq client for story analysis."""
-        if settings.GROQ_API_KEY:
-            self.client = Groq(api_key=settings.GROQ_API_KEY)
-            # Using a capable model for text analysis
-            self.model = "llama-3.3-70b-versatile"
-        else:
-            self.client = None
-            self.model = None
+        """Initialize the analysis model role; completions go through the shared LLM gateway."""
+        # Model id, timeout and max_tokens are configured in llm_clients.py
+        self.model = "analysis"
     
     def _is_available(self) -> bool:
         """Check if service is available."""
-        return self.client is not None
+        return llm_gateway.is_available()
     
-    async def segment_story(self, story_text: str) -> List[Dict[str, Any]]:
+    async def segment_story(
+        self,
+        story_text: str,
+        bypass_cache: bool = False,
+        mode: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         """
         Segment a long story into coherent blocks using AI.
         
@@ -44,14 +133,156 @@ class StoryBlockService:
         
         Args:
             story_text: The complete story text to segment
+            bypass_cache: Force a fresh segmentation instead of a cached one
+            mode: "boundaries", "full_text" or "texttiling" (default: settings.SEGMENTATION_MODE)
             
         Returns:
             List of dictionaries with 'content' and 'coherence_score'
         """
+        mode = mode or settings.SEGMENTATION_MODE
+        if mode == "texttiling":
+            return self._fallback_segmentation(story_text)
+        
         if not self._is_available():
             print("⚠️ Story block service not available - using fallback segmentation")
             return self._fallback_segmentation(story_text)
         
+        if mode == "full_text":
+            return await self._segment_full_text(story_text, bypass_cache)
+        return await self._segment_by_boundaries(story_text, bypass_cache)
+    
+    async def _segment_by_boundaries(self, story_text: str, bypass_cache: bool = False) -> List[Dict[str, Any]]:
+        """
+        Segment by paragraph boundaries: the model returns indices, scores and
+        summaries only; block text is cut locally from `story_text`.
+        """
+        spans = paragraph_spans(story_text)
+        if len(spans) < 2:
+            return self._fallback_segmentation(story_text)
+        
+        numbered = "\n\n".join(
+            f"[{i}] {story_text[start:end]}" for i, (start, end) in enumerate(spans)
+        )
+        
+        try:
+            prompt = f"""Analyze the following story and segment it into coherent blocks/sections.
+The story is split into {len(spans)} numbered paragraphs ([0] to [{len(spans) - 1}]).
+
+Each block should:
+1. Represent a cohesive narrative unit (scene, theme, or idea)
+2. Be 2-5 paragraphs long (roughly 150-400 words)
+3. Have internal coherence and flow
+4. Transition naturally to the next block
+
+Story to segment:
+{numbered}
+
+Provide your segmentation in the following JSON format:
+{{
+    "blocks": [
+        {{
+            "start_paragraph": 0,
+            "coherence_score": <float 0-1 indicating internal coherence>,
+            "summary": "<one-sentence summary of this block>"
+        }},
+        {{
+            "start_paragraph": <index of the first paragraph of block 2>,
+            "coherence_score": <float 0-1>,
+            "summary": "<one-sentence summary>"
+        }}
+    ]
+}}
+
+Important:
+- Do NOT repeat the story text; give only the paragraph index where each block starts
+- Blocks are contiguous: a block ends right before the next block's start_paragraph
+- The first block starts at paragraph 0; start_paragraph values strictly increase
+- coherence_score should reflect how well the block holds together thematically
+- Aim for 3-8 blocks depending on story length
+- Each block should be substantial enough to pair with an image
+
+Respond with ONLY the JSON, no additional text."""
+
+            response_text = await llm_gateway.chat(
+                model=self.model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are an expert literary analyst specializing in narrative structure and coherence. You segment stories into meaningful, cohesive blocks."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                temperature=0.3,  # Lower temperature for more consistent segmentation
+                max_tokens=1024,  # Indices and summaries only, independent of story length
+                top_p=1,
+                stream=False,
+                cache=True,
+                bypass_cache=bypass_cache
+            )
+        except Exception as e:
+            print(f"❌ Error in AI story segmentation: {e}")
+            return self._fallback_segmentation(story_text)
+        
+        result = parse_json_object(response_text) or {}
+        blocks = self._blocks_from_response(story_text, spans, result.get("blocks"))
+        if not blocks:
+            print("⚠️ Could not use AI segmentation boundaries, using fallback")
+            return self._fallback_segmentation(story_text)
+        return blocks
+    
+    def _blocks_from_response(
+        self,
+        story_text: str,
+        spans: List[Tuple[int, int]],
+        raw_blocks: Any
+    ) -> List[Dict[str, Any]]:
+        """
+        Build blocks from the model's boundaries.
+        Invalid or out-of-order indices are dropped; an empty list means the
+        response was unusable or the rebuilt blocks failed verification.
+        """
+        if not isinstance(raw_blocks, list):
+            return []
+        
+        entries = []
+        for raw in raw_blocks:
+            if not isinstance(raw, dict):
+                continue
+            try:
+                start = int(raw.get("start_paragraph"))
+            except (TypeError, ValueError):
+                continue
+            if 0 <= start < len(spans) and (not entries or start > entries[-1][0]):
+                entries.append((start, raw))
+        if not entries:
+            return []
+        # The first block always covers the opening paragraphs
+        entries[0] = (0, entries[0][1])
+        
+        ranges = blocks_from_boundaries(spans, [start for start, _ in entries])
+        if not verify_blocks(story_text, ranges):
+            print("⚠️ Segmentation boundaries failed byte-for-byte verification")
+            return []
+        
+        blocks = []
+        for i, ((start, end), (_, raw)) in enumerate(zip(ranges, entries)):
+            try:
+                score = max(0.0, min(1.0, float(raw.get("coherence_score", 0.7))))
+            except (TypeError, ValueError):
+                score = 0.7
+            blocks.append({
+                "sequence_order": i + 1,
+                "content": story_text[start:end],
+                "coherence_score": score,
+                "summary": raw.get("summary") or f"Block {i + 1}"
+            })
+        return blocks
+    
+    async def _segment_full_text(self, story_text: str, bypass_cache: bool = False) -> List[Dict[str, Any]]:
+        """Legacy segmentation: the model returns each block's full text."""
         try:
             prompt = f"""Analyze the following story and segment it into coherent blocks/sections.
 
@@ -90,7 +321,7 @@ Important:
 
 Respond with ONLY the JSON, no additional text."""
 
-            completion = self.client.chat.completions.create(
+            response_text = await llm_gateway.chat(
                 model=self.model,
                 messages=[
                     {
@@ -105,11 +336,11 @@ Respond with ONLY the JSON, no additional text."""
                 temperature=0.3,  # Lower temperature for more consistent segmentation
                 max_tokens=4096,
                 top_p=1,
-                stream=False
+                stream=False,
+                cache=True,
+                bypass_cache=bypass_cache
             )
             
-            response_text = completion.choices[0].message.content
-            
             # Extract JSON from response
             json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
             if json_match:
@@ -125,8 +356,8 @@ Respond with ONLY the JSON, no additional text."""
     
     def _fallback_segmentation(self, story_text: str) -> List[Dict[str, Any]]:
         """
-        Fallback segmentation method using simple paragraph grouping.
-        Used when AI service is unavailable.
+        Local segmentation with the TextTiling segmenter (no LLM).
+        Used for mode="texttiling" and when the AI service is unavailable.
         
         Args:
             story_text: The story text to segment
@@ -134,53 +365,39 @@ Respond with ONLY the JSON, no additional text."""
         Returns:
             List of block dictionaries
         """
-        # Split by double newlines (paragraph breaks)
-        paragraphs = [p.strip() for p in story_text.split('\n\n') if p.strip()]
+        spans = paragraph_spans(story_text)
+        if not spans:
+            return []
         
-        if not paragraphs:
-            # If no double newlines, split by single newlines
-            paragraphs = [p.strip() for p in story_text.split('\n') if p.strip()]
+        paragraphs = [story_text[start:end] for start, end in spans]
+        tiles = text_tiling_segmenter.segment(paragraphs)
+        ranges = blocks_from_boundaries(spans, [start for start, _ in tiles])
         
-        # Group paragraphs into blocks of 2-4 paragraphs each
         blocks = []
-        current_block = []
-        current_word_count = 0
-        target_words_per_block = 250
-        
-        for para in paragraphs:
-            word_count = len(para.split())
-            current_block.append(para)
-            current_word_count += word_count
-            
-            # Create a new block if we've reached target size or this is the last paragraph
-            if current_word_count >= target_words_per_block or para == paragraphs[-1]:
-                if current_block:
-                    blocks.append({
-                        "sequence_order": len(blocks) + 1,
-                        "content": "\n\n".join(current_block),
-                        "coherence_score": 0.7,  # Default score for fallback
-                        "summary": f"Block {len(blocks) + 1}"
-                    })
-                    current_block = []
-                    current_word_count = 0
-        
-        # If we have remaining paragraphs, add them as a final block
-        if current_block:
+        for i, ((start, end), (_, score)) in enumerate(zip(ranges, tiles)):
+            content = story_text[start:end]
             blocks.append({
-                "sequence_order": len(blocks) + 1,
-                "content": "\n\n".join(current_block),
-                "coherence_score": 0.7,
-                "summary": f"Block {len(blocks) + 1}"
+                "sequence_order": i + 1,
+                "content": content,
+                "coherence_score": score,
+                "summary": self._lead_sentence(content)
             })
-        
         return blocks
     
-    async def analyze_block_coherence(self, block_content: str) -> float:
+    @staticmethod
+    def _lead_sentence(content: str, max_words: int = 25) -> str:
+        """First sentence of a block (trimmed) as its local summary."""
+        sentence = re.split(r"(?<=[.!?])\s", content.strip(), maxsplit=1)[0]
+        words = sentence.split()
+        return " ".join(words[:max_words]) + ("…" if len(words) > max_words else "")
+    
+    async def analyze_block_coherence(self, block_content: str, bypass_cache: bool = False) -> float:
         """
         Analyze the internal coherence of a single story block.
         
         Args:
             block_content: The text content of the block
+            bypass_cache: Force a fresh score instead of a cached one
             
         Returns:
             Coherence score between 0 and 1
@@ -202,15 +419,16 @@ Rate the coherence on a scale of 0 to 1, where:
 
 Respond with ONLY a single number between 0 and 1."""
 
-            completion = self.client.chat.completions.create(
+            response = await llm_gateway.chat(
                 model=self.model,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.2,
                 max_tokens=10,
-                stream=False
+                stream=False,
+                cache=True,
+                bypass_cache=bypass_cache
             )
-            
-            response = completion.choices[0].message.content.strip()
+            response = response.strip()
             # Extract first number found
             match = re.search(r'0?\.\d+|[01]\.?\d*', response)
             if match:
@@ -223,6 +441,114 @@ Respond with ONLY a single number between 0 and 1."""
             print(f"❌ Error analyzing block coherence: {e}")
             return 0.7
 
+    
+    @staticmethod
+    def _coherence_batches(contents: List[str], indices: List[int]) -> List[List[int]]:
+        """Group block indices into batches under the token and size caps."""
+        batches, current, tokens = [], [], 0
+        for i in indices:
+            block_tokens = count_tokens(contents[i])
+            if current and (tokens + block_tokens > settings.COHERENCE_BATCH_TOKENS
+                            or len(current) >= settings.COHERENCE_BATCH_MAX_BLOCKS):
+                batches.append(current)
+                current, tokens = [], 0
+            current.append(i)
+            tokens += block_tokens
+        if current:
+            batches.append(current)
+        return batches
+    
+    async def _score_batch(self, contents: List[str], batch: List[int]) -> Dict[int, float]:
+        """
+        Score one batch of blocks in a single structured request.
+        
+        Returns:
+            {block index: score} for the blocks the model scored
+        """
+        numbered = "\n\n".join(f"[{n}]\n{contents[i]}" for n, i in enumerate(batch))
+        prompt = f"""Analyze each of the following {len(batch)} text blocks for narrative coherence.
+
+{numbered}
+
+Rate each block's coherence on a scale of 0 to 1, where:
+- 1.0 = Perfectly coherent, unified theme/scene, excellent flow
+- 0.7-0.9 = Good coherence, minor transitions
+- 0.4-0.6 = Moderate coherence, some disjointedness
+- 0.0-0.3 = Poor coherence, fragmented or disjointed
+
+Respond with ONLY a JSON object with one score per block, in order:
+{{"scores": [{{"block": 0, "score": <float 0-1>}}, {{"block": 1, "score": <float 0-1>}}]}}"""
+        
+        try:
+            response_text = await llm_gateway.chat(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.2,
+                max_tokens=24 * len(batch) + 32,
+                stream=False,
+                response_format={"type": "json_object"}
+            )
+        except Exception as e:
+            print(f"❌ Error in batch coherence scoring: {e}")
+            return {}
+        
+        scores = {}
+        raw_scores = (parse_json_object(response_text) or {}).get("scores")
+        for raw in raw_scores if isinstance(raw_scores, list) else []:
+            try:
+                n, score = int(raw["block"]), float(raw["score"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 0 <= n < len(batch):
+                scores[batch[n]] = max(0.0, min(1.0, score))
+        return scores
+    
+    async def score_blocks(
+        self,
+        contents: List[str],
+        use_llm: bool = True,
+        bypass_cache: bool = False
+    ) -> List[float]:
+        """
+        Coherence scores for many blocks at once.
+        
+        LLM scores are cached per block content, so only new or edited blocks
+        are sent; those go out in as few batched requests as the
+        COHERENCE_BATCH_* caps allow. Blocks the LLM does not score (or every
+        block, with use_llm=False or no LLM configured) get the local lexical
+        score from services/text_tiling.py.
+        
+        Args:
+            contents: Block texts
+            use_llm: Score with the LLM ("llm") or locally only ("lexical")
+            bypass_cache: Re-score every block instead of using cached scores
+            
+        Returns:
+            Scores between 0 and 1, aligned with `contents`
+        """
+        scores: Dict[int, float] = {}
+        
+        if use_llm and self._is_available() and contents:
+            model_id = llm_client_registry.model(self.model).model_id
+            keys = [
+                llm_cache.make_key(model_id, [{"role": "user", "content": content}], {"task": _COHERENCE_TASK})
+                for content in contents
+            ]
+            cached = {} if bypass_cache else await llm_cache.get_many(keys)
+            for i, key in enumerate(keys):
+                if key in cached:
+                    scores[i] = float(cached[key])
+            
+            pending = [i for i in range(len(contents)) if i not in scores]
+            if pending:
+                batches = self._coherence_batches(contents, pending)
+                results = await asyncio.gather(*(self._score_batch(contents, batch) for batch in batches))
+                fresh = {i: score for result in results for i, score in result.items()}
+                scores.update(fresh)
+                await llm_cache.set_many({keys[i]: str(score) for i, score in fresh.items()}, model_id)
+                print(f"🧮 Scored {len(fresh)}/{len(pending)} blocks in {len(batches)} request(s); {len(cached)} cached")
+        
+        return [scores[i] if i in scores else block_coherence(content) for i, content in enumerate(contents)]
 
 # Singleton instance
 story_block_service = StoryBlockService()
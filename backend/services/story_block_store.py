@@ -0,0 +1,156 @@
+"""
+Story Block Store - story blocks kept in their own collection.
+
+With EPIC_BLOCK_STORAGE="collection", new epics keep their StoryBlocks as
+separate documents in `story_blocks` ({epic_id, block_id, sequence_order,
+...}) instead of embedding them in the epic. Epics stored this way carry
+`block_storage: "collection"`, so embedded and external epics can coexist
+while backend/migrations/externalize_story_blocks.py moves old ones over.
+Blocks can then be paged with a range scan on (epic_id, sequence_order)
+and an epic can grow past MongoDB's 16 MB document limit.
+"""
+
+from typing import Dict, List, Optional
+from pymongo import DeleteMany, InsertOne, ReturnDocument, UpdateOne
+
+from backend.database import story_blocks_collection
+
+# Value of the epic's `block_storage` field for externally stored blocks
+EXTERNAL_STORAGE = "collection"
+
+# Fields of a block document that are not part of the StoryBlock shape
+_STORE_ONLY_FIELDS = {"_id": 0, "epic_id": 0}
+
+
+def is_external(epic_doc: dict) -> bool:
+    """Whether an epic document keeps its blocks in the story_blocks collection."""
+    return epic_doc.get("block_storage") == EXTERNAL_STORAGE
+
+
+class StoryBlockStore:
+    """CRUD for externally stored story blocks."""
+
+    def __init__(self, collection):
+        """Initialize with the story_blocks collection."""
+        self.collection = collection
+
+    async def list_blocks(
+        self,
+        epic_id: str,
+        after: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[dict]:
+        """
+        Blocks of an epic in sequence order.
+
+        Args:
+            epic_id: Epic ID
+            after: Only blocks with sequence_order greater than this
+            limit: Maximum number of blocks (None for all)
+
+        Returns:
+            StoryBlock dictionaries
+        """
+        query = {"epic_id": epic_id}
+        if after is not None:
+            query["sequence_order"] = {"$gt": after}
+
+        cursor = self.collection.find(query, _STORE_ONLY_FIELDS).sort("sequence_order", 1)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def blocks_for_epics(self, epic_ids: List[str]) -> Dict[str, List[dict]]:
+        """Blocks of several epics in one query, grouped by epic id."""
+        grouped: Dict[str, List[dict]] = {epic_id: [] for epic_id in epic_ids}
+        if not epic_ids:
+            return grouped
+
+        cursor = self.collection.find(
+            {"epic_id": {"$in": epic_ids}}, {"_id": 0}
+        ).sort([("epic_id", 1), ("sequence_order", 1)])
+        async for block in cursor:
+            grouped[block.pop("epic_id")].append(block)
+        return grouped
+
+    async def insert_blocks(self, epic_id: str, blocks: List[dict]) -> None:
+        """Append blocks to an epic."""
+        if blocks:
+            await self.collection.insert_many([{**block, "epic_id": epic_id} for block in blocks])
+
+    async def replace_blocks(self, epic_id: str, blocks: List[dict]) -> None:
+        """Replace every block of an epic (re-segmentation, full edits, migration)."""
+        await self.collection.delete_many({"epic_id": epic_id})
+        await self.insert_blocks(epic_id, blocks)
+
+    async def update_block(
+        self,
+        epic_id: str,
+        block_id: str,
+        fields: dict,
+        extra_filter: Optional[dict] = None
+    ) -> Optional[dict]:
+        """
+        Set fields on one block.
+
+        Returns:
+            The updated block, or None if no block matched
+        """
+        return await self.collection.find_one_and_update(
+            {"epic_id": epic_id, "block_id": block_id, **(extra_filter or {})},
+            {"$set": fields},
+            projection=_STORE_ONLY_FIELDS,
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def update_blocks(self, epic_id: str, block_fields: Dict[str, dict]) -> int:
+        """
+        Set fields on several blocks in one bulk write.
+
+        Args:
+            block_fields: {block_id: fields to $set}
+
+        Returns:
+            Number of blocks matched
+        """
+        if not block_fields:
+            return 0
+        result = await self.collection.bulk_write([
+            UpdateOne({"epic_id": epic_id, "block_id": block_id}, {"$set": fields})
+            for block_id, fields in block_fields.items()
+        ], ordered=False)
+        return result.matched_count
+
+    async def splice_blocks(
+        self,
+        epic_id: str,
+        removed_ids: List[str],
+        inserted: List[dict],
+        renumbered: Dict[str, int]
+    ) -> None:
+        """
+        Replace some blocks and renumber others in one ordered bulk write.
+
+        Args:
+            removed_ids: block_ids to delete (inserted blocks may reuse them)
+            inserted: New block documents
+            renumbered: {block_id: new sequence_order} for kept blocks that moved
+        """
+        operations = []
+        if removed_ids:
+            operations.append(DeleteMany({"epic_id": epic_id, "block_id": {"$in": removed_ids}}))
+        operations += [InsertOne({**block, "epic_id": epic_id}) for block in inserted]
+        operations += [
+            UpdateOne({"epic_id": epic_id, "block_id": block_id}, {"$set": {"sequence_order": order}})
+            for block_id, order in renumbered.items()
+        ]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=True)
+
+    async def delete_blocks(self, epic_id: str) -> None:
+        """Remove every block of an epic."""
+        await self.collection.delete_many({"epic_id": epic_id})
+
+
+# Singleton instance
+story_block_store = StoryBlockStore(story_blocks_collection)
@@ -0,0 +1,134 @@
+"""
+Tag Stats Service - incrementally maintained per-tag statistics.
+
+The `tag_stats` collection holds one document per tag:
+    {"_id": <tag>, "count": <posts carrying the tag>, "last_used_at": <datetime>}
+
+Post writers report the tags they added/removed and the counters are moved
+with atomic $inc upserts, so /tags/ and /tags/popular read O(#tags) documents
+instead of scanning every post. reconcile() recounts the tags from the posts
+themselves and corrects any drift with $inc deltas.
+"""
+
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+from pymongo import UpdateOne, DeleteMany
+
+from backend.database import post_collection, tag_stats_collection
+
+
+class TagStatsService:
+    """Maintains and reads the tag_stats collection."""
+
+    def __init__(self, collection, source_collection):
+        """Initialize with the stats collection and the posts it summarizes."""
+        self.collection = collection
+        self.source_collection = source_collection
+
+    @staticmethod
+    def _clean(tags: Optional[Iterable[str]]) -> set:
+        """Distinct, non-empty tags."""
+        return {tag for tag in (tags or []) if tag}
+
+    async def record_change(self, old_tags: Optional[Iterable[str]], new_tags: Optional[Iterable[str]]) -> None:
+        """
+        Apply the delta between a post's previous and current tags.
+
+        Args:
+            old_tags: Tags before the write (None/[] for a new post)
+            new_tags: Tags after the write (None/[] for a deleted post)
+        """
+        old, new = self._clean(old_tags), self._clean(new_tags)
+        added, removed = new - old, old - new
+        if not added and not removed:
+            return
+
+        now = datetime.now(timezone.utc)
+        ops = [
+            UpdateOne({"_id": tag}, {"$inc": {"count": 1}, "$set": {"last_used_at": now}}, upsert=True)
+            for tag in added
+        ]
+        ops += [UpdateOne({"_id": tag}, {"$inc": {"count": -1}}) for tag in removed]
+        if removed:
+            # Tags no post carries any more disappear from the listings
+            ops.append(DeleteMany({"_id": {"$in": list(removed)}, "count": {"$lte": 0}}))
+
+        try:
+            await self.collection.bulk_write(ops, ordered=True)
+        except Exception as e:
+            # Never fail the post write; reconcile() repairs the counters
+            print(f"⚠️ Tag stats update failed: {e}")
+
+    async def get_all_tags(self) -> List[str]:
+        """All tags currently used by at least one post."""
+        cursor = self.collection.find({"count": {"$gt": 0}}, {"_id": 1}).sort("_id", 1)
+        return [doc["_id"] async for doc in cursor]
+
+    async def get_popular_tags(self, limit: int = 10) -> List[str]:
+        """Tags carried by the most posts, most popular first."""
+        cursor = self.collection.find({"count": {"$gt": 0}}, {"_id": 1}).sort([("count", -1), ("_id", 1)]).limit(limit)
+        return [doc["_id"] async for doc in cursor]
+
+    async def reconcile(self) -> int:
+        """
+        Correct tag_stats to match the posts collection.
+
+        A post counts once per distinct tag (like record_change). Corrections
+        are applied as $inc deltas against a snapshot read just before the
+        recount, and last_used_at only moves forward ($max), so counter
+        updates that land while the aggregation runs are kept instead of
+        being overwritten (one racing the recount of its own post can leave
+        that tag off by one until the next run).
+
+        Returns:
+            Number of tags whose count was corrected
+        """
+        snapshot = {doc["_id"]: doc.get("count", 0) async for doc in self.collection.find({}, {"count": 1})}
+
+        pipeline = [
+            {"$project": {
+                "general_tags": {"$setUnion": [
+                    {"$cond": [{"$isArray": "$general_tags"}, "$general_tags", []]}
+                ]},
+                "updated_at": 1
+            }},
+            {"$unwind": "$general_tags"},
+            {"$match": {"general_tags": {"$nin": [None, ""]}}},
+            {"$group": {
+                "_id": "$general_tags",
+                "count": {"$sum": 1},
+                "last_used_at": {"$max": "$updated_at"}
+            }},
+        ]
+
+        ops = []
+        counted = set()
+        corrected = 0
+        async for doc in self.source_collection.aggregate(pipeline):
+            tag = doc["_id"]
+            counted.add(tag)
+            update = {"$max": {"last_used_at": doc["last_used_at"]}} if doc.get("last_used_at") else {}
+            delta = doc["count"] - snapshot.get(tag, 0)
+            if delta:
+                update["$inc"] = {"count": delta}
+                corrected += 1
+            if update:
+                ops.append(UpdateOne({"_id": tag}, update, upsert=True))
+
+        # Tags no post carries any more
+        stale = [tag for tag in snapshot if tag not in counted]
+        for tag in stale:
+            if snapshot[tag]:
+                ops.append(UpdateOne({"_id": tag}, {"$inc": {"count": -snapshot[tag]}}))
+                corrected += 1
+        if stale:
+            ops.append(DeleteMany({"_id": {"$in": stale}, "count": {"$lte": 0}}))
+
+        if ops:
+            await self.collection.bulk_write(ops, ordered=True)
+        print(f"✅ Reconciled tag stats: {len(counted)} tags, {corrected} counters corrected")
+        return corrected
+
+
+# Singleton instance
+tag_stats_service = TagStatsService(tag_stats_collection, post_collection)
@@ -0,0 +1,213 @@
+"""
+Text Tiling - local lexical-cohesion story segmentation (no LLM).
+
+A TextTiling-style segmenter (Hearst, 1997) over paragraphs:
+1. Each paragraph becomes a term-count row (stopwords removed).
+2. For every gap between paragraphs, the terms of the `window` paragraphs
+   before and after are compared by cosine similarity; all gaps are scored
+   at once from cumulative row sums.
+3. Gaps whose depth (how far the similarity dips below the peaks on both
+   sides) clears mean - std/2 are boundary candidates; the deepest are
+   accepted first while blocks stay above min_words, and blocks over
+   max_words are split at their deepest remaining gap.
+4. A block's coherence score is how well each of its sentences matches the
+   rest of the block (leave-one-out cosine), so it is computed, not assumed.
+
+Runs in milliseconds for stories of a few hundred paragraphs.
+"""
+
+import re
+from typing import List, Tuple
+
+import numpy as np
+
+_WORD_RE = re.compile(r"[a-z][a-z']+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+_STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been
+before being below between both but by can could did do does doing down during
+each few for from further had has have having he her here hers herself him
+himself his how i if in into is it its itself just me more most my myself no nor
+not now of off on once only or other our ours ourselves out over own same she
+should so some such than that the their theirs them themselves then there these
+they this those through to too under until up very was we were what when where
+which while who whom why will with would you your yours yourself yourselves
+said says like one two also back even still yet upon
+""".split())
+
+
+def _terms(text: str) -> List[str]:
+    """Content words of a text, lowercased, with a crude plural/suffix fold."""
+    terms = []
+    for word in _WORD_RE.findall(text.lower()):
+        if word in _STOPWORDS or len(word) < 3:
+            continue
+        if word.endswith("'s"):
+            word = word[:-2]
+        elif word.endswith("s") and not word.endswith("ss") and len(word) > 4:
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+def _count_matrix(texts: List[str]) -> np.ndarray:
+    """Term-count rows (len(texts) x vocabulary)."""
+    vocabulary = {}
+    rows = []
+    for text in texts:
+        row = {}
+        for term in _terms(text):
+            idx = vocabulary.setdefault(term, len(vocabulary))
+            row[idx] = row.get(idx, 0) + 1
+        rows.append(row)
+    matrix = np.zeros((len(texts), max(len(vocabulary), 1)), dtype=np.float32)
+    for i, row in enumerate(rows):
+        if row:
+            matrix[i, list(row.keys())] = list(row.values())
+    return matrix
+
+
+def _row_cosines(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Cosine similarity of matching rows."""
+    norms = np.linalg.norm(left, axis=1) * np.linalg.norm(right, axis=1)
+    dots = np.einsum("ij,ij->i", left, right)
+    return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+
+def gap_similarities(paragraphs: List[str], window: int = 2) -> np.ndarray:
+    """
+    Lexical similarity across each gap between consecutive paragraphs.
+
+    Returns:
+        Array of len(paragraphs) - 1 cosines; entry i is the gap before paragraph i + 1
+    """
+    counts = _count_matrix(paragraphs)
+    n = len(paragraphs)
+    cumulative = np.vstack([np.zeros((1, counts.shape[1]), dtype=np.float32), np.cumsum(counts, axis=0)])
+    gaps = np.arange(1, n)
+    left = cumulative[gaps] - cumulative[np.maximum(gaps - window, 0)]
+    right = cumulative[np.minimum(gaps + window, n)] - cumulative[gaps]
+    return _row_cosines(left, right)
+
+
+def depth_scores(similarities: np.ndarray) -> np.ndarray:
+    """Depth of each gap's similarity below the nearest peaks on either side."""
+    depths = np.zeros_like(similarities)
+    for i, score in enumerate(similarities):
+        left = score
+        for j in range(i - 1, -1, -1):
+            if similarities[j] < left:
+                break
+            left = similarities[j]
+        right = score
+        for j in range(i + 1, len(similarities)):
+            if similarities[j] < right:
+                break
+            right = similarities[j]
+        depths[i] = (left - score) + (right - score)
+    return depths
+
+
+def block_coherence(text: str) -> float:
+    """
+    Lexical coherence of a block in [0, 1].
+
+    Mean cosine between each sentence and the rest of the block; the square
+    root spreads typical lexical cosines (0.1-0.5) over a readable range.
+    """
+    sentences = [s for s in _SENTENCE_RE.split(text) if s.strip()]
+    if len(sentences) < 2:
+        return 0.5
+    counts = _count_matrix(sentences)
+    rest = counts.sum(axis=0, keepdims=True) - counts
+    cosines = _row_cosines(counts, rest)
+    return round(float(np.sqrt(cosines.mean())), 3)
+
+
+class TextTilingSegmenter:
+    """Groups paragraphs into blocks at lexical-cohesion valleys."""
+
+    def __init__(self, window: int = 2, min_words: int = 120, max_words: int = 450):
+        """
+        Args:
+            window: Paragraphs compared on each side of a gap
+            min_words: Smallest block the segmenter creates when it can avoid it
+            max_words: Blocks above this are split at their deepest gap
+        """
+        self.window = window
+        self.min_words = min_words
+        self.max_words = max_words
+
+    def boundaries(self, paragraphs: List[str]) -> List[int]:
+        """
+        Paragraph indices that start a block (always including 0).
+
+        Args:
+            paragraphs: Paragraph texts in story order
+        """
+        n = len(paragraphs)
+        if n < 2:
+            return [0]
+
+        depths = depth_scores(gap_similarities(paragraphs, self.window))
+        words = np.array([len(p.split()) for p in paragraphs])
+        prefix = np.concatenate([[0], np.cumsum(words)])
+        starts = {0}
+
+        def block_words(start: int) -> int:
+            ordered = sorted(starts)
+            end = next((s for s in ordered if s > start), n)
+            return int(prefix[end] - prefix[start])
+
+        def fits(gap_start: int) -> bool:
+            """Both halves of the block containing gap_start stay >= min_words."""
+            owner = max(s for s in starts if s < gap_start)
+            following = next((s for s in sorted(starts) if s > gap_start), n)
+            return (prefix[gap_start] - prefix[owner] >= self.min_words
+                    and prefix[following] - prefix[gap_start] >= self.min_words)
+
+        # Valleys: depth above the mean - std/2 cutoff, deepest first
+        cutoff = depths.mean() - depths.std() / 2
+        for gap in np.argsort(-depths, kind="stable"):
+            start = int(gap) + 1
+            if depths[gap] > 0 and depths[gap] >= cutoff and fits(start):
+                starts.add(start)
+
+        # Split oversized blocks at their deepest internal gap
+        changed = True
+        while changed:
+            changed = False
+            for start in sorted(starts):
+                if block_words(start) <= self.max_words:
+                    continue
+                end = next((s for s in sorted(starts) if s > start), n)
+                if end - start < 2:
+                    continue
+                # Deepest gap inside the block (gap g sits before paragraph g + 1),
+                # ties broken towards the middle of the block
+                middle = (prefix[start] + prefix[end]) / 2
+                best = max(range(start, end - 1), key=lambda g: (depths[g], -abs(prefix[g + 1] - middle)))
+                starts.add(best + 1)
+                changed = True
+                break
+
+        return sorted(starts)
+
+    def segment(self, paragraphs: List[str]) -> List[Tuple[int, float]]:
+        """
+        Block starts with their coherence scores.
+
+        Returns:
+            [(first paragraph index, coherence score)] in order
+        """
+        starts = self.boundaries(paragraphs)
+        result = []
+        for i, start in enumerate(starts):
+            end = starts[i + 1] if i + 1 < len(starts) else len(paragraphs)
+            result.append((start, block_coherence(" ".join(paragraphs[start:end]))))
+        return result
+
+
+# Singleton instance
+text_tiling_segmenter = TextTilingSegmenter()
@@ -0,0 +1,79 @@
+"""
+Text Vectorizer - local, CPU-only hashing TF vectors for short texts.
+
+Words and word bigrams are hashed (stable CRC32, signed) into a fixed number
+of buckets, weighted with sublinear term frequency and L2-normalized. The
+result is stored as compact float32 bytes; IDF weighting is applied at query
+time by the phrase index (it depends on the whole corpus, which keeps
+changing), so stored vectors never need recomputing when documents are added.
+"""
+
+import re
+import zlib
+from typing import List, Optional
+
+import numpy as np
+
+# Bump when tokenization/hashing changes so stored vectors are recomputed
+VECTORIZER_VERSION = "hash-tf-v1"
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+class HashingVectorizer:
+    """Stateless text -> float32 vector mapping."""
+
+    def __init__(self, n_features: int = 1024):
+        """
+        Args:
+            n_features: Vector dimension (power of two)
+        """
+        if n_features & (n_features - 1):
+            raise ValueError("n_features must be a power of two")
+        self.n_features = n_features
+        self.model_name = f"{VECTORIZER_VERSION}-{n_features}"
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """Lowercased words plus adjacent-word bigrams."""
+        words = _TOKEN_RE.findall(text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def transform(self, text: str) -> np.ndarray:
+        """
+        Vectorize one text.
+
+        Returns:
+            L2-normalized float32 vector (all zeros for empty text)
+        """
+        vector = np.zeros(self.n_features, dtype=np.float32)
+        mask = self.n_features - 1
+        for token in self.tokenize(text):
+            h = zlib.crc32(token.encode("utf-8"))
+            vector[h & mask] += 1.0 if h >> 31 else -1.0
+
+        # Sublinear TF on magnitudes, sign kept (signed hashing cancels collisions)
+        nonzero = vector != 0
+        vector[nonzero] = np.sign(vector[nonzero]) * (1.0 + np.log(np.abs(vector[nonzero])))
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    @staticmethod
+    def to_bytes(vector: np.ndarray) -> bytes:
+        """Compact storage form (float32, native little-endian layout)."""
+        return np.asarray(vector, dtype="<f4").tobytes()
+
+    def from_bytes(self, data: Optional[bytes]) -> Optional[np.ndarray]:
+        """Decode a stored vector; None if missing or of the wrong dimension."""
+        if not data:
+            return None
+        vector = np.frombuffer(data, dtype="<f4")
+        if vector.shape[0] != self.n_features:
+            return None
+        return vector.astype(np.float32)
+
+
+# Shared instance
+text_vectorizer = HashingVectorizer()
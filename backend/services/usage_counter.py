@@ -0,0 +1,97 @@
+"""
+Usage Counter - write-behind buffer for counter increments.
+
+Request handlers record increments in memory; a background task flushes
+them to MongoDB as a single unordered bulk_write every few seconds, as soon
+as enough distinct documents are pending, and once more on shutdown.
+Counters may lag by up to one flush interval (and a crash loses at most the
+unflushed increments), which is fine for popularity ranking.
+"""
+
+import asyncio
+from collections import Counter
+from typing import Iterable, Optional
+from pymongo import UpdateOne
+
+from backend.background import spawn
+from backend.config import settings
+from backend.database import phrase_learning_collection
+
+
+class UsageCounterBuffer:
+    """Buffers $inc operations on one counter field and flushes them in bulk."""
+
+    def __init__(self, collection, field: str, flush_interval: float, max_pending: int):
+        """
+        Args:
+            collection: Collection holding the counters
+            field: Counter field to increment
+            flush_interval: Seconds between periodic flushes
+            max_pending: Flush early once this many documents have pending increments
+        """
+        self.collection = collection
+        self.field = field
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Counter = Counter()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def increment(self, doc_ids: Iterable) -> None:
+        """Record one increment for each document id (no I/O on the caller's path)."""
+        self._pending.update(doc_ids)
+        if len(self._pending) >= self.max_pending:
+            spawn(self.flush())
+
+    async def flush(self) -> int:
+        """
+        Write all pending increments with one bulk_write.
+
+        Returns:
+            Number of documents updated
+        """
+        async with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, Counter()
+
+            ops = [UpdateOne({"_id": doc_id}, {"$inc": {self.field: n}}) for doc_id, n in pending.items()]
+            try:
+                await self.collection.bulk_write(ops, ordered=False)
+            except Exception as e:
+                # Keep the increments for the next attempt
+                self._pending.update(pending)
+                print(f"⚠️ Failed to flush {len(ops)} {self.field} increments: {e}")
+                return 0
+            return len(ops)
+
+    async def _run(self) -> None:
+        """Periodic flush loop."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        """Start the periodic flush task (call from the startup hook)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic task and flush whatever is left (call on shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# Singleton instance for phrase-learning usage counts
+phrase_usage_counter = UsageCounterBuffer(
+    phrase_learning_collection,
+    field="usage_count",
+    flush_interval=settings.PHRASE_USAGE_FLUSH_SECONDS,
+    max_pending=settings.PHRASE_USAGE_FLUSH_THRESHOLD
+)
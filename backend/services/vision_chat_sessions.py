@@ -0,0 +1,243 @@
+"""
+Vision Chat Sessions - server-side state for multi-turn image chat.
+
+POST /posts/chat/vision makes the client resend the text blocks and the
+conversation on every turn, and re-runs the vision model on the image each
+time. A session instead stores, in `vision_chat_sessions`:
+    {image_url, post_id, blocks_context, image_analysis, summary,
+     recent: [{role, content}], compacted_messages, turns, created_at, last_active_at}
+The image is analysed once when the session is created; each turn sends
+only the new message and is answered from the stored analysis, the
+compacted summary and the last VISION_CHAT_RECENT_MESSAGES messages.
+Older messages are folded into the summary in the background; if that
+keeps failing, `recent` is still capped at VISION_CHAT_MAX_MESSAGES (oldest
+dropped) so a turn never resends the whole transcript. Idle sessions expire
+through a TTL index on last_active_at.
+"""
+
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+
+from backend.background import spawn
+from backend.config import settings
+from backend.database import post_collection, vision_chat_sessions_collection
+from backend.services.editor_llm_service import editor_llm_service
+
+
+class MissingImageError(ValueError):
+    """Raised when a session is requested for a post that has no image."""
+
+
+def _object_id(value: str) -> Optional[ObjectId]:
+    """ObjectId from a path/body value, or None if malformed."""
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+
+class VisionChatSessionService:
+    """Creates vision chat sessions and runs their turns."""
+
+    def __init__(self, collection, recent_messages: int, max_messages: int):
+        """
+        Args:
+            collection: vision_chat_sessions collection
+            recent_messages: Messages kept verbatim before compaction
+            max_messages: Messages kept at most (uncompacted overflow is dropped)
+        """
+        self.collection = collection
+        self.recent_messages = recent_messages
+        self.max_messages = max(max_messages, recent_messages + 2)
+
+    @staticmethod
+    def session_helper(doc: dict) -> dict:
+        """Convert a session document to the VisionChatSession shape."""
+        return {
+            "session_id": str(doc["_id"]),
+            "image_url": doc["image_url"],
+            "post_id": doc.get("post_id"),
+            "image_analysis": doc.get("image_analysis", ""),
+            "summary": doc.get("summary", ""),
+            "recent": doc.get("recent", []),
+            "turns": doc.get("turns", 0),
+            "created_at": doc["created_at"],
+            "last_active_at": doc["last_active_at"],
+        }
+
+    async def create(
+        self,
+        post_id: Optional[str] = None,
+        image_url: Optional[str] = None,
+        text_blocks: Optional[List[dict]] = None
+    ) -> Optional[dict]:
+        """
+        Start a session and analyse its image once.
+
+        Args:
+            post_id: Post whose image and text blocks to discuss (read server-side)
+            image_url: Image to discuss when there is no post
+            text_blocks: Context blocks when there is no post
+
+        Returns:
+            The session, or None if the post does not exist
+
+        Raises:
+            MissingImageError: The post has no photo_url
+        """
+        if post_id:
+            post_oid = _object_id(post_id)
+            post = await post_collection.find_one(
+                {"_id": post_oid}, {"photo_url": 1, "text_blocks": 1}
+            ) if post_oid else None
+            if post is None:
+                return None
+            image_url = post.get("photo_url")
+            if not image_url:
+                # Checked before the vision call and the session write
+                raise MissingImageError(f"Post {post_id} has no image")
+            text_blocks = post.get("text_blocks") or []
+
+        blocks_context = editor_llm_service.blocks_context(text_blocks or [])
+        image_analysis = await editor_llm_service.analyze_image_for_chat(image_url, blocks_context)
+
+        now = datetime.now(timezone.utc)
+        doc = {
+            "_id": ObjectId(),
+            "image_url": image_url,
+            "post_id": post_id,
+            "blocks_context": blocks_context,
+            "image_analysis": image_analysis,
+            "summary": "",
+            "recent": [],
+            "compacted_messages": 0,
+            "turns": 0,
+            "created_at": now,
+            "last_active_at": now,
+        }
+        await self.collection.insert_one(doc)
+        return self.session_helper(doc)
+
+    async def get(self, session_id: str) -> Optional[dict]:
+        """A session, or None if unknown or expired."""
+        session_oid = _object_id(session_id)
+        doc = await self.collection.find_one({"_id": session_oid}) if session_oid else None
+        return self.session_helper(doc) if doc else None
+
+    async def delete(self, session_id: str) -> bool:
+        """End a session early; True if it existed."""
+        session_oid = _object_id(session_id)
+        if session_oid is None:
+            return False
+        result = await self.collection.delete_one({"_id": session_oid})
+        return result.deleted_count == 1
+
+    async def send(self, session_id: str, message: str, look_again: bool = False) -> Optional[str]:
+        """
+        Run one turn: answer `message` from the session state and record both messages.
+
+        Args:
+            session_id: Session ID
+            message: The new user message (the only per-turn payload)
+            look_again: Re-send the image to the vision model for this turn
+
+        Returns:
+            The assistant's answer, or None if the session does not exist
+        """
+        session_oid = _object_id(session_id)
+        if session_oid is None:
+            return None
+
+        # Read the session and keep it alive in one round trip
+        doc = await self.collection.find_one_and_update(
+            {"_id": session_oid},
+            {"$set": {"last_active_at": datetime.now(timezone.utc)}},
+            return_document=ReturnDocument.AFTER
+        )
+        if doc is None:
+            return None
+
+        answer = await editor_llm_service.chat_in_session(
+            image_url=doc["image_url"],
+            image_analysis=doc.get("image_analysis", ""),
+            blocks_context=doc.get("blocks_context", ""),
+            summary=doc.get("summary", ""),
+            recent=doc.get("recent", []),
+            user_message=message,
+            look_again=look_again
+        )
+
+        # $push appends, so a concurrent compaction (which trims the front)
+        # composes; $slice bounds the window if compaction is not keeping up
+        await self.collection.update_one(
+            {"_id": session_oid},
+            {
+                "$push": {"recent": {
+                    "$each": [
+                        {"role": "user", "content": message},
+                        {"role": "assistant", "content": answer},
+                    ],
+                    "$slice": -self.max_messages,
+                }},
+                "$inc": {"turns": 1},
+                "$set": {"last_active_at": datetime.now(timezone.utc)},
+            }
+        )
+
+        if len(doc.get("recent", [])) + 2 > self.recent_messages:
+            spawn(self.compact_quietly(session_id))
+        return answer
+
+    async def compact(self, session_id: str) -> None:
+        """
+        Fold messages older than the verbatim window into the summary.
+
+        The write is conditional on compacted_messages and on the first
+        message still being the one read, so two compactions of the same
+        session never fold the same messages twice, and a window trimmed by
+        the $slice cap in the meantime is not sliced again. If the summary
+        call fails, the messages stay and the next turn retries.
+        """
+        session_oid = _object_id(session_id)
+        doc = await self.collection.find_one({"_id": session_oid}) if session_oid else None
+        if doc is None:
+            return
+
+        recent = doc.get("recent", [])
+        overflow = len(recent) - self.recent_messages
+        if overflow <= 0:
+            return
+
+        summary = await editor_llm_service.compact_conversation(doc.get("summary", ""), recent[:overflow])
+        if summary is None:
+            return
+
+        compacted = doc.get("compacted_messages", 0)
+        await self.collection.update_one(
+            {"_id": session_oid, "compacted_messages": compacted, "recent.0": recent[0]},
+            [{"$set": {
+                "summary": {"$literal": summary},
+                "compacted_messages": compacted + overflow,
+                # Drop the folded messages from the front; turns pushed meanwhile stay
+                "recent": {"$slice": ["$recent", overflow, {"$max": [{"$size": "$recent"}, 1]}]},
+            }}]
+        )
+
+    async def compact_quietly(self, session_id: str) -> None:
+        """Background compaction after a turn (errors are logged, not raised)."""
+        try:
+            await self.compact(session_id)
+        except Exception as e:
+            print(f"⚠️ Vision chat compaction failed for session {session_id}: {e}")
+
+
+# Singleton instance
+vision_chat_sessions = VisionChatSessionService(
+    vision_chat_sessions_collection,
+    recent_messages=settings.VISION_CHAT_RECENT_MESSAGES,
+    max_messages=settings.VISION_CHAT_MAX_MESSAGES,
+)
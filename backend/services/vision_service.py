@@ -7,8 +7,7 @@ Follows Single Responsibility Principle - only handles vision-related tasks.
 import json
 import re
 from typing import Optional, Dict, Any
-from groq import Groq
-from backend.config import settings
+from backend.services.llm_gateway import llm_gateway
 
 
 class VisionService:
@@ -18,27 +17,29 @@ class VisionService:
     """
     
     def __init__(self):
-        """Initialize Groq client with API key from settings."""
-        if settings.GROQ_API_KEY:
-            self.client = Groq(api_key=settings.GROQ_API_KEY)
-            # Using llama-3.2-90b-vision-preview for better quality
-            # Can switch to llama-3.2-11b-vision-preview for faster responses
-            self.vision_model = "meta-llama/llama-4-scout-17b-16e-instruct"
-        else:
-            self.client = None
-            self.vision_model = None
+        """Initialize the vision model role; completions go through the shared LLM gateway."""
+        # Model id, timeout and max_tokens are configured in llm_clients.py
+        self.vision_model = "vision"
     
     def _is_available(self) -> bool:
         """Check if vision service is available."""
-        return self.client is not None
+        return llm_gateway.is_available()
     
-    async def analyze_image(self, image_url: str, prompt: str) -> Optional[str]:
+    async def analyze_image(
+        self,
+        image_url: str,
+        prompt: str,
+        cache: bool = False,
+        bypass_cache: bool = False
+    ) -> Optional[str]:
         """
         Analyze an image using Groq Vision API.
         
         Args:
             image_url: URL of the image to analyze
             prompt: The prompt/question to ask about the image
+            cache: Serve/store the result through the LLM cache
+            bypass_cache: Force a fresh analysis even if cached
             
         Returns:
             Analysis result as string, or None if service unavailable
@@ -48,7 +49,7 @@ class VisionService:
             return None
         
         try:
-            completion = self.client.chat.completions.create(
+            return await llm_gateway.chat(
                 model=self.vision_model,
                 messages=[
                     {
@@ -70,11 +71,11 @@ class VisionService:
                 temperature=0.7,
                 max_tokens=1024,
                 top_p=1,
-                stream=False
+                stream=False,
+                cache=cache,
+                bypass_cache=bypass_cache
             )
             
-            return completion.choices[0].message.content
-            
         except Exception as e:
             print(f"❌ Error in vision analysis: {e}")
             return None
@@ -229,13 +230,15 @@ Respond with ONLY the JSON, no additional text."""
                 "thematic_connections": []
             }
     
-    async def generate_image_subtitle(self, image_url: str) -> str:
+    async def generate_image_subtitle(self, image_url: str, bypass_cache: bool = False) -> str:
         """
         Generate a short, evocative subtitle for an image.
         Used for epic story blocks to create captions/subtitles.
+        Subtitles are cached per image; bypass_cache forces a new one.
         
         Args:
             image_url: URL of the image
+            bypass_cache: Skip the cached subtitle
             
         Returns:
             Short subtitle (1-2 sentences)
@@ -255,7 +258,7 @@ Requirements:
 Generate ONLY the subtitle, no additional text or explanation:"""
         
         try:
-            result = await self.analyze_image(image_url, prompt)
+            result = await self.analyze_image(image_url, prompt, cache=True, bypass_cache=bypass_cache)
             if result:
                 # Clean up the result (remove quotes, extra whitespace)
                 subtitle = result.strip().strip('"').strip("'")
@@ -0,0 +1,30 @@
+"""
+Server-Sent Events helpers for the streaming generation endpoints.
+
+Event protocol used by every /stream endpoint:
+    event: token  data: {"text": "..."}        - a completion delta
+    event: draft  data: {"text": "..."}        - a delta from an intermediate stage
+    event: done   data: {...parsed fields...}  - final structured result
+    event: error  data: {"detail": "..."}      - generation failed
+"""
+
+import json
+from typing import Any, AsyncIterator
+from fastapi.responses import StreamingResponse
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one SSE frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """Wrap an async iterator of SSE frames in a non-buffered streaming response."""
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable proxy buffering (Render/nginx)
+        },
+    )
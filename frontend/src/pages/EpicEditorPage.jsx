@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef, useCallback } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { epicService } from '../services/epicService';
 import ImageSelectorModal from '../components/ImageSelectorModal';
@@ -11,6 +11,11 @@ const EpicEditorPage = () => {
 
     const [epic, setEpic] = useState(null);
     const [loading, setLoading] = useState(!isNew);
+    // Story blocks are paged in lazily (GET /epics/{id}/blocks)
+    const [blocks, setBlocks] = useState([]);
+    const [nextAfter, setNextAfter] = useState(null);
+    const [loadingBlocks, setLoadingBlocks] = useState(false);
+    const sentinelRef = useRef(null);
     const [modalOpen, setModalOpen] = useState(false);
     const [selectedBlockId, setSelectedBlockId] = useState(null);
     const [formData, setFormData] = useState({
@@ -30,8 +35,12 @@ const EpicEditorPage = () => {
 
     const loadEpic = async (epicId) => {
         try {
-            const data = await epicService.getEpic(epicId);
+            // Header only; blocks arrive page by page below
+            const data = await epicService.getEpic(epicId, false);
             setEpic(data);
+            const page = await epicService.listBlocks(epicId);
+            setBlocks(page.blocks);
+            setNextAfter(page.next_after);
         } catch (error) {
             console.error("Error loading epic:", error);
         } finally {
@@ -39,6 +48,31 @@ const EpicEditorPage = () => {
         }
     };
 
+    const loadMoreBlocks = useCallback(async () => {
+        if (!epic || nextAfter === null || loadingBlocks) return;
+        setLoadingBlocks(true);
+        try {
+            const page = await epicService.listBlocks(epic.id, nextAfter);
+            setBlocks(prev => [...prev, ...page.blocks]);
+            setNextAfter(page.next_after);
+        } catch (error) {
+            console.error("Error loading story blocks:", error);
+        } finally {
+            setLoadingBlocks(false);
+        }
+    }, [epic, nextAfter, loadingBlocks]);
+
+    // Fetch the next page when the end of the list scrolls into view
+    useEffect(() => {
+        const sentinel = sentinelRef.current;
+        if (!sentinel || nextAfter === null) return;
+        const observer = new IntersectionObserver(entries => {
+            if (entries[0].isIntersecting) loadMoreBlocks();
+        }, { rootMargin: '400px' });
+        observer.observe(sentinel);
+        return () => observer.disconnect();
+    }, [loadMoreBlocks, nextAfter, loading]);
+
     const handleInputChange = (e) => {
         const { name, value, type, checked } = e.target;
         setFormData(prev => ({
@@ -78,9 +112,13 @@ const EpicEditorPage = () => {
     const handleImageSelect = async (imageId, subtitle) => {
         try {
             // Associate image with block and save subtitle as text_block
-            await epicService.associateImage(epic.id, selectedBlockId, imageId, subtitle);
-            // Reload epic to show updated data
-            await loadEpic(epic.id);
+            const updated = await epicService.associateImage(epic.id, selectedBlockId, imageId, subtitle);
+            // Patch the changed block in place instead of reloading every page
+            const changed = updated.story_blocks.find(b => b.block_id === selectedBlockId);
+            setEpic(prev => ({ ...prev, metadata: updated.metadata }));
+            if (changed) {
+                setBlocks(prev => prev.map(b => (b.block_id === selectedBlockId ? changed : b)));
+            }
         } catch (error) {
             console.error('Error associating image:', error);
             throw error;
@@ -193,7 +231,7 @@ const EpicEditorPage = () => {
             </div>
 
             <div className="story-blocks">
-                {epic.story_blocks.map((block, index) => (
+                {blocks.map((block, index) => (
                     <div key={block.block_id} className="story-block">
                         <div className="block-content">
                             <span className="block-number">{index + 1}</span>
@@ -226,6 +264,13 @@ const EpicEditorPage = () => {
                         </div>
                     </div>
                 ))}
+                {nextAfter !== null && (
+                    <div ref={sentinelRef} className="blocks-load-more">
+                        <button onClick={loadMoreBlocks} disabled={loadingBlocks}>
+                            {loadingBlocks ? 'Loading...' : 'Load more blocks'}
+                        </button>
+                    </div>
+                )}
             </div>
 
             <ImageSelectorModal
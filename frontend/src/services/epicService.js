@@ -14,12 +14,23 @@ export const epicService = {
         return response.json();
     },
 
-    async getEpic(id) {
-        const response = await fetch(`${EPIC_API_URL}/${id}`);
+    async getEpic(id, includeBlocks = true) {
+        const params = includeBlocks ? '' : '?include_blocks=false';
+        const response = await fetch(`${EPIC_API_URL}/${id}${params}`);
         if (!response.ok) throw new Error('Failed to fetch epic');
         return response.json();
     },
 
+    // One page of story blocks; pass the previous page's next_after as `after`
+    async listBlocks(id, after = null, limit = 20) {
+        const params = new URLSearchParams({ limit });
+        if (after !== null) params.append('after', after);
+
+        const response = await fetch(`${EPIC_API_URL}/${id}/blocks?${params}`);
+        if (!response.ok) throw new Error('Failed to fetch story blocks');
+        return response.json();
+    },
+
     async createEpic(data) {
         const response = await fetch(`${EPIC_API_URL}/`, {
             method: 'POST',